@@ -0,0 +1,100 @@
+"""
+Time the rendering of browser card pages with 100 and 1,000 cards, as HTML and as the
+compact JSON payload used when cards are rendered in the browser.
+
+Usage (from the WebUI root, with the WebUI's python so the extension can be imported):
+    python extensions/sd-civitai-browser-plus/benchmarks/bench_cards.py [payload.json ...]
+
+Without arguments synthetic listing items are used, recorded pages (for example from
+config_states/civitai_api_cache) are repeated to fill the page sizes when passed.
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import scripts.civitai_api as _api
+
+TYPES = ('Checkpoint', 'LORA', 'TextualInversion', 'LoCon', 'Controlnet')
+BASE_MODELS = ('SD 1.5', 'SDXL 1.0', 'Pony', 'Illustrious', 'Flux.1 D')
+
+
+def synthetic_item(index):
+    model_id = 100000 + index
+    versions = []
+    for version_index in range(3):
+        version_id = model_id * 10 + version_index
+        image_type = 'video' if index % 7 == 0 else 'image'
+        url = f"https://image.civitai.com/xG1nkqKTMzGDvpLrqFT7WA/{version_id}/width=450/{version_id}.{'mp4' if image_type == 'video' else 'jpeg'}"
+        versions.append({
+            'id': version_id,
+            'name': f"v{3 - version_index}.0",
+            'baseModel': BASE_MODELS[index % len(BASE_MODELS)],
+            'publishedAt': f"2024-0{1 + index % 9}-{10 + index % 18}T12:00:00.000Z",
+            'availability': 'Public',
+            'images': [{'url': url, 'type': image_type, 'width': 832, 'height': 1216, 'nsfwLevel': 1 + index % 4}],
+            'files': [{
+                'id': version_id,
+                'name': f"model_{model_id}_v{version_index}.safetensors",
+                'primary': True,
+                'sizeKB': 144000.5,
+                'hashes': {'SHA256': f"{version_id:064X}"}
+            }]
+        })
+    return {
+        'id': model_id,
+        'name': f"Synthetic model's name number {index} with a rather long title",
+        'type': TYPES[index % len(TYPES)],
+        'nsfw': index % 5 == 0,
+        'nsfwLevel': 1 + index % 4,
+        'description': '',
+        'modelVersions': versions
+    }
+
+def load_items(paths):
+    items = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = json.loads(f.read())
+        # Entries of the API cache wrap the response
+        if isinstance(data, dict) and 'data' in data and 'saved_at' in data:
+            data = data['data']
+        items += [item for item in data.get('items', []) if item.get('modelVersions')]
+    return items
+
+def page(items, size):
+    return [items[index % len(items)] for index in range(size)]
+
+def main():
+    items = load_items(sys.argv[1:]) if sys.argv[1:] else [synthetic_item(index) for index in range(1000)]
+    if not items:
+        print('No listing items found in the given payloads.')
+        return
+
+    # Mark every tenth file as installed so both card variants are rendered
+    existing_files = {}
+    for item in items[::10]:
+        file = item['modelVersions'][0]['files'][0]
+        name, extension = os.path.splitext(file['name'])
+        existing_files[f"{name}_{file['id']}{extension}".lower()] = os.path.join('models', f"{name}_{file['id']}{extension}")
+
+    # The card cache would turn every repeat into a lookup, cold renders are timed here
+    _api.CARD_CACHE_SIZE = 0
+
+    print(f"{'cards':>6} {'grouped':>8} {'mode':>5} {'ms/page':>10} {'us/card':>10} {'KB':>8}")
+    for size in (100, 1000):
+        cards = page(items, size)
+        for sort_newest in (False, True):
+            renderers = {
+                'html': lambda: _api.render_cards(cards, existing_files, {}, sort_newest),
+                'json': lambda: _api.render_cards_json(cards, existing_files, {}, sort_newest)
+            }
+            for mode, render in renderers.items():
+                ms = min(timeit.repeat(render, number=1, repeat=7)) * 1000
+                print(f"{size:>6} {str(sort_newest):>8} {mode:>5} {ms:>10.1f} {ms * 1000 / size:>10.1f} {len(render()) / 1024:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Time clean_description on real model descriptions, with each available parser and cached.
+
+Usage (from the WebUI root, with the WebUI's python so the extension can be imported):
+    python extensions/sd-civitai-browser-plus/benchmarks/bench_description.py [payload.json ...]
+
+Without arguments the descriptions of the listing pages saved in config_states/civitai_api_cache are used.
+"""
+import glob
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import scripts.civitai_file_manage as _file
+
+PARSERS = ['html.parser']
+try:
+    import lxml
+    PARSERS.append('lxml')
+except ImportError:
+    print('lxml not installed, skipping')
+
+
+def load_descriptions(paths):
+    descriptions = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = json.loads(f.read())
+        # Entries of the API cache wrap the response
+        if isinstance(data, dict) and 'data' in data and 'saved_at' in data:
+            data = data['data']
+        if not isinstance(data, dict):
+            continue
+        for item in data.get('items', [data]):
+            if item.get('description'):
+                descriptions.append(item['description'])
+            for version in item.get('modelVersions', []):
+                if version.get('description'):
+                    descriptions.append(item.get('description', '') + '\n<p>About this version:</p>\n' + version['description'])
+    return descriptions
+
+def main():
+    paths = sys.argv[1:] or glob.glob(os.path.join(os.getcwd(), 'config_states', 'civitai_api_cache', '*.json'))
+    descriptions = load_descriptions(paths)
+    if not descriptions:
+        print('No descriptions found, pass recorded API responses as arguments.')
+        return
+
+    total_kb = sum(len(desc) for desc in descriptions) / 1024
+    print(f"{len(descriptions)} descriptions ({total_kb:.0f} KB)\n")
+    print(f"{'parser':<12} {'total ms':>10} {'ms/desc':>10}")
+
+    results = {}
+    for parser in PARSERS:
+        ms = min(timeit.repeat(lambda: [_file._clean_description(desc, parser) for desc in descriptions], number=1, repeat=3)) * 1000
+        results[parser] = [_file._clean_description(desc, parser) for desc in descriptions]
+        print(f"{parser:<12} {ms:>10.1f} {ms / len(descriptions):>10.2f}")
+
+    # Every file of a model shares its description, repeats come from the cache
+    [_file.clean_description(desc) for desc in descriptions]
+    ms = min(timeit.repeat(lambda: [_file.clean_description(desc) for desc in descriptions], number=1, repeat=3)) * 1000
+    print(f"{'cached':<12} {ms:>10.1f} {ms / len(descriptions):>10.2f}")
+
+    if len(results) > 1:
+        differ = sum(a != b for a, b in zip(*results.values()))
+        print(f"\n{differ} of {len(descriptions)} descriptions convert differently with {' and '.join(results)}")
+
+
+if __name__ == '__main__':
+    main()
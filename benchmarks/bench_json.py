@@ -0,0 +1,76 @@
+"""
+Compare the JSON backends parsing recorded CivitAI API payloads and sidecars.
+Writing always goes through the standard library (see scripts/civitai_json.py).
+
+Usage (from the WebUI root, after browsing for a while so the API cache is filled):
+    python extensions/sd-civitai-browser-plus/benchmarks/bench_json.py [payload.json ...]
+
+Without arguments the responses saved in config_states/civitai_api_cache are used.
+"""
+import glob
+import json
+import os
+import sys
+import timeit
+
+backends = {'json': json}
+for name in ('orjson', 'ujson'):
+    try:
+        backends[name] = __import__(name)
+    except ImportError:
+        print(f"{name} not installed, skipping")
+
+
+def load_payloads(paths):
+    payloads = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw)
+        # Entries of the API cache wrap the response
+        if isinstance(data, dict) and 'data' in data and 'saved_at' in data:
+            data = data['data']
+        payloads.append((json.dumps(data, ensure_ascii=False).encode('utf-8'), data))
+    return payloads
+
+def parse(name, raw):
+    if name == 'json':
+        # What request_civit_api used to do: decode the whole body, then parse the text
+        return json.loads(raw.decode('utf-8'))
+    return backends[name].loads(raw)
+
+def sidecars(payloads):
+    """Sidecar sized files, like the ones written for every installed model (always by the stdlib)."""
+    result = []
+    for _, data in payloads:
+        for item in data.get('items', [data]):
+            result.append({
+                'modelId': item.get('id'),
+                'sha256': 'A' * 64,
+                'activation text': ', '.join(item.get('tags', [])[:8]) if isinstance(item.get('tags'), list) else '',
+                'description': item.get('description') or '',
+                'sd version': 'SDXL'
+            })
+    return [json.dumps(data, indent=4).encode('utf-8') for data in result]
+
+def main():
+    paths = sys.argv[1:] or glob.glob(os.path.join(os.getcwd(), 'config_states', 'civitai_api_cache', '*.json'))
+    if not paths:
+        print('No payloads found, pass recorded API responses as arguments.')
+        return
+
+    payloads = load_payloads(paths)
+    small = sidecars(payloads)
+    total_mb = sum(len(raw) for raw, _ in payloads) / (1024 * 1024)
+    print(f"{len(payloads)} payloads ({total_mb:.1f} MB), {len(small)} sidecars\n")
+    print(f"{'backend':<8} {'parse ms':>10} {'sidecars ms':>12}")
+
+    for name in backends:
+        repeat = 5
+        parse_ms = min(timeit.repeat(lambda: [parse(name, raw) for raw, _ in payloads], number=1, repeat=repeat)) * 1000
+        sidecar_ms = min(timeit.repeat(lambda: [parse(name, raw) for raw in small], number=1, repeat=repeat)) * 1000
+        print(f"{name:<8} {parse_ms:>10.1f} {sidecar_ms:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Measure the memory held by listing pages in gl.json_data, before and after compaction.
+
+Usage (from the WebUI root, after browsing for a while so the API cache is filled):
+    python extensions/sd-civitai-browser-plus/benchmarks/bench_memory.py [payload.json ...] [--html model.html ...]
+
+Without payload arguments the listing pages saved in config_states/civitai_api_cache are used.
+Model pages saved with "Save HTML" can be passed with --html to measure queued preview HTML.
+"""
+import gc
+import glob
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.civitai_compact import compact_page, pack_html
+
+
+def read_page(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return data
+
+def measure(raw, compact):
+    gc.collect()
+    tracemalloc.start()
+    data = json.loads(raw)
+    if isinstance(data, dict) and 'data' in data and 'saved_at' in data:
+        data = data['data']
+    if compact:
+        compact_page(data)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return data, size
+
+def main():
+    args = sys.argv[1:]
+    html_files = []
+    if '--html' in args:
+        index = args.index('--html')
+        html_files = args[index + 1:]
+        args = args[:index]
+
+    paths = args or glob.glob(os.path.join(os.getcwd(), 'config_states', 'civitai_api_cache', '*.json'))
+    total_models = total_before = total_after = 0
+    for path in paths:
+        raw = read_page(path)
+        data, before = measure(raw, False)
+        if not isinstance(data, dict) or not data.get('items'):
+            continue
+        _, after = measure(raw, True)
+        total_models += len(data['items'])
+        total_before += before
+        total_after += after
+
+    if total_models:
+        per_100 = 100 / total_models / 1024
+        print(f"{total_models} models from {len(paths)} pages")
+        print(f"before: {total_before * per_100:8.0f} KB per 100 models")
+        print(f"after:  {total_after * per_100:8.0f} KB per 100 models ({100 - total_after / total_before * 100:.0f}% less)")
+    else:
+        print('No listing pages found, pass recorded API responses as arguments.')
+
+    for html_file in html_files:
+        with open(html_file, 'r', encoding='utf-8') as f:
+            html = f.read()
+        print(f"{os.path.basename(html_file)}: preview HTML {len(html) / 1024:.1f} KB -> {len(pack_html(html)) / 1024:.1f} KB queued")
+
+
+if __name__ == '__main__':
+    main()
@@ -54,6 +54,9 @@ function updateCardSize(width, height) {
 
     addOrUpdateRule(styleSheet, '.civmodelcard img', dimensionsKeyframes);
     addOrUpdateRule(styleSheet, '.civmodelcard .video-bg', dimensionsKeyframes);
+    addOrUpdateRule(styleSheet, '.civmodelcard .card-placeholder', dimensionsKeyframes);
+    cardWidth = width;
+    updateCardImageSizes(document.querySelectorAll('.civmodelcard img[srcset]'));
     addOrUpdateRule(styleSheet, '.civmodelcard figcaption', textKeyframes);
 
     // Hide badges when tile size is less than 11
@@ -74,6 +77,311 @@ function addOrUpdateRule(styleSheet, selector, newRules) {
     styleSheet.insertRule(`${selector} { ${newRules} }`, styleSheet.cssRules.length);
 }
 
+// Renders the compact card list sent with the "Render model cards in the browser" setting,
+// builds the same HTML as get_model_card in civitai_api.py
+const cardEarlyAccessIcon = '<svg class="early-access-icon" viewBox="0 0 24 24" xmlns="http://www.w3.org/2000/svg" fill="currentColor"><path d="M13 2L3 14h9l-1 8 10-12h-8z"/></svg>';
+const cardNsfwBadge = '<div class="nsfw-badge"><svg class="nsfw-badge-icon" viewBox="0 0 20 20" xmlns="http://www.w3.org/2000/svg" fill="currentColor"><circle cx="10" cy="10" r="10"/><text x="10" y="11" font-size="12" text-anchor="middle" dominant-baseline="middle" font-family="Arial" font-weight="bold" fill="#fff">!</text></svg>NSFW</div>';
+const cardNoPreview = '<img src="./file=html/card-no-preview.png" onerror="this.onerror=null;this.src=\'./file=html/card-no-preview.jpg\';"></img>';
+const cardEscapes = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;' };
+
+function escapeCardText(text) {
+    return String(text).replace(/[&<>"']/g, (char) => cardEscapes[char]);
+}
+
+// Same URLs as card_image_url in civitai_api.py, thumbWidth is 0 without the local thumbnail cache
+function cardImageUrl(url, width, payload) {
+    return payload.thumbWidth ? `./civitai-browser/thumb?w=${width}&url=${encodeURIComponent(url)}` : url;
+}
+
+function cardTemplate(card, payload) {
+    const modelString = escapeCardText(`${card.name.replace(/'/g, "\\'")} (${card.id})`);
+    const nameChars = Array.from(card.name);
+    const displayName = escapeCardText(nameChars.length > 35 ? nameChars.slice(0, 35).join('') + '...' : card.name);
+    const typeClass = card.type.toLowerCase();
+
+    const typeBadge = card.ea
+        ? `<div class="model-type-badge ${typeClass} early-access-badge">${cardEarlyAccessIcon}${card.label}</div>`
+        : `<div class="model-type-badge ${typeClass}">${card.label}</div>`;
+    const nsfwBadge = card.nsfw && payload.nsfwBadge ? cardNsfwBadge : '';
+
+    let media = cardNoPreview;
+    if (card.local) {
+        // Installed model with a saved preview, no request to the CDN
+        media = `<img src="${escapeCardText(card.local)}" loading="lazy" decoding="async"></img>`;
+    } else if (card.url && card.media === 'video') {
+        media = `<video class="video-bg" ${payload.playback} muted playsinline preload="none" poster="${escapeCardText(card.poster)}">` +
+            `<source src="${escapeCardText(card.url)}" type="video/mp4"></video>`;
+    } else if (card.url && payload.widths.length && card.url.includes('/width=')) {
+        const srcset = payload.widths.map((width) => `${cardImageUrl(card.url.replace(/\/width=\d+/, `/width=${width}`), width, payload)} ${width}w`).join(', ');
+        media = `<img src="${escapeCardText(cardImageUrl(card.url, payload.thumbWidth, payload))}" srcset="${escapeCardText(srcset)}" sizes="auto, 12em" loading="lazy" decoding="async"></img>`;
+    } else if (card.url) {
+        media = `<img src="${escapeCardText(cardImageUrl(card.url, payload.thumbWidth, payload))}" loading="lazy" decoding="async"></img>`;
+    }
+
+    let checkbox = '';
+    if (card.status !== 'civmodelcardinstalled') {
+        checkbox = '<div class="checkbox-container">' +
+            `<input type="checkbox" class="model-checkbox" id="checkbox-${modelString}" ` +
+            `onchange="multi_model_select('${modelString}', '${card.type}', this.checked)">` +
+            `<label for="checkbox-${modelString}" class="custom-checkbox"><span class="checkbox-checkmark"></span></label>` +
+            '</div>';
+    }
+
+    return `<figure class="civmodelcard ${card.nsfw ? 'civcardnsfw' : ''} ${card.ea ? 'early-access' : ''} ${card.status}" ` +
+        `base-model="${escapeCardText(card.base)}" date="${card.date}" onclick="select_model('${modelString}', event)">` +
+        `<div class="card-header"><div class="badges-container">${typeBadge}${nsfwBadge}</div>${checkbox}</div>` +
+        `${media}<figcaption title="${escapeCardText(card.name)}">${displayName}</figcaption></figure>`;
+}
+
+function isCardPayload(value) {
+    return typeof value === 'string' && value.startsWith('{"civitai_cards"');
+}
+
+// Relays list_html_input to list_html in the browser, the returned value becomes the value of list_html
+function renderCardList(payload, current) {
+    const target = gradioApp().querySelector('#civitai_list_html .prose');
+
+    if (!isCardPayload(payload)) {
+        // HTML sent by the server (errors, setting turned off), gradio renders it
+        if (target && target.dataset.clientRendered) {
+            delete target.dataset.clientRendered;
+            // gradio skips rendering a value equal to the one it shows already
+            target.innerHTML = payload === current ? payload : '';
+        }
+        return payload;
+    }
+
+    if (target) {
+        target.innerHTML = cardListHTML(JSON.parse(payload));
+        target.dataset.clientRendered = '1';
+        setupCardMedia();
+        setupInfiniteScroll();
+    }
+    // Keep the value of list_html, cards are rendered above
+    return current;
+}
+
+// Select All is shown when there are 2 or more models to select
+function selectAllUpdate(value) {
+    let count = 0;
+    if (isCardPayload(value)) {
+        for (const group of JSON.parse(value).groups) {
+            count += group.cards.filter(card => card.status !== 'civmodelcardinstalled').length;
+        }
+    } else if (value) {
+        count = value.split('model-checkbox').length - 1;
+    }
+    return {__type__: 'update', visible: count >= 2};
+}
+
+function cardListHTML(data) {
+    const parts = [data.notice, '<div class="column civmodellist">'];
+    if (data.sorted) {
+        parts.push('<div class="date-sections-container">');
+        for (const group of data.groups) {
+            const counter = group.cards.length > 1 ? ` <span class="card-counter">${group.cards.length}</span>` : '';
+            parts.push(`<div class="date-section"><h4>${group.title}${counter}</h4><div class="card-row">`);
+            for (const card of group.cards) parts.push(cardTemplate(card, data));
+            parts.push('</div></div>');
+        }
+        parts.push('</div>');
+    } else {
+        for (const card of data.groups[0].cards) parts.push(cardTemplate(card, data));
+    }
+    parts.push('</div>');
+    return parts.join('');
+}
+
+// Card videos only load and play while they are in view, images pick a width matching the tile size
+let cardMediaObserver = null;
+let cardWidth = 12;
+
+function setupCardMedia() {
+    setTimeout(() => {
+        if (!cardMediaObserver) {
+            cardMediaObserver = new IntersectionObserver((entries) => {
+                entries.forEach(({ target, isIntersecting }) => {
+                    if (!isIntersecting) {
+                        if (!target.paused) target.pause();
+                    } else if (target.dataset.autoplay !== undefined) {
+                        target.preload = 'auto';
+                        target.play().catch(() => {});
+                    } else if (target.preload === 'none') {
+                        target.preload = 'metadata';
+                    }
+                });
+            }, { rootMargin: '200px 0px' });
+        }
+        gradioApp().querySelectorAll('#civitai_list_html .civmodelcard video:not([data-media-observed])').forEach((video) => {
+            video.dataset.mediaObserved = '1';
+            cardMediaObserver.observe(video);
+        });
+        updateCardImageSizes(gradioApp().querySelectorAll('#civitai_list_html .civmodelcard img[srcset]:not([data-sized])'));
+    }, 100);
+}
+
+function updateCardImageSizes(images) {
+    images.forEach((img) => {
+        img.sizes = `auto, ${cardWidth}em`;
+        img.dataset.sized = '1';
+    });
+}
+
+// === Infinite scroll ===
+// With the "Infinite scroll" setting the next page is appended when the last card comes into view.
+// Cards far outside the view are hollowed out (their content is kept detached) so the DOM stays small.
+const hollowCards = new WeakMap();
+let cardObserver = null;
+let loadMoreObserver = null;
+let loadingMore = 0;
+
+function hollowCard(card) {
+    if (hollowCards.has(card)) return;
+    const content = document.createDocumentFragment();
+    while (card.firstChild) content.appendChild(card.firstChild);
+    hollowCards.set(card, content);
+    card.innerHTML = '<div class="card-placeholder"></div>';
+}
+
+function restoreCard(card) {
+    const content = hollowCards.get(card);
+    if (!content) return;
+    hollowCards.delete(card);
+    card.replaceChildren(content);
+}
+
+function restoreAllCards() {
+    document.querySelectorAll('.civmodellist .civmodelcard').forEach(restoreCard);
+}
+
+function setupInfiniteScroll() {
+    if (!window.opts?.infinite_scroll) return;
+    setTimeout(() => {
+        loadingMore = 0;
+        if (cardObserver) cardObserver.disconnect();
+        cardObserver = new IntersectionObserver((entries) => {
+            entries.forEach((entry) => (entry.isIntersecting ? restoreCard(entry.target) : hollowCard(entry.target)));
+        }, { rootMargin: '2000px 0px' });
+        observeLastCard();
+    }, 100);
+}
+
+function observeLastCard() {
+    const list = gradioApp().querySelector('#civitai_list_html .civmodellist');
+    if (!list) return;
+    list.querySelectorAll('.civmodelcard:not([data-observed])').forEach((card) => {
+        card.dataset.observed = '1';
+        cardObserver.observe(card);
+    });
+
+    if (loadMoreObserver) loadMoreObserver.disconnect();
+    const cards = list.querySelectorAll('.civmodelcard');
+    if (!cards.length) return;
+    loadMoreObserver = new IntersectionObserver((entries) => {
+        if (entries.some((entry) => entry.isIntersecting)) requestMoreCards();
+    }, { rootMargin: '600px 0px' });
+    loadMoreObserver.observe(cards[cards.length - 1]);
+}
+
+function requestMoreCards() {
+    const nextButton = gradioApp().querySelector('#pageBtn2');
+    const output = gradioApp().querySelector('#load_more_trigger textarea');
+    // A request that got no answer is retried after 10 seconds
+    if (!output || (nextButton && nextButton.disabled) || Date.now() - loadingMore < 10000) return;
+    loadingMore = Date.now();
+    const randomNumber = Math.floor(Math.random() * 1000);
+    output.value = String(randomNumber).padStart(3, '0');
+    updateInput(output);
+}
+
+// Pages kept in the list by infinite scroll, same as MORE_PAGES_LIMIT in civitai_api.py
+const MORE_PAGES_LIMIT = 10;
+
+function sectionTitle(dateSection) {
+    return dateSection.querySelector('h4').firstChild.textContent.trim();
+}
+
+function updateSectionCounter(dateSection) {
+    const count = dateSection.querySelector('.card-row').children.length;
+    const counter = count > 1 ? ` <span class="card-counter">${count}</span>` : '';
+    dateSection.querySelector('h4').innerHTML = `${sectionTitle(dateSection)}${counter}`;
+}
+
+function appendCardList(payload) {
+    loadingMore = 0;
+    const list = gradioApp().querySelector('#civitai_list_html .civmodellist');
+    if (!payload || !list) return;
+
+    const template = document.createElement('template');
+    template.innerHTML = isCardPayload(payload) ? cardListHTML(JSON.parse(payload)) : payload;
+    const newList = template.content.querySelector('.civmodellist');
+    if (!newList) return;
+
+    // Cards of the first page have no batch, every appended page gets the next one
+    const batch = (Number(list.dataset.batches) || 0) + 1;
+    list.dataset.batches = batch;
+    newList.querySelectorAll('.civmodelcard').forEach((card) => { card.dataset.batch = batch; });
+
+    const container = list.querySelector('.date-sections-container');
+    if (container) {
+        // Cards published on the same day as the last section are merged into it
+        newList.querySelectorAll('.date-section').forEach((section) => {
+            const last = container.lastElementChild;
+            if (last && sectionTitle(last) === sectionTitle(section)) {
+                const row = last.querySelector('.card-row');
+                section.querySelectorAll('.civmodelcard').forEach((card) => row.appendChild(card));
+                updateSectionCounter(last);
+            } else {
+                container.appendChild(section);
+            }
+        });
+    } else {
+        newList.querySelectorAll(':scope > .civmodelcard').forEach((card) => list.appendChild(card));
+    }
+    dropCardBatches(list, batch - MORE_PAGES_LIMIT);
+
+    const hideToggle = gradioApp().querySelector('#toggle5 input, #toggle5L input');
+    if (hideToggle) hideInstalled(hideToggle.checked);
+    setupCardMedia();
+    observeLastCard();
+}
+
+// The server drops the models of the oldest pages, their cards are removed and deselected too
+function dropCardBatches(list, lastBatch) {
+    if (lastBatch < 0) return;
+    const sections = new Set();
+    list.querySelectorAll('.civmodelcard').forEach((card) => {
+        if ((Number(card.dataset.batch) || 0) > lastBatch) return;
+        const checkbox = card.querySelector('.model-checkbox');
+        if (checkbox && checkbox.checked) {
+            checkbox.checked = false;
+            checkbox.dispatchEvent(new Event('change'));
+        }
+        const section = card.closest('.date-section');
+        if (section) sections.add(section);
+        card.remove();
+    });
+    sections.forEach((section) => {
+        if (section.querySelector('.civmodelcard')) updateSectionCounter(section);
+        else section.remove();
+    });
+}
+
+// Sample images of the model page, sent by update_model_gallery after the page itself
+let modelGallery = null;
+
+function insertModelGallery(payload) {
+    modelGallery = payload ? JSON.parse(payload) : null;
+    applyModelGallery();
+}
+
+// Swaps the loading placeholder of the same version for the images, the rest of the page stays as it is
+function applyModelGallery() {
+    if (!modelGallery) return;
+    const placeholder = gradioApp().querySelector(`#civitai_preview_html .sampleimgs-loading[data-version="${modelGallery.version}"]`);
+    if (placeholder) placeholder.outerHTML = modelGallery.html;
+}
+
 // === ANXETY EDITs ===
 // Updates card border
 function updateCard(modelNameWithSuffix) {
@@ -862,6 +1170,7 @@ function removeDlItem(dl_id, element) {
 
 // Selects all models
 function selectAllModels() {
+    restoreAllCards();
     const checkboxes = Array.from(document.querySelectorAll('.model-checkbox'));
     const allChecked = checkboxes.every((checkbox) => checkbox.checked);
     const allUnchecked = checkboxes.every((checkbox) => !checkbox.checked);
@@ -875,6 +1184,7 @@ function selectAllModels() {
 // Deselects all models
 function deselectAllModels() {
     setTimeout(() => {
+        restoreAllCards();
         const checkboxes = Array.from(document.querySelectorAll('.model-checkbox'));
         checkboxes.filter((checkbox) => checkbox.checked).forEach(sendClick);
     }, 1000);
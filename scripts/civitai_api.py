@@ -2,12 +2,14 @@ import urllib.parse
 import datetime
 import requests
 import platform
+import threading
 import json
+import copy
 import os
 import re
 import gradio as gr
 from datetime import datetime, timezone
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from pathlib import Path
 from html import escape
 from io import BytesIO
@@ -21,7 +23,13 @@ from modules.shared import cmd_opts, opts
 # === Extension imports ===
 import scripts.civitai_download as _download
 import scripts.civitai_file_manage as _file
+import scripts.civitai_folders as _folders
 import scripts.civitai_global as gl
+import scripts.civitai_api_cache as _api_cache
+import scripts.civitai_compact as _compact
+import scripts.civitai_json as _json
+import scripts.civitai_ratelimit as _limit
+import scripts.civitai_thumbs as _thumbs
 from scripts.civitai_global import print, debug_print
 
 
@@ -127,8 +135,368 @@ def contenttype_folder(content_type, desc=None, fromCheck=False, custom_folder=N
 
     return None
 
-def model_list_html(json_data):
-    def filter_versions(item, hide_early_access, current_time):
+## === ANXETY EDITs ===
+# Static card fragments, built once instead of for every card
+WIDTH_PATTERN = re.compile(r'/width=\d+')
+EXTENSION_PATTERN = re.compile(r'\.\w+$')
+# Widths offered to the browser for card images, the tile size slider goes up to ~20em
+SRCSET_WIDTHS = (256, 384, 512, 768)
+EARLY_ACCESS_ICON = (
+    '<svg class="early-access-icon" viewBox="0 0 24 24" xmlns="http://www.w3.org/2000/svg" fill="currentColor">'
+    '<path d="M13 2L3 14h9l-1 8 10-12h-8z"/>'
+    '</svg>'
+)
+NSFW_BADGE = (
+    '<div class="nsfw-badge">'
+    '<svg class="nsfw-badge-icon" viewBox="0 0 20 20" xmlns="http://www.w3.org/2000/svg" fill="currentColor">'
+    '<circle cx="10" cy="10" r="10"/>'
+    '<text x="10" y="11" font-size="12" text-anchor="middle" dominant-baseline="middle" font-family="Arial" font-weight="bold" fill="#fff">!</text>'
+    '</svg>'
+    'NSFW'
+    '</div>'
+)
+
+# Static parts of the model page
+ALLOW_ICON = '<svg width="16" height="16" viewBox="0 1.5 24 24" stroke-width="4" stroke-linecap="round" stroke="lime"><path d="M5 12l5 5l10 -10"></path></svg>'
+DENY_ICON = '<svg width="16" height="16" viewBox="0 1.5 24 24" stroke-width="4" stroke-linecap="round" stroke="red"><path d="M18 6l-12 12"></path><path d="M6 6l12 12"></path></svg>'
+IMAGE_VIEWER_OVERLAY = (
+    '<div id="image-viewer-overlay" class="viewer-overlay">'
+    '<div class="viewer-content">'
+    '<img id="viewer-image" class="viewer-media" src="" alt="">'
+    '<video id="viewer-video" class="viewer-media" style="display: none;" controls muted>'
+    '<source src="" type="video/mp4">'
+    '</video>'
+    '</div>'
+    '</div>'
+)
+
+def _no_metadata_block(no_meta_type, icon_svg):
+    return (
+        '<div class="image-metadata-empty">'
+        '<div class="empty-state-icon">'
+        f'{icon_svg}'
+        '</div>'
+        '<div class="empty-state-text">'
+        f'<h4>No metadata available</h4>'
+        f'<p>No generation settings are available for this {no_meta_type}.</p>'
+        '</div>'
+        '</div>'
+    )
+
+NO_METADATA_VIDEO = _no_metadata_block('video', (
+    '<svg width="48" height="48" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="1.5" stroke-linecap="round" stroke-linejoin="round">'
+    '<rect x="3" y="5" width="18" height="14" rx="2" ry="2"></rect>'
+    '<polygon points="10,9 16,12 10,15"></polygon>'
+    '</svg>'
+))
+NO_METADATA_IMAGE = _no_metadata_block('image', (
+    '<svg width="48" height="48" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="1.5" stroke-linecap="round" stroke-linejoin="round">'
+    '<path d="M14.5 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V7.5L14.5 2z"></path>'
+    '<polyline points="14,2 14,8 20,8"></polyline>'
+    '<path d="M12 18v-4"></path>'
+    '<path d="M12 10h.01"></path>'
+    '</svg>'
+))
+
+# Try PNG first, then fallback to JPEG if PNG does not exist
+NO_PREVIEW_IMG = '<img src="./file=html/card-no-preview.png" onerror="this.onerror=null;this.src=\'./file=html/card-no-preview.jpg\';"></img>'
+# Previews saved next to installed models, save_preview writes .preview.png
+PREVIEW_EXTENSIONS = ('.preview.png', '.preview.jpg', '.preview.jpeg', '.preview.webp')
+LOCAL_URL_SAFE = '/:\\'
+# Sample images of a model page until update_model_gallery sends them, swapped by insertModelGallery (civitai-html.js)
+GALLERY_LOADING = '<div class="sampleimgs-loading" data-version="{version_id}">Loading images...</div>'
+# Installed file found while building a model page, reused by update_model_gallery
+GALLERY_CACHE_SIZE = 64
+_gallery_installed = OrderedDict()
+_gallery_lock = threading.Lock()
+
+# Pages kept loaded by infinite scroll, same as MORE_PAGES_LIMIT in civitai-html.js
+MORE_PAGES_LIMIT = 10
+# Rendered cards by model, first version, install state and display options
+CARD_CACHE_SIZE = 2000
+_card_cache = OrderedDict()
+_card_cache_lock = threading.Lock()
+
+def forget_model_card(model_id):
+    """Drop the cached cards of a model, called when its install state changes."""
+    with _card_cache_lock:
+        for key in [key for key in _card_cache if key[0] == model_id]:
+            del _card_cache[key]
+
+def card_options():
+    """Settings used by get_model_card, read once per page instead of once per card."""
+    return {
+        # Videos are started by civitai-html.js once they come into view
+        'playback': 'data-autoplay loop' if getattr(opts, 'video_playback', True) else '',
+        'resize_preview': getattr(opts, 'resize_preview_cards', True),
+        'resize_size': getattr(opts, 'preview_resize_size', 512),
+        'show_nsfw_badge': getattr(opts, 'show_nsfw_badge', True),
+        'thumbnail_cache': getattr(opts, 'thumbnail_cache', False),
+        'local_previews': getattr(opts, 'local_previews', True)
+    }
+
+def card_media_url(images, card_opts):
+    """Media type and (resized) URL of a card preview, (None, None) without images."""
+    if not images:
+        return None, None
+
+    media_type = images[0].get('type')
+    image_url = images[0].get('url')
+    resize_preview = card_opts['resize_preview']
+    width = f"/width={card_opts['resize_size']}"
+
+    if media_type == 'video':
+        if resize_preview:
+            # For videos, replace or add width parameter
+            if '/width=' in image_url:
+                image_url = WIDTH_PATTERN.sub(width, image_url)
+            else:
+                image_url = image_url.replace('transcode=true,', f"transcode=true,width={card_opts['resize_size']},")
+        else:
+            image_url = image_url.replace('width=', 'transcode=true,width=')
+    elif resize_preview and media_type == 'image' and '/width=' in image_url:
+        # For images, modify the URL to request specific size
+        image_url = WIDTH_PATTERN.sub(width, image_url)
+    return media_type, image_url
+
+def card_image_url(image_url, width, card_opts):
+    """Card image URL, pointing to the local thumbnail cache when it is enabled."""
+    if card_opts['thumbnail_cache']:
+        return _thumbs.proxied_url(image_url, width)
+    return image_url
+
+def card_srcset(image_url, card_opts):
+    """Resized variants of a card image, the browser picks one matching the tile size."""
+    if not card_opts['resize_preview'] or '/width=' not in image_url:
+        return ''
+    return ', '.join(
+        f"{card_image_url(WIDTH_PATTERN.sub(f'/width={width}', image_url), width, card_opts)} {width}w"
+        for width in SRCSET_WIDTHS
+    )
+
+def video_poster(video_url):
+    """Still frame shown until a card video plays, the image CDN renders it with anim=false."""
+    if 'transcode=true' in video_url:
+        poster_url = video_url.replace('transcode=true', 'anim=false,transcode=true', 1)
+    elif '/width=' in video_url:
+        # Default card URLs only have a width segment (resize_preview on), add the option to it
+        poster_url = video_url.replace('/width=', '/anim=false,width=', 1)
+    else:
+        return ''
+    return EXTENSION_PATTERN.sub('.jpeg', poster_url)
+
+def card_media(images, card_opts, preview_url=None):
+    """Image or video preview tag of a card, media only loads once the card comes into view."""
+    if preview_url:
+        # Installed model with a saved preview, no request to the CDN
+        return f'<img src="{escape(preview_url)}" loading="lazy" decoding="async"></img>'
+    media_type, image_url = card_media_url(images, card_opts)
+    if not image_url:
+        return NO_PREVIEW_IMG
+    if media_type == 'video':
+        return (
+            f'<video class="video-bg" {card_opts["playback"]} muted playsinline preload="none" poster="{escape(video_poster(image_url))}">'
+            f'<source src="{escape(image_url)}" type="video/mp4"></video>'
+        )
+    srcset = card_srcset(image_url, card_opts)
+    image_url = card_image_url(image_url, card_opts['resize_size'] if card_opts['resize_preview'] else 1024, card_opts)
+    if srcset:
+        return f'<img src="{escape(image_url)}" srcset="{escape(srcset)}" sizes="auto, 12em" loading="lazy" decoding="async"></img>'
+    return f'<img src="{escape(image_url)}" loading="lazy" decoding="async"></img>'
+
+def card_install_status(item, existing_files, existing_files_sha256):
+    """
+    Install state of a card and the path of the installed file (its model file or .json), or ('', None).
+    'civmodelcardinstalled' if the newest version is installed, 'civmodelcardoutdated' for an older one.
+    """
+    for index, version in enumerate(item.get('modelVersions', [])):
+        for file in version.get('files', []):
+            file_name, file_extension = os.path.splitext(file['name'])
+            path = existing_files.get(f'{file_name}_{file["id"]}{file_extension}'.lower())
+            if not path:
+                file_sha256 = normalize_sha256(file.get('hashes', {}).get('SHA256', ''))
+                path = existing_files_sha256.get(file_sha256) if file_sha256 else None
+            if path:
+                return 'civmodelcardoutdated' if index else 'civmodelcardinstalled', path
+    return '', None
+
+def local_file_url(path):
+    """URL of a local file served by gradio, quoted so it also works inside srcset."""
+    return f"./file={urllib.parse.quote(path, safe=LOCAL_URL_SAFE)}"
+
+def local_preview(path, existing_files):
+    """Preview saved next to an installed model (<name>.preview.png), path of the model or its .json."""
+    stem = os.path.splitext(os.path.basename(path))[0].lower()
+    for extension in PREVIEW_EXTENSIONS:
+        preview = existing_files.get(f"{stem}{extension}")
+        if preview and os.path.dirname(preview) == os.path.dirname(path):
+            return preview
+    return None
+
+def card_local_preview(item, existing_files, existing_files_sha256, card_opts):
+    """Install state of a card and the URL of its local preview, when local_previews is enabled."""
+    installstatus, path = card_install_status(item, existing_files, existing_files_sha256)
+    if not path or not card_opts['local_previews']:
+        return installstatus, None
+    preview = local_preview(path, existing_files)
+    return installstatus, local_file_url(preview) if preview else None
+
+def get_model_card(item, existing_files, existing_files_sha256, card_opts):
+    """Build HTML for a single model card (civmodelcard - Browser Card), returns (html, date)."""
+    model_id = item.get('id')
+    first_version = item['modelVersions'][0] if item['modelVersions'] else {}
+    installstatus, preview_url = card_local_preview(item, existing_files, existing_files_sha256, card_opts)
+    key = (model_id, first_version.get('id'), installstatus, preview_url, first_version.get('availability'), *card_opts.values())
+    with _card_cache_lock:
+        card = _card_cache.get(key)
+        if card:
+            _card_cache.move_to_end(key)
+            return card
+
+    card = build_model_card(item, first_version, installstatus, card_opts, preview_url)
+    with _card_cache_lock:
+        _card_cache[key] = card
+        if len(_card_cache) > CARD_CACHE_SIZE:
+            _card_cache.popitem(last=False)
+    return card
+
+def build_model_card(item, first_version, installstatus, card_opts, preview_url=None):
+    model_id = item.get('id')
+    model_name = item.get('name', '')
+    model_type = item['type']
+    is_nsfw = is_model_nsfw(item)
+    base_model = first_version.get('baseModel', 'Not Found')
+    date = first_version['publishedAt'].split('T')[0] if 'publishedAt' in first_version else 'Not Found'
+    early_access = is_early_access(first_version) if first_version else False
+
+    # Model name for JS and HTML
+    model_name_js = model_name.replace("'", "\\'")
+    model_string = escape(f"{model_name_js} ({model_id})")
+    display_name = escape(model_name[:35] + '...' if len(model_name) > 35 else model_name)
+
+    ## Badges
+    # Model Type Badge ( + Early Access), gold with a lightning icon for early access
+    if early_access:
+        model_type_badge = f'<div class="model-type-badge {model_type.lower()} early-access-badge">{EARLY_ACCESS_ICON}{get_display_type(model_type)}</div>'
+    else:
+        model_type_badge = f'<div class="model-type-badge {model_type.lower()}">{get_display_type(model_type)}</div>'
+
+    # NSFW Badge - only show for nsfw cards and if setting is enabled
+    nsfw_badge = NSFW_BADGE if is_nsfw and card_opts['show_nsfw_badge'] else ''
+
+    # ModelCard HTML (Header)
+    parts = [
+        f'<figure class="civmodelcard {"civcardnsfw" if is_nsfw else ""} {"early-access" if early_access else ""} {installstatus}" base-model="{base_model}" date="{date}" '
+        f'onclick="select_model(\'{model_string}\', event)">'
+        '<div class="card-header">'
+        f'<div class="badges-container">{model_type_badge}{nsfw_badge}</div>'
+    ]
+
+    if installstatus != 'civmodelcardinstalled':
+        parts.append(
+            '<div class="checkbox-container">'
+            f'<input type="checkbox" class="model-checkbox" id="checkbox-{model_string}" '
+            f'onchange="multi_model_select(\'{model_string}\', \'{model_type}\', this.checked)">'
+            f'<label for="checkbox-{model_string}" class="custom-checkbox">'
+            '<span class="checkbox-checkmark"></span>'
+            '</label>'
+            '</div>'
+        )
+
+    # ModelCard HTML (Footer)
+    parts.append(
+        '</div>'
+        f'{card_media(first_version.get("images", []), card_opts, preview_url)}'
+        f'<figcaption title="{escape(model_name)}">{display_name}</figcaption></figure>'
+    )
+    return ''.join(parts), date
+
+def format_card_date(date):
+    """Title of a date section, 'March 05, 2024' for '2024-03-05'."""
+    if date == 'Not Found':
+        return 'Unknown Date'
+    try:
+        return datetime.strptime(date, '%Y-%m-%d').strftime('%B %d, %Y')
+    except:
+        return date  # Fallback to original format
+
+def render_cards(items, existing_files, existing_files_sha256, sort_newest=False, card_opts=None):
+    """Join the cards of a page into the civmodellist HTML, grouped by publish date if sort_newest."""
+    card_opts = card_opts or card_options()
+    parts = ['<div class="column civmodellist">']
+
+    if not sort_newest:
+        for item in items:
+            parts.append(get_model_card(item, existing_files, existing_files_sha256, card_opts)[0])
+        parts.append('</div>')
+        return ''.join(parts)
+
+    sorted_models = defaultdict(list)
+    for item in items:
+        model_card, date = get_model_card(item, existing_files, existing_files_sha256, card_opts)
+        sorted_models[date].append(model_card)
+
+    parts.append('<div class="date-sections-container">')
+    for date, cards in sorted(sorted_models.items(), reverse=True):
+        # Add card counter (only show if more than 1 card)
+        counter_html = f' <span class="card-counter">{len(cards)}</span>' if len(cards) > 1 else ''
+        parts.append(f'<div class="date-section"><h4>{format_card_date(date)}{counter_html}</h4><div class="card-row">')
+        parts.extend(cards)
+        parts.append('</div></div>')
+    parts.append('</div></div>')
+    return ''.join(parts)
+
+def card_data(item, existing_files, existing_files_sha256, card_opts):
+    """Fields of a card for renderCardList in civitai-html.js, keys are kept short to keep pages small."""
+    first_version = item['modelVersions'][0] if item['modelVersions'] else {}
+    media_type, image_url = card_media_url(first_version.get('images', []), card_opts)
+    installstatus, preview_url = card_local_preview(item, existing_files, existing_files_sha256, card_opts)
+    return {
+        'id': item.get('id'),
+        'name': item.get('name', ''),
+        'type': item['type'],
+        'label': get_display_type(item['type']),
+        'nsfw': is_model_nsfw(item),
+        'ea': is_early_access(first_version) if first_version else False,
+        'status': installstatus,
+        'base': first_version.get('baseModel', 'Not Found'),
+        'date': first_version['publishedAt'].split('T')[0] if 'publishedAt' in first_version else 'Not Found',
+        'media': media_type,
+        'url': image_url,
+        'poster': video_poster(image_url) if media_type == 'video' else None,
+        'local': preview_url
+    }
+
+def render_cards_json(items, existing_files, existing_files_sha256, sort_newest=False, card_opts=None, notice=''):
+    """Cards of a page as compact JSON, rendered in the browser by renderCardList (civitai-html.js)."""
+    card_opts = card_opts or card_options()
+    cards = [card_data(item, existing_files, existing_files_sha256, card_opts) for item in items]
+    if sort_newest:
+        sorted_cards = defaultdict(list)
+        for card in cards:
+            sorted_cards[card['date']].append(card)
+        groups = [{'title': format_card_date(date), 'cards': group} for date, group in sorted(sorted_cards.items(), reverse=True)]
+    else:
+        groups = [{'title': None, 'cards': cards}]
+
+    # civitai_cards has to stay the first key, the payload is recognized by its prefix
+    return _json.dumps({
+        'civitai_cards': 1,
+        'notice': notice,
+        'playback': card_opts['playback'],
+        'nsfwBadge': card_opts['show_nsfw_badge'],
+        'widths': SRCSET_WIDTHS if card_opts['resize_preview'] else [],
+        'thumbWidth': (card_opts['resize_size'] if card_opts['resize_preview'] else 1024) if card_opts['thumbnail_cache'] else 0,
+        'sorted': sort_newest,
+        'groups': groups
+    })
+
+def model_list_html(json_data, notice=''):
+    """
+    Cards of a listing page for list_html_input. With the client_side_cards setting this is
+    a compact JSON payload rendered by civitai-html.js instead of the finished HTML.
+    """
+    def filter_versions(item, hide_early_access):
         """Filter model versions based on file presence and early access status."""
         versions = []
         for version in item.get('modelVersions', []):
@@ -140,159 +508,35 @@ def model_list_html(json_data):
         return versions
 
     def collect_existing_files(model_folders):
-        """Collect existing file names and SHA256 hashes from model folders."""
-        files_set = set()
-        sha256_set = set()
+        """Collect existing file names and SHA256 hashes from model folders, mapped to their paths."""
+        files_dict = {}
+        sha256_dict = {}
         for folder in model_folders:
-            for root, _, files in os.walk(folder, followlinks=True):
+            for root, _, files in _folders.walk(folder):
                 for file in files:
-                    files_set.add(file.lower())
+                    files_dict[file.lower()] = os.path.join(root, file)
                     if file.endswith('.json'):
                         json_path = os.path.join(root, file)
                         try:
                             with open(json_path, 'r', encoding='utf-8') as f:
-                                json_file = json.load(f)
+                                json_file = _json.load(f)
                                 if isinstance(json_file, dict):
                                     sha256 = normalize_sha256(json_file.get('sha256'))
                                     if sha256:
-                                        sha256_set.add(sha256)
+                                        sha256_dict[sha256] = json_path
                                 else:
                                     print(f'Invalid JSON data in {json_path}. Expected a dictionary.')
                         except Exception as e:
                             print(f'Error decoding JSON in {json_path}: {e}')
-        return files_set, sha256_set
-
-    ## === ANXETY EDITs ===
-    def get_model_card(item, existing_files, existing_files_sha256, playback):
-        """Build HTML for a single model card (civmodelcard - Browser Card)"""
-        model_id = item.get('id')
-        model_name = item.get('name', '')
-        is_nsfw = is_model_nsfw(item)
-        nsfw_class = 'civcardnsfw' if is_nsfw else ''
-        base_model = item['modelVersions'][0].get('baseModel', 'Not Found') if item['modelVersions'] else 'Not Found'
-        date = item['modelVersions'][0].get('publishedAt', 'Not Found').split('T')[0] if item['modelVersions'] and 'publishedAt' in item['modelVersions'][0] else 'Not Found'
-
-        early_access = is_early_access(item['modelVersions'][0]) if item['modelVersions'] else False
-        early_access_class = 'early-access' if early_access else ''
-
-        # Image or video preview
-        images = item['modelVersions'][0].get('images', []) if item['modelVersions'] else []
-        if images:
-            media_type = images[0].get('type')
-            image_url = images[0].get('url')
-
-            # Apply resize if enabled
-            resize_preview = getattr(opts, 'resize_preview_cards', True)
-            resize_size = getattr(opts, 'preview_resize_size', 512)
-
-            if resize_preview and media_type == 'image':
-                # For images, modify the URL to request specific size
-                image_url = re.sub(r'/width=\d+', f'/width={resize_size}', image_url)
-
-            if media_type == 'video':
-                if resize_preview:
-                    # For videos, replace or add width parameter
-                    if '/width=' in image_url:
-                        image_url = re.sub(r'/width=\d+', f'/width={resize_size}', image_url)
-                    else:
-                        image_url = image_url.replace('transcode=true,', f'transcode=true,width={resize_size},')
-                else:
-                    image_url = image_url.replace('width=', 'transcode=true,width=')
-                imgtag = f'<video class="video-bg" {playback} muted playsinline><source src="{image_url}" type="video/mp4"></video>'
-            else:
-                imgtag = f'<img src="{image_url}"></img>'
-        else:
-            # Try PNG first, then fallback to JPEG if PNG does not exist
-            imgtag = '<img src="./file=html/card-no-preview.png" onerror="this.onerror=null;this.src=\'./file=html/card-no-preview.jpg\';"></img>'
-
-        # Install status
-        installstatus = ''
-        for version in reversed(item.get('modelVersions', [])):
-            for file in version.get('files', []):
-                file_name, file_extension = os.path.splitext(file['name'])
-                file_name_full = f'{file_name}_{file["id"]}{file_extension}'
-                file_sha256 = normalize_sha256(file.get('hashes', {}).get('SHA256', ''))
-                name_match = file_name_full.lower() in existing_files
-                sha256_match = file_sha256 and file_sha256 in existing_files_sha256
-                if name_match or sha256_match:
-                    if version == item['modelVersions'][0]:
-                        installstatus = 'civmodelcardinstalled'
-                    else:
-                        installstatus = 'civmodelcardoutdated'
-
-        # Model name for JS and HTML
-        model_name_js = model_name.replace("'", "\\'")
-        model_string = escape(f"{model_name_js} ({model_id})")
-        display_name = escape(model_name[:35] + '...' if len(model_name) > 35 else model_name)
-        full_name = escape(model_name)
-
-        ## Badges
-        # Model Type Badge ( + Early Access)
-        if early_access:
-            # Gold badge with a lightning icon
-            model_type_badge = (
-                f'<div class="model-type-badge {item["type"].lower()} early-access-badge">'
-                '<svg class="early-access-icon" viewBox="0 0 24 24" xmlns="http://www.w3.org/2000/svg" fill="currentColor">'
-                '<path d="M13 2L3 14h9l-1 8 10-12h-8z"/>'
-                '</svg>'
-                f'{get_display_type(item["type"])}'
-                '</div>'
-            )
-        else:
-            model_type_badge = f'<div class="model-type-badge {item["type"].lower()}">{get_display_type(item["type"])}</div>'
-
-        # NSFW Badge - only show for nsfw cards and if setting is enabled
-        show_nsfw_badge = getattr(opts, 'show_nsfw_badge', True)
-        if is_nsfw and show_nsfw_badge:
-            nsfw_badge = (
-                '<div class="nsfw-badge">'
-                '<svg class="nsfw-badge-icon" viewBox="0 0 20 20" xmlns="http://www.w3.org/2000/svg" fill="currentColor">'
-                '<circle cx="10" cy="10" r="10"/>'
-                '<text x="10" y="11" font-size="12" text-anchor="middle" dominant-baseline="middle" font-family="Arial" font-weight="bold" fill="#fff">!</text>'
-                '</svg>'
-                'NSFW'
-                '</div>'
-            )
-        else:
-            nsfw_badge = ''
-
-        # ModelCard HTML (Header)
-        card_html = (
-            f'<figure class="civmodelcard {nsfw_class} {early_access_class} {installstatus}" base-model="{base_model}" date="{date}" '
-            f'onclick="select_model(\'{model_string}\', event)">'
-            f'<div class="card-header">'
-            f'<div class="badges-container">{model_type_badge}{nsfw_badge}</div>'
-        )
-
-        if installstatus != 'civmodelcardinstalled':
-            card_html += (
-                f'<div class="checkbox-container">'
-                f'<input type="checkbox" class="model-checkbox" id="checkbox-{model_string}" '
-                f'onchange="multi_model_select(\'{model_string}\', \'{item["type"]}\', this.checked)">'
-                f'<label for="checkbox-{model_string}" class="custom-checkbox">'
-                f'<span class="checkbox-checkmark"></span>'
-                f'</label>'
-                f'</div>'
-            )
-
-        # ModelCard HTML (Footer)
-        card_html += (
-            f'</div>'
-            f'{imgtag}'
-            f'<figcaption title="{full_name}">{display_name}</figcaption></figure>'
-        )
-        return card_html, date
+        return files_dict, sha256_dict
 
     # Main function logic
-    video_playback = getattr(opts, 'video_playback', True)
-    playback = 'autoplay loop' if video_playback else ''
     hide_early_access = getattr(opts, 'hide_early_access', True)
-    current_time = datetime.now(timezone.utc)
 
     # Filter model versions and items
     filtered_items = []
     for item in json_data.get('items', []):
-        versions = filter_versions(item, hide_early_access, current_time)
+        versions = filter_versions(item, hide_early_access)
         if versions:
             item['modelVersions'] = versions
             filtered_items.append(item)
@@ -305,49 +549,9 @@ def model_list_html(json_data):
     }
     existing_files, existing_files_sha256 = collect_existing_files(model_folders)
 
-    # Build HTML
-    HTML = '<div class="column civmodellist">'
-    sorted_models = {} if gl.sortNewest else None
-
-    for item in json_data['items']:
-        model_card, date = get_model_card(item, existing_files, existing_files_sha256, playback)
-        if gl.sortNewest:
-            if date not in sorted_models:
-                sorted_models[date] = []
-            sorted_models[date].append(model_card)
-        else:
-            HTML += model_card
-
-    if gl.sortNewest:
-        HTML += '<div class="date-sections-container">'
-        for date, cards in sorted(sorted_models.items(), reverse=True):
-            if not cards:
-                continue
-
-            if date == 'Not Found':
-                formatted_date = 'Unknown Date'
-            else:
-                try:
-                    date_obj = datetime.strptime(date, '%Y-%m-%d')
-                    formatted_date = date_obj.strftime('%B %d, %Y')
-                except:
-                    formatted_date = date  # Fallback to original format
-
-            # Add card counter (only show if more than 1 card)
-            card_count = len(cards)
-            counter_html = f' <span class="card-counter">{card_count}</span>' if card_count > 1 else ''
-            HTML += (
-                f'<div class="date-section">'
-                f'<h4>{formatted_date}{counter_html}</h4>'
-                '<div class="card-row">'
-            )
-            for card in cards:
-                HTML += card
-            HTML += '</div></div>'
-        HTML += '</div>'
-
-    HTML += '</div>'
-    return HTML
+    if getattr(opts, 'client_side_cards', False):
+        return render_cards_json(json_data['items'], existing_files, existing_files_sha256, gl.sortNewest, card_options(), notice)
+    return notice + render_cards(json_data['items'], existing_files, existing_files_sha256, gl.sortNewest, card_options())
 
 def _search_by_sha256(sha256_hash):
     """Search for a model by SHA256 hash."""
@@ -362,10 +566,10 @@ def _search_by_sha256(sha256_hash):
     proxies, ssl = get_proxies()
 
     try:
-        response = requests.get(api_url, headers=headers, timeout=(60, 30), proxies=proxies, verify=ssl)
+        response = _limit.get(api_url, headers=headers, timeout=(60, 30), proxies=proxies, verify=ssl, max_retries=_limit.INTERACTIVE_RETRIES)
 
         if response.status_code == 200:
-            data = response.json()
+            data = _json.loads(response.content)
             if 'error' in data:
                 return 'sha256_not_found'
 
@@ -375,10 +579,10 @@ def _search_by_sha256(sha256_hash):
                 return 'not_found'
 
             model_url = f"https://civitai.com/api/v1/models/{model_id}"
-            model_response = requests.get(model_url, headers=headers, timeout=(60, 30), proxies=proxies, verify=ssl)
+            model_response = _limit.get(model_url, headers=headers, timeout=(60, 30), proxies=proxies, verify=ssl, max_retries=_limit.INTERACTIVE_RETRIES)
 
             if model_response.status_code == 200:
-                model_data = model_response.json()
+                model_data = _json.loads(model_response.content)
                 return {
                     'items': [model_data],
                     'metadata': {
@@ -392,6 +596,8 @@ def _search_by_sha256(sha256_hash):
 
         elif response.status_code == 404:
             return 'sha256_not_found'
+        elif response.status_code == 429:
+            return 'throttled'
         elif response.status_code == 503:
             return 'offline'
         else:
@@ -516,7 +722,7 @@ def initial_model_page(content_type=None, sort_type=None, period_type=None, use_
     if not isinstance(gl.json_data, dict):
         HTML = api_error_msg(gl.json_data)
     else:
-        gl.json_data = insert_metadata(1)
+        gl.json_data = compact_listing(insert_metadata(1))
 
         metadata = gl.json_data['metadata']
         hasNext = 'nextPage' in metadata
@@ -531,7 +737,7 @@ def initial_model_page(content_type=None, sort_type=None, period_type=None, use_
                     model_list.append(f"{item['name']} ({item['id']})")
 
             max_page = max(gl.url_list.keys())
-            HTML = model_list_html(gl.json_data)
+            HTML = model_list_html(gl.json_data, _api_cache.stale_notice(gl.json_data))
 
     return (
         gr.Dropdown.update(choices=model_list, value='', interactive=True),     # Model List
@@ -542,7 +748,7 @@ def initial_model_page(content_type=None, sort_type=None, period_type=None, use_
         gr.Slider.update(value=current_page, maximum=max_page),                 # Page Slider
         gr.Button.update(interactive=False),                                    # Save Tags
         gr.Button.update(interactive=False),                                    # Save Images
-        gr.Button.update(interactive=False, visible=False if gl.isDownloading else True),  # Download Button
+        gr.Button.update(interactive=False, visible=False if gl.download_job.running else True),  # Download Button
         gr.Button.update(interactive=False, visible=False),                     # Delete Button
         gr.Textbox.update(interactive=False, value=None, visible=True),         # Install Path
         gr.Dropdown.update(choices=[], value='', interactive=False),            # Sub Folder List
@@ -576,7 +782,7 @@ def next_model_page(content_type, sort_type, period_type, use_search_term, searc
     else:
         next_page = current_page + 1 if isNext else current_page - 1
 
-        gl.json_data = insert_metadata(next_page, api_url)
+        gl.json_data = compact_listing(insert_metadata(next_page, api_url))
 
         metadata = gl.json_data['metadata']
         hasNext = 'nextPage' in metadata
@@ -587,7 +793,7 @@ def next_model_page(content_type, sort_type, period_type, use_search_term, searc
                 model_list.append(f"{item['name']} ({item['id']})")
 
         max_page = max(gl.url_list.keys())
-        HTML = model_list_html(gl.json_data)
+        HTML = model_list_html(gl.json_data, _api_cache.stale_notice(gl.json_data))
 
     return (
         gr.Dropdown.update(choices=model_list, value='', interactive=True),  # Model List
@@ -598,7 +804,7 @@ def next_model_page(content_type, sort_type, period_type, use_search_term, searc
         gr.Slider.update(value=next_page, maximum=max_page),  # Current Page
         gr.Button.update(interactive=False),  # Save Tags
         gr.Button.update(interactive=False),  # Save Images
-        gr.Button.update(interactive=False, visible=False if gl.isDownloading else True),  # Download Button
+        gr.Button.update(interactive=False, visible=False if gl.download_job.running else True),  # Download Button
         gr.Button.update(interactive=False, visible=False),  # Delete Button
         gr.Textbox.update(interactive=False, value=None),  # Install Path
         gr.Dropdown.update(choices=[], value='', interactive=False),  # Sub Folder List
@@ -609,6 +815,57 @@ def next_model_page(content_type, sort_type, period_type, use_search_term, searc
         gr.Textbox.update(value=None)  # Model Filename
     )
 
+def more_model_page(content_type, sort_type, period_type, use_search_term, search_term, current_page, base_filter, only_liked, nsfw, tile_count):
+    """Next page for infinite scroll, its cards get appended to the list by appendCardList (civitai-html.js)."""
+    content_type = convert_LORA_LoCon(content_type)
+    no_change = (
+        gr.Dropdown.update(),  # Model List
+        gr.Textbox.update(value=''),  # Appended HTML
+        gr.Button.update(),  # Next Page Button
+        gr.Slider.update()  # Current Page
+    )
+
+    # Changed filters are applied by a refresh, not by appending to the current list
+    current_inputs = (content_type, sort_type, period_type, use_search_term, search_term, tile_count, base_filter, nsfw)
+    if current_inputs != gl.previous_inputs or not isinstance(gl.json_data, dict) or 'nextPage' not in gl.json_data.get('metadata', {}):
+        return no_change
+
+    api_url = create_api_url(isNext=True)
+    json_data = request_civit_api(api_url)
+    if not isinstance(json_data, dict):
+        print(f"Couldn't load the next page: {json_data}")
+        return no_change
+
+    # The items of the last MORE_PAGES_LIMIT pages are kept so their cards can still be selected,
+    # appendCardList (civitai-html.js) removes the cards of the pages dropped here
+    previous_items = gl.json_data['items']
+    page_sizes = gl.json_data.get('page_sizes') or [len(previous_items)]
+    next_page = current_page + 1
+    gl.json_data = json_data
+    gl.json_data = compact_listing(insert_metadata(next_page, api_url))
+    HTML = model_list_html(gl.json_data)
+    items = previous_items + gl.json_data['items']
+    page_sizes = page_sizes + [len(gl.json_data['items'])]
+    if len(page_sizes) > MORE_PAGES_LIMIT:
+        items = items[sum(page_sizes[:-MORE_PAGES_LIMIT]):]
+        page_sizes = page_sizes[-MORE_PAGES_LIMIT:]
+    gl.json_data['items'] = items
+    gl.json_data['page_sizes'] = page_sizes
+
+    model_list = [f"{item['name']} ({item['id']})" for item in gl.json_data['items'] if item['modelVersions']]
+    return (
+        gr.Dropdown.update(choices=model_list),  # Model List
+        gr.Textbox.update(value=HTML),  # Appended HTML
+        gr.Button.update(interactive='nextPage' in gl.json_data['metadata']),  # Next Page Button
+        gr.Slider.update(value=next_page, maximum=max(gl.url_list.keys()))  # Current Page
+    )
+
+def compact_listing(json_data):
+    """Drop the parts of a listing page the browser never reads, unless they get saved as .api_info.json."""
+    if not getattr(opts, 'save_api_info', False):
+        _compact.compact_page(json_data)
+    return json_data
+
 def insert_metadata(page_nr, api_url=None):
     metadata = gl.json_data['metadata']
 
@@ -651,13 +908,13 @@ def update_model_versions(model_id, json_input=None):
                     version_filename = version_file['name']
                     version_files.add((version['name'], version_filename, file_sha256))
 
-            for root, _, files in os.walk(model_folder, followlinks=True):
+            for root, _, files in _folders.walk(model_folder):
                 for file in files:
                     if file.endswith('.json'):
                         try:
                             json_path = os.path.join(root, file)
                             with open(json_path, 'r', encoding='utf-8') as f:
-                                json_data = json.load(f)
+                                json_data = _json.load(f)
                                 if isinstance(json_data, dict):
                                     sha256 = normalize_sha256(json_data.get('sha256'))
                                     if sha256:
@@ -733,7 +990,144 @@ def extract_model_info(input_string):
 
     return name, int(id_number)
 
-def update_model_info(model_string=None, model_version=None, only_html=False, input_id=None, json_input=None, from_preview=False):
+def find_installed_file(model_folder, sha256_value, model_filename):
+    """Path of the .json (matched by SHA256) or model file (matched by name) of an installed version, or None."""
+    for root, dirs, files in _folders.walk(model_folder):
+        for filename in files:
+            if filename.endswith('.json'):
+                json_file_path = os.path.join(root, filename)
+                with open(json_file_path, 'r', encoding='utf-8') as f:
+                    try:
+                        data = _json.load(f)
+                        sha256 = normalize_sha256(data.get('sha256'))
+                        if sha256 and sha256 == sha256_value:
+                            return json_file_path
+                    except Exception as e:
+                        print(f"Error decoding JSON: {str(e)}")
+        # filename_check
+        for filename in files:
+            if filename.lower() == model_filename.lower() or filename.lower() == cleaned_name(model_filename).lower():
+                return os.path.join(root, filename)
+    return None
+
+def local_sample_image(installed_path, index):
+    """
+    URL of a saved copy of the index-th sample image of an installed model: <name>_{index}.png
+    written by save_images, or the preview for the first one.
+    """
+    stem = os.path.splitext(installed_path)[0]
+    # save_images writes elsewhere when a custom image location is set
+    if not getattr(opts, 'image_location', ''):
+        saved = f"{stem}_{index}.png"
+        if os.path.isfile(saved):
+            return local_file_url(saved)
+    if index == 0:
+        for extension in PREVIEW_EXTENSIONS:
+            if os.path.isfile(f"{stem}{extension}"):
+                return local_file_url(f"{stem}{extension}")
+    return None
+
+def sample_images_html(images, playback, meta_btn, from_preview=False, installed_path=None):
+    """Sample images of a model page with their generation data, saved copies are used for an installed model."""
+    image_index = 0
+    img_html = '<div class="sampleimgs">'
+
+    key_map = {
+        'prompt': 'Prompt',
+        'negativePrompt': 'Negative Prompt',
+        'Model': 'Model',
+        'sampler': 'Sampler',
+        'steps': 'Steps',
+        'cfgScale': 'CFG Scale',
+        'clipSkip': 'Clip Skip',
+        'seed': 'Seed',
+        'Size': 'Size',
+    }
+    preferred_order = ["prompt", "negativePrompt", "Model", "sampler", "steps", "cfgScale", "Clip skip", "seed", "Size"]
+
+    for idx, pic in enumerate(images):
+        index = f"preview_{idx}" if from_preview else idx
+        prompt_dict = pic.get('meta', {}) or {}
+        image_url = re.sub(r'/width=\d+', f'/width={pic.get("width", "")}', pic['url'])
+        is_video = pic.get('type') == 'video'
+
+        img_html += (
+            f'<div class="image-block">'
+            f'<div class="civitai-image-container">'
+        )
+
+        if is_video:
+            video_url = image_url.replace('width=', 'transcode=true,width=')
+            img_html += (
+                f'<video class="preview-media" data-sampleimg="true" {playback} muted playsinline onclick="openImageViewer(\'{escape(video_url)}\', \'video\')">'
+                f'<source src="{video_url}" type="video/mp4"></video>'
+            )
+            meta_button = False
+            prompt_dict = {}
+        else:
+            # srcset takes precedence over src in the browser, src stays the CivitAI URL for save_images
+            local_url = local_sample_image(installed_path, image_index) if installed_path else None
+            srcset = f' srcset="{escape(local_url)}"' if local_url else ''
+            image_index += 1
+            img_html += (
+                f'<img class="preview-media" data-sampleimg="true" src="{image_url}"{srcset} alt="Model preview" onclick="openImageViewer(\'{escape(image_url)}\', \'image\')">'
+            )
+            meta_button = bool(prompt_dict.get('prompt'))
+
+        if meta_button:
+            img_html += (
+                '<div class="civitai_txt2img">'
+                f'<label onclick="sendImgUrl(\'{escape(image_url)}\')" class="civitai-txt2img-btn">Send to txt2img</label>'
+                '</div>'
+            )
+        img_html += '</div>'  # close .civitai-image-container
+
+        if prompt_dict:
+            img_html += (
+                '<div id="image_info">'
+                '<dl>'
+            )
+            for key in preferred_order:
+                if key in prompt_dict:
+                    value = prompt_dict[key]
+                    key_disp = key_map.get(key, key)
+                    if meta_btn:
+                        img_html += (
+                            f'<div class="civitai-meta-btn" data-key="{key}" onclick="metaToTxt2Img(\'{escape(str(key_disp))}\', this)">'
+                            f'<dt>{escape(str(key_disp))}</dt><dd>{escape(str(value))}</dd></div>'
+                        )
+                    else:
+                        img_html += (
+                            f'<div class="civitai-meta" data-key="{key}"><dt>{escape(str(key_disp))}</dt><dd>{escape(str(value))}</dd></div>'
+                        )
+            # Check if there are remaining keys in meta
+            remaining_keys = [k for k in prompt_dict if k not in preferred_order]
+
+            # Add the rest
+            if remaining_keys:
+                img_html += (
+                    '<div class="tabs">'
+                    '<div class="tab">'
+                    f'<input type="checkbox" class="accordionCheckbox" id="chck{index}">'
+                    f'<label class="tab-label" for="chck{index}">More details...</label>'
+                    '<div class="tab-content">'
+                )
+                for key in remaining_keys:
+                    value = prompt_dict[key]
+                    img_html += (
+                        f'<div class="civitai-meta" data-key="{key}"><dt>{escape(str(key).capitalize())}</dt><dd>{escape(str(value))}</dd></div>'
+                    )
+                img_html += '</div></div></div>'
+            img_html += '</dl></div>'
+        else:
+            # Show beautiful empty state when no metadata is available
+            img_html += NO_METADATA_VIDEO if is_video else NO_METADATA_IMAGE
+        img_html += '</div>'  # close .image-block
+    img_html += '</div>'
+    return img_html
+
+
+def update_model_info(model_string=None, model_version=None, only_html=False, input_id=None, json_input=None, from_preview=False, gallery=True):
     video_playback = getattr(opts, 'video_playback', True)
     meta_btn = getattr(opts, 'individual_meta_btn', True)
     playback = ''
@@ -868,160 +1262,43 @@ def update_model_info(model_string=None, model_version=None, only_html=False, in
                 model_url = selected_version.get('downloadUrl', '')
                 model_main_url = f"https://civitai.com/models/{item['id']}"
 
-                url = f"https://civitai.com/api/v1/model-versions/{selected_version['id']}"
-                api_version = request_civit_api(url)
+                local_previews = getattr(opts, 'local_previews', True)
+                installed_path = find_installed_file(model_folder, sha256_value, model_filename) if not only_html else None
 
                 ## === ANXETY EDITs ===
                 # --- HTML Generation ---
                 BtnImage = True
                 # Build image block
-                img_html = '<div class="sampleimgs">'
-
-                key_map = {
-                    'prompt': 'Prompt',
-                    'negativePrompt': 'Negative Prompt',
-                    'Model': 'Model',
-                    'sampler': 'Sampler',
-                    'steps': 'Steps',
-                    'cfgScale': 'CFG Scale',
-                    'clipSkip': 'Clip Skip',
-                    'seed': 'Seed',
-                    'Size': 'Size',
-                }
-                preferred_order = ["prompt", "negativePrompt", "Model", "sampler", "steps", "cfgScale", "Clip skip", "seed", "Size"]
-
-                for idx, pic in enumerate(api_version['images']):
-                    index = f"preview_{idx}" if from_preview else idx
-                    prompt_dict = pic.get('meta', {}) or {}
-                    image_url = re.sub(r'/width=\d+', f'/width={pic.get("width", "")}', pic['url'])
-                    is_video = pic.get('type') == 'video'
-
-                    img_html += (
-                        f'<div class="image-block">'
-                        f'<div class="civitai-image-container">'
-                    )
-
-                    if is_video:
-                        video_url = image_url.replace('width=', 'transcode=true,width=')
-                        img_html += (
-                            f'<video class="preview-media" data-sampleimg="true" {playback} muted playsinline onclick="openImageViewer(\'{escape(video_url)}\', \'video\')">'
-                            f'<source src="{video_url}" type="video/mp4"></video>'
-                        )
-                        meta_button = False
-                        prompt_dict = {}
-                    else:
-                        img_html += (
-                            f'<img class="preview-media" data-sampleimg="true" src="{image_url}" alt="Model preview" onclick="openImageViewer(\'{escape(image_url)}\', \'image\')">'
-                        )
-                        meta_button = bool(prompt_dict.get('prompt'))
-
-                    if meta_button:
-                        img_html += (
-                            '<div class="civitai_txt2img">'
-                            f'<label onclick="sendImgUrl(\'{escape(image_url)}\')" class="civitai-txt2img-btn">Send to txt2img</label>'
-                            '</div>'
-                        )
-                    img_html += '</div>'  # close .civitai-image-container
-
-                    if prompt_dict:
-                        img_html += (
-                            '<div id="image_info">'
-                            '<dl>'
-                        )
-                        for key in preferred_order:
-                            if key in prompt_dict:
-                                value = prompt_dict[key]
-                                key_disp = key_map.get(key, key)
-                                if meta_btn:
-                                    img_html += (
-                                        f'<div class="civitai-meta-btn" data-key="{key}" onclick="metaToTxt2Img(\'{escape(str(key_disp))}\', this)">'
-                                        f'<dt>{escape(str(key_disp))}</dt><dd>{escape(str(value))}</dd></div>'
-                                    )
-                                else:
-                                    img_html += (
-                                        f'<div class="civitai-meta" data-key="{key}"><dt>{escape(str(key_disp))}</dt><dd>{escape(str(value))}</dd></div>'
-                                    )
-                        # Check if there are remaining keys in meta
-                        remaining_keys = [k for k in prompt_dict if k not in preferred_order]
-
-                        # Add the rest
-                        if remaining_keys:
-                            img_html += (
-                                '<div class="tabs">'
-                                '<div class="tab">'
-                                f'<input type="checkbox" class="accordionCheckbox" id="chck{index}">'
-                                f'<label class="tab-label" for="chck{index}">More details...</label>'
-                                '<div class="tab-content">'
-                            )
-                            for key in remaining_keys:
-                                value = prompt_dict[key]
-                                img_html += (
-                                    f'<div class="civitai-meta" data-key="{key}"><dt>{escape(str(key).capitalize())}</dt><dd>{escape(str(value))}</dd></div>'
-                                )
-                            img_html += '</div></div></div>'
-                        img_html += '</dl></div>'
-                    else:
-                        # Show beautiful empty state when no metadata is available
-                        if is_video:
-                            no_meta_type = "video"
-                            icon_svg = (
-                                '<svg width="48" height="48" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="1.5" stroke-linecap="round" stroke-linejoin="round">'
-                                '<rect x="3" y="5" width="18" height="14" rx="2" ry="2"></rect>'
-                                '<polygon points="10,9 16,12 10,15"></polygon>'
-                                '</svg>'
-                            )
-                        else:
-                            no_meta_type = "image"
-                            icon_svg = (
-                                '<svg width="48" height="48" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="1.5" stroke-linecap="round" stroke-linejoin="round">'
-                                '<path d="M14.5 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V7.5L14.5 2z"></path>'
-                                '<polyline points="14,2 14,8 20,8"></polyline>'
-                                '<path d="M12 18v-4"></path>'
-                                '<path d="M12 10h.01"></path>'
-                                '</svg>'
-                            )
-                        img_html += (
-                            '<div class="image-metadata-empty">'
-                            '<div class="empty-state-icon">'
-                            f'{icon_svg}'
-                            '</div>'
-                            '<div class="empty-state-text">'
-                            f'<h4>No metadata available</h4>'
-                            f'<p>No generation settings are available for this {no_meta_type}.</p>'
-                            '</div>'
-                            '</div>'
-                        )
-                    img_html += '</div>'  # close .image-block
-                img_html += '</div>'
+                if gallery:
+                    images = version_images(selected_version, api_data)
+                    # No saved copies here, the HTML may be written to disk where ./file= URLs don't resolve
+                    img_html = sample_images_html(images, playback, meta_btn, from_preview)
+                else:
+                    # Shown until update_model_gallery sends the sample images
+                    with _gallery_lock:
+                        _gallery_installed[version_id] = installed_path if local_previews else None
+                        _gallery_installed.move_to_end(version_id)
+                        if len(_gallery_installed) > GALLERY_CACHE_SIZE:
+                            _gallery_installed.popitem(last=False)
+                    img_html = GALLERY_LOADING.format(version_id=version_id)
 
                 # Add simple image viewer overlay
-                img_html += (
-                    '<div id="image-viewer-overlay" class="viewer-overlay">'
-                    '<div class="viewer-content">'
-                    '<img id="viewer-image" class="viewer-media" src="" alt="">'
-                    '<video id="viewer-video" class="viewer-media" style="display: none;" controls muted>'
-                    '<source src="" type="video/mp4">'
-                    '</video>'
-                    '</div>'
-                    '</div>'
-                )
+                img_html += IMAGE_VIEWER_OVERLAY
 
                 tags_html = ''.join([f'<span class="civitai-tag">{escape(str(tag))}</span>' for tag in tags])
 
                 # Build permissions block
-                allow_svg = '<svg width="16" height="16" viewBox="0 1.5 24 24" stroke-width="4" stroke-linecap="round" stroke="lime"><path d="M5 12l5 5l10 -10"></path></svg>'
-                deny_svg = '<svg width="16" height="16" viewBox="0 1.5 24 24" stroke-width="4" stroke-linecap="round" stroke="red"><path d="M18 6l-12 12"></path><path d="M6 6l12 12"></path></svg>'
                 allowCommercialUse = item.get('allowCommercialUse', [])
 
                 perms_html = (
                     '<p>'
-                        f'{allow_svg if item.get("allowNoCredit") else deny_svg} Use the model without crediting the creator<br/>'
-                        f'{allow_svg if "Image" in allowCommercialUse else deny_svg} Sell images they generate<br/>'
-                        f'{allow_svg if "Rent" in allowCommercialUse else deny_svg} Run on services that generate images for money<br/>'
-                        f'{allow_svg if "RentCivit" in allowCommercialUse else deny_svg} Run on Civitai<br/>'
-                        f'{allow_svg if item.get("allowDerivatives") else deny_svg} Share merges using this model<br/>'
-                        f'{allow_svg if "Sell" in allowCommercialUse else deny_svg} Sell this model or merges using this model<br/>'
-                        f'{allow_svg if item.get("allowDifferentLicense") else deny_svg} Have different permissions when sharing merges'
+                        f'{ALLOW_ICON if item.get("allowNoCredit") else DENY_ICON} Use the model without crediting the creator<br/>'
+                        f'{ALLOW_ICON if "Image" in allowCommercialUse else DENY_ICON} Sell images they generate<br/>'
+                        f'{ALLOW_ICON if "Rent" in allowCommercialUse else DENY_ICON} Run on services that generate images for money<br/>'
+                        f'{ALLOW_ICON if "RentCivit" in allowCommercialUse else DENY_ICON} Run on Civitai<br/>'
+                        f'{ALLOW_ICON if item.get("allowDerivatives") else DENY_ICON} Share merges using this model<br/>'
+                        f'{ALLOW_ICON if "Sell" in allowCommercialUse else DENY_ICON} Sell this model or merges using this model<br/>'
+                        f'{ALLOW_ICON if item.get("allowDifferentLicense") else DENY_ICON} Have different permissions when sharing merges'
                     '</p>'
                 )
 
@@ -1135,32 +1412,10 @@ def update_model_info(model_string=None, model_version=None, only_html=False, in
             version_id
         )
 
-        for root, dirs, files in os.walk(model_folder, followlinks=True):
-            for filename in files:
-                if filename.endswith('.json'):
-                    json_file_path = os.path.join(root, filename)
-                    with open(json_file_path, 'r', encoding='utf-8') as f:
-                        try:
-                            data = json.load(f)
-                            sha256 = normalize_sha256(data.get('sha256'))
-                            if sha256 and sha256 == sha256_value:
-                                folder_location = root
-                                BtnDownInt = False
-                                BtnDel = True
-                                break
-                        except Exception as e:
-                            print(f"Error decoding JSON: {str(e)}")
-            else:
-                # filename_check
-                for filename in files:
-                    if filename.lower() == model_filename.lower() or filename.lower() == cleaned_name(model_filename).lower():
-                        folder_location = root
-                        BtnDownInt = False
-                        BtnDel = True
-                        break
-
-            if folder_location != 'None':
-                break
+        if installed_path:
+            folder_location = os.path.dirname(installed_path)
+            BtnDownInt = False
+            BtnDel = True
 
         default_subfolder = sub_folder_value(content_type, desc)
         if default_subfolder != 'None':
@@ -1176,7 +1431,7 @@ def update_model_info(model_string=None, model_version=None, only_html=False, in
 
         relative_path = os.path.relpath(folder_location, model_folder)
         default_subfolder = f"{os.sep}{relative_path}" if relative_path != '.' else default_subfolder if BtnDel == False else 'None'
-        if gl.isDownloading:
+        if gl.download_job.running:
             item = gl.download_queue[0]
             if int(model_id) == int(item['model_id']):
                 BtnDel = False
@@ -1220,6 +1475,39 @@ def update_model_info(model_string=None, model_version=None, only_html=False, in
             gr.Dropdown.update(choices=None, value=None, interactive=False)     # Sub Folder List
         )
 
+def version_images(selected_version, api_data):
+    """Sample images of a model version, the listing only has a few of them."""
+    if not api_data.get('_local'):
+        api_version = request_civit_api(f"https://civitai.com/api/v1/model-versions/{selected_version['id']}")
+        if isinstance(api_version, dict) and 'images' in api_version:
+            return api_version['images']
+    # Offline without a cached version payload, fall back to the images of the listing
+    return selected_version.get('images', [])
+
+def update_model_gallery(model_string=None, model_version=None):
+    """
+    Second step of opening a model page: update_model_info(gallery=False) shows the page right away
+    with GALLERY_LOADING in place of the sample images, these are sent afterwards as
+    {"version": id, "html": images} and swapped in by insertModelGallery (civitai-html.js).
+    """
+    if not model_string or not isinstance(gl.json_data, dict):
+        return gr.Textbox.update()
+    _, model_id = extract_model_info(model_string)
+    item = next((item for item in gl.json_data['items'] if model_id and int(item['id']) == int(model_id)), None)
+    if not item or not item['modelVersions']:
+        return gr.Textbox.update()
+
+    # Same version as update_model_info picks
+    version_name = (model_version or '').replace(' [Installed]', '')
+    selected_version = next((version for version in item['modelVersions'] if version['name'] == version_name), item['modelVersions'][0])
+    with _gallery_lock:
+        installed_path = _gallery_installed.get(selected_version['id'])
+
+    playback = 'autoplay loop' if getattr(opts, 'video_playback', True) else ''
+    meta_btn = getattr(opts, 'individual_meta_btn', True)
+    img_html = sample_images_html(version_images(selected_version, gl.json_data), playback, meta_btn, installed_path=installed_path)
+    return gr.Textbox.update(value=_json.dumps({'version': selected_version['id'], 'html': img_html}))
+
 def sub_folder_value(content_type, desc=None):
     use_LORA = getattr(opts, 'use_LORA', False)
     if content_type in ['LORA', 'LoCon'] and use_LORA:
@@ -1287,19 +1575,19 @@ def update_file_info(model_string, model_version, file_metadata):
                                         model_folder = os.path.join(contenttype_folder('TextualInversion'))
                                 dl_url = file['downloadUrl']
                                 gl.json_info = item
-                                for root, _, files in os.walk(model_folder, followlinks=True):
+                                for root, _, files in _folders.walk(model_folder):
                                     if file_name in files:
                                         installed = True
                                         folder_location = root
                                         break
 
                                 if not installed:
-                                    for root, _, files in os.walk(model_folder, followlinks=True):
+                                    for root, _, files in _folders.walk(model_folder):
                                         for filename in files:
                                             if filename.endswith('.json'):
                                                 with open(os.path.join(root, filename), 'r', encoding='utf-8') as f:
                                                     try:
-                                                        data = json.load(f)
+                                                        data = _json.load(f)
                                                         sha256_value = normalize_sha256(data.get('sha256'))
                                                         if sha256_value and sha256_value == sha256:
                                                             folder_location = root
@@ -1383,31 +1671,86 @@ def get_headers(referer=None, no_api=None):
 
     return headers
 
+# Requests currently in flight, keyed by (api_url, skip_error_check)
+_inflight = {}
+_inflight_lock = threading.Lock()
+
 def request_civit_api(api_url=None, skip_error_check=False):
+    """
+    Concurrent calls for the same URL share a single network request and parsed result.
+    When the result was shared every caller gets its own copy, since callers modify the returned data.
+    """
+    key = (api_url, skip_error_check)
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = {'done': threading.Event(), 'result': None, 'error': None, 'waiters': 0}
+        else:
+            call['waiters'] += 1
+
+    if not leader:
+        call['done'].wait()
+        debug_print(f"Shared in-flight request: {api_url}")
+        if call['error']:
+            raise call['error']
+        return copy.deepcopy(call['result'])
+
+    try:
+        call['result'] = _cached_request(api_url, skip_error_check)
+    except Exception as e:
+        call['error'] = e
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+            shared = call['waiters'] > 0
+        call['done'].set()
+    return copy.deepcopy(call['result']) if shared else call['result']
+
+def _cached_request(api_url, skip_error_check):
+    """Serve responses from the local cache in offline mode or when CivitAI cannot be reached."""
+    if getattr(opts, 'offline_mode', False):
+        return _api_cache.stale(api_url) or 'offline'
+
+    data, content = _request_civit_api(api_url, skip_error_check)
+    if isinstance(data, dict):
+        if 'error' not in data:
+            _api_cache.store(api_url, content)
+        return data
+
+    cached = _api_cache.stale(api_url)
+    if cached:
+        print('CivitAI could not be reached, showing cached data.')
+        return cached
+    return data
+
+def _request_civit_api(api_url, skip_error_check):
+    """Returns the parsed response and its raw body, or an error string and None."""
     headers = get_headers()
     proxies, ssl = get_proxies()
     try:
-        response = requests.get(api_url, headers=headers, timeout=(60, 30), proxies=proxies, verify=ssl)
+        response = _limit.get(api_url, headers=headers, timeout=(60, 30), proxies=proxies, verify=ssl, max_retries=_limit.INTERACTIVE_RETRIES)
+        if response.status_code == 429:
+            print('CivitAI is limiting the number of requests. Please try again in a moment.')
+            return 'throttled', None
         if skip_error_check:
-            response.encoding = 'utf-8'
-            data = json.loads(response.text)
-            return data
+            return _json.loads(response.content), response.content
         response.raise_for_status()
     except requests.exceptions.Timeout as e:
         print('The request timed out. Please try again later.')
-        return 'timeout'
+        return 'timeout', None
     except requests.exceptions.RequestException as e:
         print(f"Error: {e}")
-        return 'error'
+        return 'error', None
     else:
-        response.encoding = 'utf-8'
         try:
-            data = json.loads(response.text)
-        except json.JSONDecodeError:
+            data = _json.loads(response.content)
+        except _json.JSONDecodeError:
             print(response.text)
             print('The CivitAI servers are currently offline. Please try again later.')
-            return 'offline'
-    return data
+            return 'offline', None
+    return data, response.content
 
 ## === ANXETY EDITs ===
 def api_error_msg(input_string):
@@ -1420,12 +1763,16 @@ def api_error_msg(input_string):
         return div + 'The CivitAI-API has timed out, please try again.<br>The servers might be too busy or down if the issue persists.'
     elif input_string == 'offline':
         return div + 'The CivitAI servers are currently offline.<br>Please try again later.'
+    elif input_string == 'throttled':
+        return div + 'CivitAI is limiting the number of requests.<br>Please wait a moment and try again.'
     elif input_string == 'no_items':
         return div + 'Failed to retrieve any models from CivitAI<br>The servers might be too busy or down if the issue persists.'
     elif input_string == 'invalid_hash':
         return div + 'Invalid SHA256 hash format.<br>Please enter a valid 64-character hexadecimal hash.</div>'
     elif input_string == 'sha256_not_found':
         return div + 'No model found with this SHA256 hash.<br>The model might not exist on CivitAI or the hash might be incorrect.</div>'
+    elif input_string == 'manifest_not_found':
+        return div + 'Sync manifest not found.<br>Please enter the path to a valid manifest JSON file.</div>'
     elif input_string == 'user_not_found':
         return div + 'No models found for this user on CivitAI.<br>Please check the correctness of the user name.'
     else:
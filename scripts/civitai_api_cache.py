@@ -0,0 +1,130 @@
+import hashlib
+import os
+import threading
+import time
+
+# ===  WebUI imports ===
+from modules.shared import opts
+
+# === Extension imports ===
+import scripts.civitai_global as gl
+import scripts.civitai_json as _json
+from scripts.civitai_global import print, debug_print
+
+
+gl.init()
+
+# Responses waiting for the writer thread by cache path, readers see them before they reach the disk
+_cond = threading.Condition()
+_pending = {}
+_writer = None
+_stores = 0
+
+
+def cache_path(api_url):
+    return os.path.join(gl.api_cache_dir, hashlib.sha1(api_url.encode('utf-8')).hexdigest() + '.json')
+
+def load(api_url):
+    """Return (data, saved_at) of the last successful response for this URL, or None."""
+    path = cache_path(api_url)
+    with _cond:
+        pending = _pending.get(path)
+    if pending:
+        _, saved_at, content = pending
+        return _json.loads(content), saved_at
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = _json.load(f)
+        return entry['data'], entry['saved_at']
+    except Exception as e:
+        debug_print(f"Failed to read cached response for {api_url}: {e}")
+        return None
+
+def store(api_url, content):
+    """
+    Queue the raw JSON body of a successful API response to be saved by the writer thread,
+    the request returns without waiting for the disk.
+    """
+    global _writer
+    if not content or int(getattr(opts, 'api_cache_entries', 500)) <= 0:
+        return
+    with _cond:
+        _pending[cache_path(api_url)] = (api_url, time.time(), content)
+        if _writer is None:
+            _writer = threading.Thread(target=_write_pending, name='civitai-api-cache', daemon=True)
+            _writer.start()
+        _cond.notify()
+
+def _write_pending():
+    global _stores
+    while True:
+        with _cond:
+            while not _pending:
+                _cond.wait()
+            path = next(iter(_pending))
+            api_url, saved_at, content = _pending[path]
+        write(path, api_url, saved_at, content)
+
+        with _cond:
+            # A newer response for the URL may have been queued in the meantime
+            if _pending.get(path, (None, None))[1] == saved_at:
+                del _pending[path]
+            _stores += 1
+            do_prune = _stores % 50 == 0
+        if do_prune:
+            prune()
+
+def write(path, api_url, saved_at, content):
+    """Write a cache entry atomically so a reader never sees a partial file, the body is written as received."""
+    tmp_path = path + '.tmp'
+    header = '{"url": %s, "saved_at": %r, "data": ' % (_json.dumps(api_url), saved_at)
+    try:
+        os.makedirs(gl.api_cache_dir, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(header.encode('utf-8'))
+            f.write(content)
+            f.write(b'}')
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Failed to cache API response: {e}")
+
+def prune():
+    """Drop the least recently saved responses once the cache holds more than the configured number."""
+    max_entries = int(getattr(opts, 'api_cache_entries', 500))
+    try:
+        entries = [entry for entry in os.scandir(gl.api_cache_dir) if entry.name.endswith('.json')]
+    except OSError:
+        return
+    if len(entries) <= max_entries:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:len(entries) - max_entries]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def stale(api_url):
+    """
+    Return the cached response for a URL marked as stale, or None if it was never cached.
+    The `_stale` key holds the time the response was saved.
+    """
+    cached = load(api_url)
+    if not cached:
+        return None
+    data, saved_at = cached
+    data['_stale'] = saved_at
+    debug_print(f"Serving cached response from {time.ctime(saved_at)} for: {api_url}")
+    return data
+
+def stale_notice(data):
+    """HTML banner shown above results served from the cache."""
+    if not isinstance(data, dict) or not data.get('_stale'):
+        return ''
+    saved = time.strftime('%Y-%m-%d %H:%M', time.localtime(data['_stale']))
+    return (
+        '<div style="color: var(--body-text-color-subdued); text-align: center; margin: 5px;">'
+        f'CivitAI is unreachable, showing cached results from {saved}.</div>'
+    )
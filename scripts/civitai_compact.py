@@ -0,0 +1,124 @@
+import copy
+import sys
+import zlib
+
+# Listing pages are kept in gl.json_data for as long as the page is open, and every queued download
+# holds on to its model item and preview HTML. Only the fields below are read from listing pages,
+# the rest (scan results, stats, ...) is dropped when a page is loaded. Image generation data (meta) is
+# kept, offline the sample images of a model page come from the listing (version_images).
+IMAGE_KEYS = ('url', 'type', 'width', 'height', 'nsfw', 'nsfwLevel', 'meta')
+FILE_KEYS = ('id', 'name', 'primary', 'downloadUrl', 'sizeKB', 'metadata', 'hashes')
+VERSION_DROP = ('stats',)
+
+# Short values repeated across a page, interned so every item shares a single string
+INTERN_KEYS = ('type', 'baseModel', 'availability', 'mode', 'format', 'fp', 'size', 'nsfwLevel')
+
+# Descriptions (model and version) are HTML and make up most of a compacted page, they are kept
+# compressed by CompactItem and only decompressed when read. Shorter ones aren't worth it.
+PACKED_KEYS = ('description',)
+PACK_MIN_LENGTH = 256
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) and len(value) <= 64 else value
+
+def _pick(source, keys):
+    return {key: _intern(source[key]) if key in INTERN_KEYS else source[key] for key in keys if key in source}
+
+class CompactItem(dict):
+    """
+    Listing item or model version holding its description compressed, no per-instance __dict__.
+    Reads (item['description'], .get, .items, dict(item), json) see the plain text, the packed
+    bytes stay in the dict storage until the item is dropped.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def pack(cls, source):
+        item = cls(source)
+        for key in PACKED_KEYS:
+            value = dict.get(item, key)
+            if isinstance(value, str) and len(value) >= PACK_MIN_LENGTH:
+                dict.__setitem__(item, key, pack_html(value))
+        return item
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        return unpack_html(value) if key in PACKED_KEYS else value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def pop(self, key, *default):
+        return unpack_html(dict.pop(self, key, *default)) if key in PACKED_KEYS else dict.pop(self, key, *default)
+
+    def __iter__(self):
+        # Overriding __iter__ makes dict(item) and {**item} go through keys() and __getitem__
+        return dict.__iter__(self)
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def copy(self):
+        return CompactItem(dict.items(self))
+
+    def __deepcopy__(self, memo):
+        result = CompactItem()
+        memo[id(self)] = result
+        for key, value in dict.items(self):
+            dict.__setitem__(result, key, copy.deepcopy(value, memo))
+        return result
+
+    def __reduce__(self):
+        return (dict, (dict(self.items()),))
+
+def compact_item(item):
+    """Strip a listing item down to the fields used by the browser, returns it as a CompactItem."""
+    for key in ('type', 'mode', 'availability'):
+        if key in item:
+            item[key] = _intern(item[key])
+    if 'tags' in item and isinstance(item['tags'], list):
+        item['tags'] = [_intern(tag) for tag in item['tags']]
+
+    versions = item.get('modelVersions', [])
+    for version in versions:
+        for key in VERSION_DROP:
+            version.pop(key, None)
+        for key in ('baseModel', 'availability', 'baseModelType'):
+            if key in version:
+                version[key] = _intern(version[key])
+        if 'images' in version:
+            version['images'] = [_pick(image, IMAGE_KEYS) for image in version['images']]
+        if 'files' in version:
+            files = []
+            for file in version['files']:
+                compact_file = _pick(file, FILE_KEYS)
+                if 'hashes' in compact_file:
+                    compact_file['hashes'] = {'SHA256': compact_file['hashes'].get('SHA256', '')}
+                if isinstance(compact_file.get('metadata'), dict):
+                    compact_file['metadata'] = {key: _intern(value) for key, value in compact_file['metadata'].items()}
+                files.append(compact_file)
+            version['files'] = files
+    if isinstance(versions, list):
+        item['modelVersions'] = [CompactItem.pack(version) for version in versions]
+    return CompactItem.pack(item)
+
+def compact_page(data):
+    """Compact every item of a listing page, returns the page for convenience."""
+    if isinstance(data, dict) and isinstance(data.get('items'), list):
+        data['items'] = [compact_item(item) for item in data['items']]
+    return data
+
+def pack_html(html):
+    """Compress HTML kept around for a while (queued downloads), HTML shrinks roughly tenfold."""
+    if isinstance(html, str):
+        return zlib.compress(html.encode('utf-8'), 6)
+    return html
+
+def unpack_html(packed):
+    if isinstance(packed, bytes):
+        return zlib.decompress(packed).decode('utf-8')
+    return packed
@@ -16,8 +16,12 @@ from modules.shared import opts, cmd_opts
 
 # === Extension imports ===
 import scripts.civitai_file_manage as _file
+import scripts.civitai_folders as _folders
 import scripts.civitai_global as gl
 import scripts.civitai_api as _api
+import scripts.civitai_compact as _compact
+import scripts.civitai_json as _json
+import scripts.civitai_ratelimit as _limit
 from scripts.civitai_global import print
 
 try:
@@ -150,14 +154,15 @@ def create_model_item(dl_url, model_filename, install_path, model_name, version_
     model_versions = _api.update_model_versions(model_id)
     (preview_html, _, _, _, _, _, _, _, _, _, _, existing_path, _) = _api.update_model_info(None, model_versions.get('value'), False, model_id)
 
-    for item in gl.download_queue:
-        if item['dl_url'] == dl_url:
-            return None
-
-    dl_manager_count += 1
+    with gl.queue_lock:
+        for item in gl.download_queue:
+            if item['dl_url'] == dl_url:
+                return None
+        dl_manager_count += 1
+        dl_id = dl_manager_count
 
     item = {
-        'dl_id': dl_manager_count,
+        'dl_id': dl_id,
         'dl_url': dl_url,
         'model_filename': model_filename,
         'install_path': install_path,
@@ -168,7 +173,7 @@ def create_model_item(dl_url, model_filename, install_path, model_name, version_
         'create_json': create_json,
         'model_json': model_json,
         'model_versions': model_versions,
-        'preview_html': preview_html['value'],
+        'preview_html': _compact.pack_html(preview_html['value']),
         'existing_path': existing_path['value'],
         'from_batch': from_batch,
         'sub_folder': sub_folder
@@ -236,8 +241,7 @@ def selected_to_queue(model_list, subfolder, download_start, create_json, curren
                 install_path = str(model_folder)
 
         model_item = create_model_item(dl_url, model_filename, install_path, model_name, version_name, model_sha256, model_id, create_json, from_batch)
-        if model_item:
-            gl.download_queue.append(model_item)
+        if enqueue(model_item):
             total_count += 1
 
     html = download_manager_html(current_html)
@@ -286,21 +290,29 @@ def gr_progress_threadable():
     return progress
 
 
+def enqueue(model_item):
+    """Add an item to the download queue shared by all sessions, unless the same file is already queued."""
+    with gl.queue_lock:
+        if not model_item or any(item['dl_url'] == model_item['dl_url'] for item in gl.download_queue):
+            return False
+        gl.download_queue.append(model_item)
+        return True
+
 def download_start(download_start, dl_url, model_filename, install_path, model_string, version_name, model_sha256, model_id, create_json, current_html):
     global total_count, current_count
     if model_string:
         model_name, _ = _api.extract_model_info(model_string)
     model_item = create_model_item(dl_url, model_filename, install_path, model_name, version_name, model_sha256, model_id, create_json)
 
-    gl.download_queue.append(model_item)
-
-    if len(gl.download_queue) > 1:
-        number = download_start
-        total_count += 1
-    else:
-        number = random_number(download_start)
-        total_count = 1
-        current_count = 0
+    with gl.queue_lock:
+        enqueue(model_item)
+        if len(gl.download_queue) > 1:
+            number = download_start
+            total_count += 1
+        else:
+            number = random_number(download_start)
+            total_count = 1
+            current_count = 0
 
     html = download_manager_html(current_html)
 
@@ -333,12 +345,11 @@ def download_finish(model_filename, version, model_id):
         Del = False
         Down = True
 
-    if gl.cancel_status:
+    if gl.download_job.cancelled:
         Del = False
         Down = True
 
-    gl.download_fail = False
-    gl.cancel_status = False
+    gl.download_job.reset()
 
     return (
         gr.Button.update(interactive=model_filename, visible=Down, value="Download model"),  # Download Button
@@ -350,39 +361,26 @@ def download_finish(model_filename, version, model_id):
     )
 
 def download_cancel():
-    gl.cancel_status = True
-    gl.download_fail = True
-    if gl.download_queue:
-        item = gl.download_queue[0]
-    else:
-        item = None
-
-    while True:
-        if not gl.isDownloading:
-            if item:
-                model_string = f"{item['model_name']} ({item['model_id']})"
-                _file.delete_model(0, item['model_filename'], model_string, item['version_name'], False, model_ver=item['model_versions'], model_json=item['model_json'])
-            break
-        else:
-            time.sleep(0.5)
+    item = gl.download_queue[0] if gl.download_queue else None
+    gl.download_job.cancel()
+    gl.download_job.wait()
+    if item:
+        model_string = f"{item['model_name']} ({item['model_id']})"
+        _file.delete_model(0, item['model_filename'], model_string, item['version_name'], False, model_ver=item['model_versions'], model_json=item['model_json'])
     return
 
 def download_cancel_all():
-    gl.cancel_status = True
-    gl.download_fail = True
-
-    if gl.download_queue:
-        item = gl.download_queue[0]
-
-    while True:
-        if not gl.isDownloading:
-            if item:
-                model_string = f"{item['model_name']} ({item['model_id']})"
-                _file.delete_model(0, item['model_filename'], model_string, item['version_name'], False, model_ver=item['model_versions'], model_json=item['model_json'])
-            gl.download_queue = []
-            break
-        else:
-            time.sleep(0.5)
+    item = gl.download_queue[0] if gl.download_queue else None
+    with gl.queue_lock:
+        # Drop the waiting items first so nothing new starts after the running download stopped
+        del gl.download_queue[1:]
+    gl.download_job.cancel()
+    gl.download_job.wait()
+    if item:
+        model_string = f"{item['model_name']} ({item['model_id']})"
+        _file.delete_model(0, item['model_filename'], model_string, item['version_name'], False, model_ver=item['model_versions'], model_json=item['model_json'])
+    with gl.queue_lock:
+        gl.download_queue.clear()
     return
 
 def convert_size(size):
@@ -396,7 +394,7 @@ def get_download_link(url, model_id):
     headers = _api.get_headers(model_id)
     proxies, ssl = _api.get_proxies()
 
-    response = requests.get(url, headers=headers, allow_redirects=False, proxies=proxies, verify=ssl)
+    response = _limit.get(url, headers=headers, allow_redirects=False, proxies=proxies, verify=ssl)
 
     if 300 <= response.status_code <= 308:
         if 'login?returnUrl' in response.text and 'reason=download-auth' in response.text:
@@ -412,7 +410,7 @@ def download_file(url, file_path, install_path, model_id, progress=gr.Progress()
         disable_dns = getattr(opts, 'disable_dns', False)
         split_aria2 = getattr(opts, 'split_aria2', 64)
         max_retries = 5
-        gl.download_fail = False
+        gl.download_job.succeed()
         aria2_rpc_url = "http://localhost:24000/jsonrpc"
 
         file_name = os.path.basename(file_path)
@@ -433,7 +431,7 @@ def download_file(url, file_path, install_path, model_id, progress=gr.Progress()
         if early_access:
             msg = f"File: '{file_name}' is marked as Early Access on CivitAI. You need to purchase this model to download it."
             print(msg)
-            gl.download_fail = 'EARLY_ACCESS'
+            gl.download_job.fail('EARLY_ACCESS')
             if progress is not None:
                 progress(0, desc=msg)
                 time.sleep(5)
@@ -443,13 +441,13 @@ def download_file(url, file_path, install_path, model_id, progress=gr.Progress()
         if not download_link:
             msg = f"File: '{file_name}' not found on CivitAI servers, it looks like the file is not available for download."
             print(msg)
-            gl.download_fail = True
+            gl.download_job.fail()
             return
 
         elif download_link == 'NO_API':
             msg = f"File: '{file_name}' requires a personal CivitAI API to be downloaded, you can set your own API key in the CivitAI Browser+ settings in the SD-WebUI settings tab"
             print(msg)
-            gl.download_fail = 'NO_API'
+            gl.download_job.fail('NO_API')
             if progress is not None:
                 progress(0, desc=msg)
                 time.sleep(5)
@@ -486,11 +484,11 @@ def download_file(url, file_path, install_path, model_id, progress=gr.Progress()
             gid = data['result']
         except Exception as e:
             print(f"Failed to start download: {e}")
-            gl.download_fail = True
+            gl.download_job.fail()
             return
 
         while True:
-            if gl.cancel_status:
+            if gl.download_job.cancelled:
                 payload = json.dumps({
                     'jsonrpc': '2.0',
                     'id': '1',
@@ -533,16 +531,16 @@ def download_file(url, file_path, install_path, model_id, progress=gr.Progress()
                     print(msg)
                     if progress != None:
                         progress(1, desc=msg)
-                    gl.download_fail = False
+                    gl.download_job.succeed()
                     return
 
                 if status_info['status'] == 'error':
                     if progress != None:
                         progress(0, desc=f"Encountered an error during download of: '{file_name}' Please try again.")
-                    gl.download_fail = True
+                    gl.download_job.fail()
                     return
 
-                time.sleep(0.25)
+                gl.download_job.cancel_event.wait(0.25)
 
             except Exception as e:
                 print(f"Error occurred during Aria2 status update: {e}")
@@ -550,23 +548,23 @@ def download_file(url, file_path, install_path, model_id, progress=gr.Progress()
                 if max_retries == 0:
                     if progress != None:
                         progress(0, desc=f"Encountered an error during download of: '{file_name}' Please try again.")
-                    gl.download_fail = True
+                    gl.download_job.fail()
                     return
                 time.sleep(5)
     except:
         if progress != None:
             progress(0, desc=f"Encountered an error during download of: '{file_name}' Please try again.")
-        gl.download_fail = True
+        gl.download_job.fail()
         if os.path.exists(file_path):
             os.remove(file_path)
         time.sleep(5)
 
-def info_to_json(install_path, model_id, model_sha256, unpackList=None):
+def info_to_json(install_path, model_id, model_sha256, unpackList=None, model_version_id=None):
     json_file = os.path.splitext(install_path)[0] + '.json'
     if os.path.exists(json_file):
         try:
             with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+                data = _json.load(f)
         except Exception as e:
             print(f"Failed to open {json_file}: {e}")
     else:
@@ -574,15 +572,17 @@ def info_to_json(install_path, model_id, model_sha256, unpackList=None):
 
     data['modelId'] = model_id
     data['sha256'] = model_sha256
+    if model_version_id:
+        data['modelVersionId'] = model_version_id
     if unpackList:
         data['unpackList'] = unpackList
 
     with open(json_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4)
+        _json.dump(data, f, indent=True)
 
 def download_file_old(url, file_path, model_id, progress=gr.Progress() if queue else None):
     try:
-        gl.download_fail = False
+        gl.download_job.succeed()
         max_retries = 5
         if os.path.exists(file_path):
             os.remove(file_path)
@@ -601,13 +601,13 @@ def download_file_old(url, file_path, model_id, progress=gr.Progress() if queue
             if progress != None:
                 progress(0, desc=msg)
                 time.sleep(5)
-            gl.download_fail = True
+            gl.download_job.fail()
             return
 
         elif download_link == 'NO_API':
             msg = f"File: '{file_name_display}' requires a personal CivitAI API key to be downloaded, you can set your own API key in the CivitAI Browser+ settings in the SD-WebUI settings tab"
             print(msg)
-            gl.download_fail = 'NO_API'
+            gl.download_job.fail('NO_API')
             if progress != None:
                 progress(0, desc=msg)
                 time.sleep(5)
@@ -616,8 +616,9 @@ def download_file_old(url, file_path, model_id, progress=gr.Progress() if queue
         headers = _api.get_headers(model_id, True)
         proxies, ssl = _api.get_proxies()
 
+        downloading = True
         while True:
-            if gl.cancel_status:
+            if gl.download_job.cancelled:
                 if progress != None:
                     progress(0, desc='Download cancelled.')
                 return
@@ -626,14 +627,14 @@ def download_file_old(url, file_path, model_id, progress=gr.Progress() if queue
                 headers['Range'] = f"bytes={downloaded_size}-"
 
             with open(file_path, 'ab') as f:
-                while gl.isDownloading:
+                while downloading:
                     try:
-                        if gl.cancel_status:
+                        if gl.download_job.cancelled:
                             if progress != None:
                                 progress(0, desc='Download cancelled.')
                             return
                         try:
-                            if gl.cancel_status:
+                            if gl.download_job.cancelled:
                                 if progress != None:
                                     progress(0, desc='Download cancelled.')
                                 return
@@ -641,7 +642,7 @@ def download_file_old(url, file_path, model_id, progress=gr.Progress() if queue
                             if response.status_code == 404:
                                 if progress != None:
                                     progress(0, desc=f"Encountered an error during download of: {file_name_display}, file is not found on CivitAI servers.")
-                                gl.download_fail = True
+                                gl.download_job.fail()
                                 return
                             total_size = int(response.headers.get('Content-Length', 0))
                         except:
@@ -652,7 +653,7 @@ def download_file_old(url, file_path, model_id, progress=gr.Progress() if queue
 
                         for chunk in response.iter_content(chunk_size=1024):
                             if chunk:
-                                if gl.cancel_status:
+                                if gl.download_job.cancelled:
                                     if progress != None:
                                         progress(0, desc='Download cancelled.')
                                     return
@@ -671,7 +672,7 @@ def download_file_old(url, file_path, model_id, progress=gr.Progress() if queue
                                     if progress != None:
                                         progress(downloaded_size / total_size, desc=f"Downloading: {file_name_display} {convert_size(downloaded_size)} / {convert_size(total_size)} - Speed: {convert_size(int(download_speed))}/s - ETA: {eta_formatted} - Queue: {current_count}/{total_count}")
                                     last_update_time = current_time
-                                if gl.isDownloading == False:
+                                if not downloading:
                                     response.close
                                     break
                         downloaded_size = os.path.getsize(file_path)
@@ -684,44 +685,67 @@ def download_file_old(url, file_path, model_id, progress=gr.Progress() if queue
                         if max_retries == 0:
                             if progress != None:
                                 progress(0, desc=f"Encountered an error during download of: {file_name_display}, please try again.")
-                            gl.download_fail = True
+                            gl.download_job.fail()
                             return
                         time.sleep(5)
 
-            if (gl.isDownloading == False):
+            if not downloading:
                 break
 
-            gl.isDownloading = False
+            downloading = False
             downloaded_size = os.path.getsize(file_path)
             if downloaded_size >= total_size:
-                if not gl.cancel_status:
+                if not gl.download_job.cancelled:
                     msg = f"Model saved to: {file_path}"
                     print(msg)
                     if progress != None:
                         progress(1, desc=msg)
-                    gl.download_fail = False
+                    gl.download_job.succeed()
                     return
 
             else:
                 if progress != None:
                     progress(0, desc=f"Encountered an error during download of: {file_name_display}, please try again.")
                 print(f"File download failed: {file_name_display}")
-                gl.download_fail = True
+                gl.download_job.fail()
                 if os.path.exists(file_path):
                     os.remove(file_path)
     except:
         if progress != None:
             progress(0, desc=f"Encountered an error during download of: {file_name_display}, please try again.")
-        gl.download_fail = True
+        gl.download_job.fail()
         if os.path.exists(file_path):
             os.remove(file_path)
         time.sleep(5)
 
 def download_create_thread(download_finish, queue_trigger, progress=gr_progress_threadable() if queue else None):
+    # Several sessions can start a download at the same time, the queue is processed one item at a time.
+    # The lock is only held to claim the next item, a download already running handles the rest of the queue.
+    with gl.download_lock:
+        if gl.download_job.running:
+            return (
+                gr.HTML.update(),  # Download Progress HTML
+                gr.Textbox.update(),  # Current Model
+                gr.Textbox.update(),  # Download Finish Trigger
+                gr.Textbox.update(),  # Queue Trigger
+                gr.Button.update()  # Cancel All Button
+            )
+        with gl.queue_lock:
+            item = gl.download_queue[0] if gl.download_queue else None
+        if item:
+            gl.download_job.start()
+    try:
+        return download_next(item, download_finish, queue_trigger, progress)
+    except Exception:
+        # Don't leave the queue blocked behind a download that will never finish
+        gl.download_job.finish()
+        raise
+
+def download_next(item, download_finish, queue_trigger, progress=None):
     global current_count
     current_count += 1
 
-    if not gl.download_queue:
+    if not item:
         return (
             gr.HTML.update(),  # Download Progress HTML
             gr.Textbox.update(value=None),  # Current Model
@@ -730,8 +754,6 @@ def download_create_thread(download_finish, queue_trigger, progress=gr_progress_
             gr.Button.update(interactive=False)  # Cancel All Button
         )
 
-    item = gl.download_queue[0]
-    gl.cancel_status = False
     use_aria2 = getattr(opts, 'use_aria2', True)
     unpack_zip = getattr(opts, 'unpack_zip', False)
     save_all_images = getattr(opts, 'auto_save_all_img', False)
@@ -741,22 +763,21 @@ def download_create_thread(download_finish, queue_trigger, progress=gr_progress_
     if item['from_batch']:
         item['install_path'] = item['existing_path']
 
-    gl.isDownloading = True
     _file.make_dir(item['install_path'])
 
     path_to_new_file = os.path.join(item['install_path'], item['model_filename'])
 
     if use_aria2 and os_type != 'Darwin':
-        thread = threading.Thread(target=download_file, args=(item['dl_url'], path_to_new_file, item['install_path'], item['model_id'], progress))
+        thread = threading.Thread(target=gl.in_session(download_file), args=(item['dl_url'], path_to_new_file, item['install_path'], item['model_id'], progress))
     else:
-        thread = threading.Thread(target=download_file_old, args=(item['dl_url'], path_to_new_file, item['model_id'], progress))
+        thread = threading.Thread(target=gl.in_session(download_file_old), args=(item['dl_url'], path_to_new_file, item['model_id'], progress))
     thread.start()
     if progress != None and hasattr(progress, 'join'):
         progress.join(thread)
     else:
         thread.join()
 
-    if not gl.cancel_status or gl.download_fail:
+    if not gl.download_job.cancelled or gl.download_job.failure:
         if os.path.exists(path_to_new_file):
             unpackList = []
             if unpack_zip:
@@ -777,40 +798,43 @@ def download_create_thread(download_finish, queue_trigger, progress=gr_progress_
                     print('Python module "ZipUnicode" has not been imported correctly, cannot extract zip file. Please try to restart or install it manually.')
                 except Exception as e:
                     print(f"Failed to extract {item['model_filename']} with error: {e}")
-            if not gl.cancel_status:
+            if not gl.download_job.cancelled:
                 if item['create_json']:
-                    _file.save_model_info(item['install_path'], item['model_filename'], item['sub_folder'], item['model_sha256'], item['preview_html'], api_response=item['model_json'])
+                    _file.save_model_info(item['install_path'], item['model_filename'], item['sub_folder'], item['model_sha256'], _compact.unpack_html(item['preview_html']), api_response=item['model_json'])
                 info_to_json(path_to_new_file, item['model_id'], item['model_sha256'], unpackList)
                 _file.save_preview(path_to_new_file, item['model_json'], True, item['model_sha256'])
                 if save_all_images:
-                    _file.save_images(item['preview_html'], item['model_filename'], item['install_path'], item['sub_folder'], api_response=item['model_json'])
+                    _file.save_images(_compact.unpack_html(item['preview_html']), item['model_filename'], item['install_path'], item['sub_folder'], api_response=item['model_json'])
 
     base_name = os.path.splitext(item['model_filename'])[0]
     base_name_preview = base_name + '.preview'
 
-    if gl.download_fail:
-        for root, dirs, files in os.walk(item['install_path'], followlinks=True):
+    if gl.download_job.failure:
+        for root, dirs, files in _folders.walk(item['install_path']):
             for file in files:
                 file_base_name = os.path.splitext(file)[0]
                 if file_base_name == base_name or file_base_name == base_name_preview:
                     path_file = os.path.join(root, file)
                     os.remove(path_file)
 
-        if gl.cancel_status:
+        if gl.download_job.cancelled:
             print(f"Cancelled download of '{item['model_filename']}'")
         else:
-            if gl.download_fail != 'NO_API':
+            if gl.download_job.failure != 'NO_API':
                 print(f"Error occured during download of '{item['model_filename']}'")
 
-    if gl.cancel_status:
+    # The model page and cards read the folders right after this
+    _folders.invalidate()
+    if gl.download_job.cancelled:
         card_name = None
     else:
         model_string = f"{item['model_name']} ({item['model_id']})"
         (card_name, _, _) = _file.card_update(item['model_versions'], model_string, item['version_name'], True)
 
-    if len(gl.download_queue) != 0:
-        gl.download_queue.pop(0)
-    gl.isDownloading = False
+    with gl.queue_lock:
+        if item in gl.download_queue:
+            gl.download_queue.remove(item)
+    gl.download_job.finish()
     time.sleep(2)
 
     if len(gl.download_queue) == 0:
@@ -830,21 +854,23 @@ def download_create_thread(download_finish, queue_trigger, progress=gr_progress_
 
 def remove_from_queue(dl_id):
     global total_count
-    for item in gl.download_queue:
-        if int(dl_id) == int(item['dl_id']):
-            gl.download_queue.remove(item)
-            total_count -= 1
-            return
+    with gl.queue_lock:
+        for item in gl.download_queue:
+            if int(dl_id) == int(item['dl_id']):
+                gl.download_queue.remove(item)
+                total_count -= 1
+                return
 
 def arrange_queue(input):
     id_and_index = input.split('.')
     dl_id = int(id_and_index[0])
     index = int(id_and_index[1]) + 1
-    for item in gl.download_queue:
-        if int(item['dl_id']) == dl_id:
-            current_item = gl.download_queue.pop(gl.download_queue.index(item))
-            gl.download_queue.insert(index, current_item)
-            break
+    with gl.queue_lock:
+        for item in gl.download_queue:
+            if int(item['dl_id']) == dl_id:
+                current_item = gl.download_queue.pop(gl.download_queue.index(item))
+                gl.download_queue.insert(index, current_item)
+                break
 
 def get_style(size, left_border):
     return f"flex-grow: {size};" + ("border-left: 1px solid var(--border-color-primary);" if left_border else '') + "padding: 5px 10px 5px 10px;width: 0;align-self: center;"
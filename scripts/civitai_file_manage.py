@@ -9,8 +9,13 @@ import time
 import re
 import os
 import io
+import threading
 import gradio as gr
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty, Full
 from urllib.parse import urlparse
+from html import escape, unescape
 from pathlib import Path
 from PIL import Image
 
@@ -19,9 +24,13 @@ from modules.shared import cmd_opts, opts
 
 # === Extension imports ===
 import scripts.civitai_download as _download
+import scripts.civitai_folders as _folders
 import scripts.civitai_file_manage as _file
 import scripts.civitai_global as gl
 import scripts.civitai_api as _api
+import scripts.civitai_json as _json
+import scripts.civitai_ratelimit as _limit
+import scripts.civitai_scan_state as _scan_state
 from scripts.civitai_global import print, debug_print
 
 
@@ -36,10 +45,38 @@ try:
     from bs4 import BeautifulSoup
 except ImportError:
     print('Python module "BeautifulSoup" has not been imported correctly, please try to restart or install it manually.')
+try:
+    # Parses descriptions several times faster than the pure Python html.parser
+    import lxml
+    DESCRIPTION_PARSER = 'lxml'
+except ImportError:
+    DESCRIPTION_PARSER = 'html.parser'
 
 gl.init()
 
 css_path = Path(__file__).resolve().parents[1] / 'style_html.css'
+CSS_LINK = f'<link rel="stylesheet" type="text/css" href="{css_path}">'
+# Files shipped with the extension by path, (mtime, text), see read_static
+_static_files = {}
+# Tags rewritten by clean_description and the group each one is handled in
+DESCRIPTION_TAGS = {
+    'a': 'a', 'br': 'br', 'hr': 'hr', 'li': 'li', 's': 's',
+    'p': 'block', 'pre': 'block', 'h1': 'block', 'h2': 'block', 'h3': 'block', 'h4': 'block', 'h5': 'block', 'h6': 'block'
+}
+# Sample images in saved HTML pages, see convert_local_images
+IMG_TAG = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+IMG_SRC_ATTR = re.compile(r'''(\ssrc=)(?:"([^"]*)"|'([^']*)'|([^"'\s>]+))''', re.IGNORECASE)
+SAMPLE_IMG_ATTR = re.compile(r'''\sdata-sampleimg=["']?true\b''', re.IGNORECASE)
+IMAGE_SIGNATURES = ((b'\x89PNG\r\n\x1a\n', 'png'), (b'\xff\xd8\xff', 'jpeg'), (b'GIF87a', 'gif'), (b'GIF89a', 'gif'), (b'BM', 'bmp'))
+# Local images inlined by convert_local_images, by path and modification time
+DATA_URI_CACHE_MB = 64
+_data_uri_cache = OrderedDict()
+_data_uri_cache_size = 0
+_data_uri_cache_lock = threading.Lock()
+# Plain text of descriptions by content hash, see clean_description
+DESCRIPTION_CACHE_SIZE = 256
+_description_cache = OrderedDict()
+_description_cache_lock = threading.Lock()
 no_update = False
 from_ver = False
 from_tag = False
@@ -86,13 +123,13 @@ def delete_model(delete_finish=None, model_filename=None, model_string=None, lis
     # Delete based on provided SHA-256 hash
     if sha256:
         sha256_upper = sha256.upper()
-        for root, _, files in os.walk(model_folder, followlinks=True):
+        for root, _, files in _folders.walk(model_folder):
             for file in files:
                 if file.endswith('.json'):
                     file_path = os.path.join(root, file)
                     try:
                         with open(file_path, 'r', encoding='utf-8') as json_file:
-                            data = json.load(json_file)
+                            data = _json.load(json_file)
                             file_sha256 = data.get('sha256', '')
                             if file_sha256:
                                 file_sha256 = file_sha256.upper()
@@ -127,7 +164,7 @@ def delete_model(delete_finish=None, model_filename=None, model_string=None, lis
     filename_to_delete = os.path.splitext(model_filename)[0]
     aria2_file = model_filename + '.aria2'
     if not deleted:
-        for root, dirs, files in os.walk(model_folder, followlinks=True):
+        for root, dirs, files in _folders.walk(model_folder):
             for file in files:
                 current_file_name = os.path.splitext(file)[0]
                 if filename_to_delete == current_file_name or aria2_file == file:
@@ -141,6 +178,7 @@ def delete_model(delete_finish=None, model_filename=None, model_string=None, lis
                             print(f"Model deleted based on filename: {path_file}")
                         delete_associated_files(root, current_file_name)
 
+    _folders.invalidate()
     number = _download.random_number(delete_finish)
 
     btnDwn = not selected_list or selected_list == '[]'
@@ -214,7 +252,7 @@ def save_preview(file_path, api_response, overwrite_toggle=False, sha256=None):
         return
 
     if not sha256 and json_file.exists():
-        data = json.loads(json_file.read_text(encoding='utf-8'))
+        data = _json.loads(json_file.read_bytes())
         if 'sha256' in data and data['sha256']:
             sha256 = data['sha256'].upper()
     elif sha256:
@@ -250,6 +288,7 @@ def save_preview(file_path, api_response, overwrite_toggle=False, sha256=None):
                                     image_path.write_bytes(resized_image.read())
 
                                 print(f"Preview saved at: {image_path}")
+                                _folders.invalidate()
                             else:
                                 print(f"Failed to save preview. Status code: {response.status_code}")
                             return
@@ -332,11 +371,16 @@ def save_images(preview_html, model_filename, install_path, sub_folder, api_resp
             print(f"Error processing image {filename}: {e}")
 
     if downloaded_count > 0:
+        _folders.invalidate()
         print(f"Successfully downloaded {downloaded_count} images to: {image_path}")
     else:
         print("No images were downloaded.")
 
 def card_update(gr_components, model_name, list_versions, is_install):
+    model_id = re.search(r'\((\d+)\)$', model_name)
+    if model_id:
+        _api.forget_model_card(int(model_id.group(1)))
+
     if gr_components:
         version_choices = gr_components['choices']
     else:
@@ -344,7 +388,7 @@ def card_update(gr_components, model_name, list_versions, is_install):
         model_name += '.New'
         return model_name, None, None
 
-    if is_install and not gl.download_fail and not gl.cancel_status:
+    if is_install and not gl.download_job.failure and not gl.download_job.cancelled:
         version_value_clean = list_versions + ' [Installed]'
         version_choices_clean = [
             version if version + ' [Installed]' != version_value_clean else version_value_clean
@@ -376,7 +420,7 @@ def list_files(folders):
 
     for folder in folders:
         if folder and os.path.exists(folder):
-            for root, _, files in os.walk(folder, followlinks=True):
+            for root, _, files in _folders.walk(folder):
                 for file in files:
                     _, file_extension = os.path.splitext(file)
                     if file_extension.lower() in extensions:
@@ -391,7 +435,7 @@ def gen_sha256(file_path):
     if os.path.exists(json_file):
         try:
             with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+                data = _json.load(f)
 
             if 'sha256' in data and data['sha256']:
                 hash_value = data['sha256']
@@ -419,43 +463,90 @@ def gen_sha256(file_path):
     if os.path.exists(json_file):
         try:
             with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+                data = _json.load(f)
 
             if 'sha256' in data and data['sha256']:
                 data['sha256'] = hash_value
 
             with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4)
+                _json.dump(data, f, indent=True)
         except Exception as e:
             print(f"Failed to open {json_file}: {e}")
     else:
         data = {'sha256': hash_value}
         with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
+            _json.dump(data, f, indent=True)
 
     return hash_value
 
+def image_type(data):
+    """Image format from the first bytes of a file, PNG if it is not recognized."""
+    for signature, imgtype in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return imgtype
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return 'png'
+
+def served_by_gradio(path):
+    """Whether gradio's file= route serves a path: inside the WebUI folder or an allowed path, outside dot folders."""
+    path = os.path.abspath(path)
+    if any(part.startswith('.') for part in Path(path).parts):
+        return False
+    allowed = [os.getcwd()] + list(getattr(cmd_opts, 'gradio_allowed_path', None) or [])
+    return any(path == folder or path.startswith(os.path.join(folder, '')) for folder in map(os.path.abspath, allowed))
+
+def image_data_uri(path):
+    """The image at path as a data URI, cached by path and modification time."""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _data_uri_cache_lock:
+        data_uri = _data_uri_cache.get(key)
+        if data_uri:
+            _data_uri_cache.move_to_end(key)
+            return data_uri
+
+    with open(path, 'rb') as f:
+        imgdata = f.read()
+    data_uri = f"data:image/{image_type(imgdata)};base64,{base64.b64encode(imgdata).decode('utf-8')}"
+    with _data_uri_cache_lock:
+        global _data_uri_cache_size
+        _data_uri_cache[key] = data_uri
+        _data_uri_cache_size += len(data_uri)
+        while _data_uri_cache_size > DATA_URI_CACHE_MB * 1024 * 1024 and len(_data_uri_cache) > 1:
+            _, evicted = _data_uri_cache.popitem(last=False)
+            _data_uri_cache_size -= len(evicted)
+    return data_uri
+
+def local_image_src(src):
+    """src for a sample image saved with a local path, a file= URL when gradio serves it, else a data URI."""
+    path = urlparse(src).path
+    if not os.path.exists(path):
+        # Try the raw url, files can be saved in windows as "C:\..." and
+        # that confuses urlparse because people only really test on Linux.
+        if os.path.exists(src):
+            path = src
+        else:
+            print(f"URL path does not exist: {path}")
+            return None
+    if served_by_gradio(path):
+        return _api.local_file_url(path)
+    return image_data_uri(path)
+
 def convert_local_images(html):
-    soup = BeautifulSoup(html)
-    for simg in soup.find_all('img', attrs={'data-sampleimg': 'true'}):
-        url = urlparse(simg['src'])
-        path = url.path
-        if not os.path.exists(path):
-            print(f"URL path does not exist: {url.path}")
-            # Try the raw url, files can be saved in windows as "C:\..." and
-            # that confuses urlparse because people only really test on Linux.
-            if os.path.exists(simg['src']):
-                path = simg['src']
-            else:
-                continue
-        with open(path, 'rb') as f:
-            imgdata = f.read()
-        b64img = base64.b64encode(imgdata).decode('utf-8')
-        imgtype = Image.open(io.BytesIO(imgdata)).format
-        if not imgtype:
-            imgtype = 'PNG'
-        simg['src'] = f"data:image/{imgtype};base64,{b64img}"
-    return str(soup)
+    """Point the sample images of a saved HTML page at their local copies, only the <img> tags are rewritten."""
+    def convert_tag(tag_match):
+        tag = tag_match.group(0)
+        if not SAMPLE_IMG_ATTR.search(tag):
+            return tag
+        src_match = IMG_SRC_ATTR.search(tag)
+        if not src_match:
+            return tag
+        src = local_image_src(unescape(next(value for value in src_match.groups()[1:] if value is not None)))
+        if not src:
+            return tag
+        return f'{tag[:src_match.start()]}{src_match.group(1)}"{escape(src)}"{tag[src_match.end():]}'
+    return IMG_TAG.sub(convert_tag, html)
 
 def model_from_sent(model_name, content_type):
     modelID_failed = False
@@ -475,12 +566,9 @@ def model_from_sent(model_name, content_type):
 
     extensions = ['.pt', '.ckpt', '.pth', '.safetensors', '.th', '.zip', '.vae']
 
-    for content_type_item in content_type:
-        folder = _api.contenttype_folder(content_type_item)
-        for folder_path, _, files in os.walk(folder, followlinks=True):
-            for file in files:
-                if file.startswith(model_name) and file.endswith(tuple(extensions)):
-                    model_file = os.path.join(folder_path, file)
+    folders = [_api.contenttype_folder(content_type_item) for content_type_item in content_type]
+    folder = folders[-1]
+    model_file = _folders.find_model(folders, model_name, extensions)
 
     if not model_file:
         output_html = _api.api_error_msg('path_not_found')
@@ -513,17 +601,19 @@ def model_from_sent(model_name, content_type):
         else:
             json_data = None
 
+        if not isinstance(json_data, dict) and modelID != 'Model not found':
+            local_data = local_api_data(model_file, content_type[0] if isinstance(content_type, list) else content_type, modelID)
+            if local_data:
+                json_data = local_data
+                modelID = local_data['items'][0]['id']
+
         if not isinstance(json_data, dict):
             output_html = _api.api_error_msg(json_data)
         else:
             model_versions = _api.update_model_versions(modelID, json_data)
             output_html = _api.update_model_info(None, model_versions.get('value'), True, modelID, json_data, True)
 
-    css_path = Path(__file__).resolve().parents[1] / 'style_html.css'
-    with open(css_path, 'r', encoding='utf-8') as css_file:
-        css = css_file.read()
-
-    style_tag = f'<style>{css}</style>'
+    style_tag = f'<style>{read_static(css_path)}</style>'
     head_section = f'<head>{style_tag}</head>'
     output_html = str(head_section + output_html)
 
@@ -535,6 +625,71 @@ def model_from_sent(model_name, content_type):
         gr.Textbox.update(value=output_html, placeholder=number),  # Preview HTML
     )
 
+def local_api_data(model_file, content_type, model_id=None):
+    """
+    Build an API style response for an installed model from the files saved next to it, so it can be
+    shown without network access: the saved .api_info.json when available, otherwise a minimal payload
+    made from the sidecar JSON.
+    """
+    name = os.path.splitext(os.path.basename(model_file))[0]
+    api_info_name = f'{name}.api_info.json'
+    api_info_files = [os.path.join(os.path.dirname(model_file), api_info_name)]
+    image_location = getattr(opts, 'image_location', '')
+    if image_location:
+        api_info_files += _folders.find_files(image_location, api_info_name)
+
+    for api_info_file in api_info_files:
+        if not os.path.exists(api_info_file):
+            continue
+        try:
+            with open(api_info_file, 'r', encoding='utf-8') as f:
+                item = _json.load(f)
+            if isinstance(item, dict) and item.get('id') and item.get('modelVersions'):
+                debug_print(f"Using saved API info: {api_info_file}")
+                return {'items': [item], 'metadata': {}, '_local': True}
+        except Exception as e:
+            print(f"Failed to read {api_info_file}: {e}")
+
+    json_file = os.path.splitext(model_file)[0] + '.json'
+    try:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = _json.load(f)
+    except Exception:
+        return None
+
+    if model_id in (None, 'offline', 'Model not found'):
+        model_id = data.get('modelId')
+    if not model_id or model_id == 'Model not found':
+        return None
+
+    trained_words = data.get('activation text', '')
+    file_name = os.path.basename(model_file)
+    version = {
+        'id': data.get('modelVersionId') or 0,
+        'name': name,
+        'trainedWords': [trained_words] if trained_words else [],
+        'baseModel': data.get('sd version', ''),
+        'images': [],
+        'files': [{
+            'id': 0,
+            'name': file_name,
+            'primary': True,
+            'downloadUrl': '',
+            'sizeKB': os.path.getsize(model_file) / 1024,
+            'hashes': {'SHA256': data.get('sha256', '')},
+            'metadata': {'format': 'SafeTensor' if file_name.endswith('.safetensors') else 'Other'}
+        }]
+    }
+    item = {
+        'id': int(model_id),
+        'name': name,
+        'type': content_type,
+        'description': data.get('description', ''),
+        'tags': [],
+        'modelVersions': [version]
+    }
+    return {'items': [item], 'metadata': {}, '_local': True}
+
 def send_to_browser(model_name, content_type, click_first_item):
     modelID_failed = False
     output_html = None
@@ -551,12 +706,9 @@ def send_to_browser(model_name, content_type, click_first_item):
         content_type = ['LORA', 'LoCon']
     extensions = ['.pt', '.ckpt', '.pth', '.safetensors', '.th', '.zip', '.vae']
 
-    for content_type_item in content_type:
-        folder = _api.contenttype_folder(content_type_item)
-        for folder_path, _, files in os.walk(folder, followlinks=True):
-            for file in files:
-                if file.startswith(model_name) and file.endswith(tuple(extensions)):
-                    model_file = os.path.join(folder_path, file)
+    folders = [_api.contenttype_folder(content_type_item) for content_type_item in content_type]
+    folder = folders[-1]
+    model_file = _folders.find_model(folders, model_name, extensions)
 
     if not model_file:
         output_html = _api.api_error_msg('path_not_found')
@@ -572,10 +724,18 @@ def send_to_browser(model_name, content_type, click_first_item):
             output_html = _api.api_error_msg('offline')
             modelID_failed = True
 
-        if not modelID_failed:
-            gl.json_data = _api.request_civit_api(f"https://civitai.com/api/v1/models?ids={modelID}&nsfw=true")
-            output_html = _api.model_list_html(gl.json_data)
-            number = _download.random_number(click_first_item)
+        if modelID != 'Model not found':
+            json_data = None
+            if not modelID_failed:
+                json_data = _api.request_civit_api(f"https://civitai.com/api/v1/models?ids={modelID}&nsfw=true")
+            if not isinstance(json_data, dict):
+                json_data = local_api_data(model_file, content_type[0] if isinstance(content_type, list) else content_type, modelID) or json_data
+            if isinstance(json_data, dict):
+                gl.json_data = _api.compact_listing(json_data)
+                output_html = _api.model_list_html(gl.json_data)
+                number = _download.random_number(click_first_item)
+            elif not modelID_failed:
+                output_html = _api.api_error_msg(json_data)
 
     return (
         gr.Textbox.update(value=output_html),  # Card HTML
@@ -616,7 +776,7 @@ def getSubfolders(model_folder, basemodel=None, nsfw=None, author=None, modelNam
     try:
         dot_subfolders = getattr(opts, 'dot_subfolders', True)
         sub_folders = ['None']
-        for root, dirs, _ in os.walk(model_folder, followlinks=True):
+        for root, dirs, _ in _folders.walk(model_folder):
             if dot_subfolders:
                 dirs = [d for d in dirs if not d.startswith('.')]
                 dirs = [d for d in dirs if not any(part.startswith('.') for part in os.path.join(root, d).split(os.sep))]
@@ -675,6 +835,22 @@ def updateSubfolder(subfolderInput):
     with open(gl.subfolder_json, 'w') as f:
         json.dump(data, f, indent=4)
 
+def read_static(path):
+    """
+    Text of a file shipped with the extension, read once. With debug prints enabled
+    it is re-read when the file changes, so edits show up without a restart.
+    """
+    cached = _static_files.get(path)
+    if cached and not gl.do_debug_print:
+        return cached[1]
+    mtime = os.path.getmtime(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    _static_files[path] = (mtime, text)
+    return text
+
 def is_image_url(url):
     image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']
     parsed = urlparse(url)
@@ -684,6 +860,25 @@ def is_image_url(url):
 def clean_description(desc):
     """
     This function cleans up HTML descriptions for better readability.
+    Results are cached by content hash, the files of a model all share its description.
+    """
+    key = hashlib.sha1(desc.encode('utf-8')).digest()
+    with _description_cache_lock:
+        cleaned_text = _description_cache.get(key)
+        if cleaned_text is not None:
+            _description_cache.move_to_end(key)
+            return cleaned_text
+
+    cleaned_text = _clean_description(desc)
+    with _description_cache_lock:
+        _description_cache[key] = cleaned_text
+        if len(_description_cache) > DESCRIPTION_CACHE_SIZE:
+            _description_cache.popitem(last=False)
+    return cleaned_text
+
+def _clean_description(desc, parser=None):
+    """
+    Uncached clean_description, parser defaults to DESCRIPTION_PARSER.
     Fix taken from PR #384.
     """
     try:
@@ -692,32 +887,40 @@ def clean_description(desc):
         cleaned_text = ''.join(cleaned_lines)
         cleaned_text = re.sub(r'\s{2,}', ' ', cleaned_text)
         # Begin html processing
-        soup = BeautifulSoup(cleaned_text, 'html.parser')
-        for a in soup.find_all('a', href=True):
+        soup = BeautifulSoup(cleaned_text, parser or DESCRIPTION_PARSER)
+        # Collect the tags handled below in a single pass over the tree, in document order
+        found = {group: [] for group in DESCRIPTION_TAGS.values()}
+        for e in soup.descendants:
+            group = DESCRIPTION_TAGS.get(e.name)
+            if group:
+                found[group].append(e)
+        for a in found['a']:
+            if not a.has_attr('href'):
+                continue
             hyperlink_url = a['href']
             if not is_image_url(hyperlink_url):
                 # Add the URL to the text if they are different
                 a.replace_with(a.text + (f' ({hyperlink_url})' if a.text != hyperlink_url else ''))
         # Apply markdown-like formatting and newlines for various blocks
-        for e in soup.find_all(['br']):
+        for e in found['br']:
             e.replace_with('\n')
-        for e in soup.find_all(['hr']):
+        for e in found['hr']:
             e.replace_with('\n\n')
-        for e in soup.find_all(['li']):
+        for e in found['li']:
             if e.text.strip():
                 e.insert_before('- ')
                 e.insert_after('\n')
                 e.unwrap()
             else:
                 e.replace_with('\n')
-        for e in soup.find_all(['s']):
+        for e in found['s']:
             if e.text.strip():
                 e.insert_before('~~')
                 e.insert_after('~~')
                 e.unwrap()
             else:
                 e.replace_with('')
-        for e in soup.find_all(['p', 'pre', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+        for e in found['block']:
             if e.text.strip():
                 e.insert_after('\n\n')
                 e.unwrap()
@@ -782,9 +985,8 @@ def save_model_info(install_path, file_name, sub_folder, sha256=None, preview_ht
             indentation = match.group(1)
         else:
             indentation = ''
-        css_link = f'<link rel="stylesheet" type="text/css" href="{css_path}">'
         utf8_meta_tag = f'{indentation}<meta charset="UTF-8">'
-        head_section = f'{indentation}<head>{indentation}    {utf8_meta_tag}{indentation}    {css_link}{indentation}</head>'
+        head_section = f'{indentation}<head>{indentation}    {utf8_meta_tag}{indentation}    {CSS_LINK}{indentation}</head>'
         HTML = head_section + preview_html
         path_to_new_file = os.path.join(save_path, f'{filename}.html')
         with open(path_to_new_file, 'wb') as f:
@@ -795,7 +997,8 @@ def save_model_info(install_path, file_name, sub_folder, sha256=None, preview_ht
         path_to_new_file = os.path.join(save_path, f'{filename}.api_info.json')
         if not os.path.exists(path_to_new_file) or overwrite_toggle:
             with open(path_to_new_file, mode='w', encoding='utf-8') as f:
-                json.dump(gl.json_info, f, indent=4, ensure_ascii=False)
+                _json.dump(gl.json_info, f, indent=True)
+    _folders.invalidate()
 
 
 def find_and_save(api_response, sha256=None, file_name=None, json_file=None, no_hash=None, overwrite_toggle=None):
@@ -840,7 +1043,7 @@ def find_and_save(api_response, sha256=None, file_name=None, json_file=None, no_
                     if os.path.exists(json_file):
                         with open(json_file, 'r', encoding='utf-8') as f:
                             try:
-                                content = json.load(f)
+                                content = _json.load(f)
                             except:
                                 content = {}
                     else:
@@ -864,7 +1067,7 @@ def find_and_save(api_response, sha256=None, file_name=None, json_file=None, no_
                         changed = True
 
                     with open(json_file, 'w', encoding='utf-8') as f:
-                        json.dump(content, f, indent=4)
+                        _json.dump(content, f, indent=True)
 
                     if changed:
                         print(f"Model info saved to: {json_file}")
@@ -872,7 +1075,7 @@ def find_and_save(api_response, sha256=None, file_name=None, json_file=None, no_
 
     return 'not found'
 
-def get_models(file_path, gen_hash=None):
+def get_models(file_path, gen_hash=None, recheck=False):
     modelId = None
     modelVersionId = None
     sha256 = None
@@ -880,7 +1083,7 @@ def get_models(file_path, gen_hash=None):
     if os.path.exists(json_file):
         try:
             with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+                data = _json.load(f)
 
                 if 'modelId' in data:
                     modelId = data['modelId']
@@ -891,6 +1094,10 @@ def get_models(file_path, gen_hash=None):
         except Exception as e:
             print(f"Failed to open {json_file}: {e}")
 
+    # Models that were not found before may have been uploaded since
+    if recheck and modelId == 'Model not found':
+        modelId = modelVersionId = None
+
     if not modelId or not modelVersionId or not sha256:
         if not sha256 and gen_hash:
             sha256 = gen_sha256(file_path)
@@ -900,12 +1107,15 @@ def get_models(file_path, gen_hash=None):
         else:
             return modelId if modelId else None
 
+    if getattr(opts, 'offline_mode', False) and (not modelId or not modelVersionId):
+        return modelId if modelId else 'offline'
+
     proxies, ssl = _api.get_proxies()
     try:
         if not modelId or not modelVersionId:
-            response = requests.get(by_hash, timeout=(60, 30), proxies=proxies, verify=ssl)
+            response = _limit.get(by_hash, timeout=(60, 30), proxies=proxies, verify=ssl)
             if response.status_code == 200:
-                api_response = response.json()
+                api_response = _json.loads(response.content)
                 if 'error' in api_response:
                     print(f"{file_path}: {api_response['error']}")
                     return None
@@ -921,14 +1131,14 @@ def get_models(file_path, gen_hash=None):
             if os.path.exists(json_file):
                 try:
                     with open(json_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+                        data = _json.load(f)
 
                     data['modelId'] = modelId
                     data['modelVersionId'] = modelVersionId
                     data['sha256'] = sha256.upper()
 
                     with open(json_file, 'w', encoding='utf-8') as f:
-                        json.dump(data, f, indent=4)
+                        _json.dump(data, f, indent=True)
                 except Exception as e:
                     print(f"Failed to open {json_file}: {e}")
             else:
@@ -938,7 +1148,7 @@ def get_models(file_path, gen_hash=None):
                     'sha256': sha256.upper()
                 }
                 with open(json_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=4)
+                    _json.dump(data, f, indent=True)
 
         return modelId
     except requests.exceptions.Timeout:
@@ -961,7 +1171,7 @@ def version_match(file_paths, api_response):
         if os.path.exists(json_path):
             with open(json_path, 'r', encoding='utf-8') as f:
                 try:
-                    json_data = json.load(f)
+                    json_data = _json.load(f)
                     sha256 = json_data.get('sha256')
                     if sha256:
                         sha256_hashes[os.path.basename(file_path)] = sha256.upper()
@@ -1037,10 +1247,251 @@ def get_save_path_and_name(install_path, file_name, api_response, sub_folder=Non
 
     return save_path, name
 
-def file_scan(folders, ver_finish, tag_finish, installed_finish, preview_finish, overwrite_toggle, tile_count, gen_hash, create_html, progress=gr.Progress() if queue else None):
-    global no_update
+_PIPELINE_END = object()
+
+def _pipeline_put(pipe, entry, stop):
+    """Put an entry on a bounded pipeline queue, giving up once the scan is stopped."""
+    while not stop.is_set():
+        try:
+            pipe.put(entry, timeout=0.2)
+            return True
+        except Full:
+            continue
+    return False
+
+def _pipeline_get(pipe, stop):
+    while not stop.is_set():
+        try:
+            return pipe.get(timeout=0.2)
+        except Empty:
+            continue
+    return _PIPELINE_END
+
+def fetch_model_payloads(model_ids, session=None, max_retries=3):
+    """
+    Fetch the model payloads for a chunk of model IDs, following nextPage links.
+    Requests go through the shared rate limiter which retries throttled and failed pages,
+    None is returned once all retries are used up.
+    """
     proxies, ssl = _api.get_proxies()
-    gl.scan_files = True
+    items = []
+    url = f"https://civitai.com/api/v1/models?limit=100&nsfw=true{''.join(f'&ids={model_id}' for model_id in model_ids)}"
+    while url:
+        try:
+            response = _limit.get(url, session=session, max_retries=max_retries, timeout=(60, 30), proxies=proxies, verify=ssl)
+        except requests.exceptions.Timeout:
+            print(f"Request timed out for {url}.")
+            return None
+        except requests.exceptions.ConnectionError:
+            print("Failed to connect to the API. The servers might be offline.")
+            return None
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            return None
+
+        if response.status_code != 200:
+            print(f"Error: Received status code {response.status_code} with URL: {url}")
+            debug_print(response.text)
+            print(f"Giving up on {len(model_ids)} model(s) after {max_retries} retries.")
+            return None
+
+        try:
+            api_response_json = _json.loads(response.content)
+            items.extend(api_response_json['items'])
+        except (ValueError, KeyError) as e:
+            print(f"Invalid API response for {url}: {e}")
+            return None
+        url = api_response_json.get('metadata', {}).get('nextPage', None)
+    return items
+
+def scan_pipeline(files, gen_hash, checkpoint, scan_state, freshness, fetch_payloads, write_item=None, progress=None):
+    """
+    Resolve model files through a streaming pipeline so disk and network stay busy at the same time:
+        hash -> by-hash ID lookup -> model payload fetch -> write (tags, previews)
+    Stages are connected by bounded queues, the calling thread only reports progress and handles cancellation.
+    """
+    stages = ['hash', 'lookup', 'fetch', 'write'] if fetch_payloads else ['hash', 'lookup']
+    stats = {stage: 0 for stage in stages}
+    result = {'resolved': [], 'items': [], 'failed': [], 'finished': 0, 'cancelled': False, 'error': None}
+    stop = threading.Event()
+    hash_queue, fetch_queue, write_queue = Queue(maxsize=64), Queue(maxsize=256), Queue(maxsize=256)
+    chunk_size = 100
+
+    def hash_stage():
+        for file_path in files:
+            if stop.is_set():
+                break
+            cached = _scan_state.checkpoint_result(checkpoint, file_path)
+            if cached:
+                entry = (file_path, cached['model_id'], True)
+            else:
+                model_id = _scan_state.cached_model_id(scan_state, file_path, freshness)
+                if model_id is _scan_state.MISS:
+                    if gen_hash:
+                        gen_sha256(file_path)
+                    entry = (file_path, None, False)
+                else:
+                    _scan_state.checkpoint_record(checkpoint, file_path, model_id)
+                    entry = (file_path, model_id, True)
+            stats['hash'] += 1
+            if not _pipeline_put(hash_queue, entry, stop):
+                return
+        _pipeline_put(hash_queue, _PIPELINE_END, stop)
+
+    def lookup_stage():
+        while True:
+            entry = _pipeline_get(hash_queue, stop)
+            if entry is _PIPELINE_END:
+                break
+            file_path, model_id, resolved = entry
+            file_name = os.path.basename(file_path)
+            if not resolved:
+                model_id = get_models(file_path, gen_hash, recheck=True)
+                if model_id != 'offline' and (model_id != None or gen_hash):
+                    _scan_state.record(scan_state, file_path, model_id)
+                if model_id != 'offline':
+                    _scan_state.checkpoint_record(checkpoint, file_path, model_id)
+                    _scan_state.save_checkpoint(checkpoint, scan_state)
+            stats['lookup'] += 1
+
+            if model_id == 'offline':
+                print('The CivitAI servers did not respond, unable to retrieve Model ID')
+            elif model_id == 'Model not found':
+                debug_print(f"model: '{file_name}' not found on CivitAI servers.")
+            elif model_id != None:
+                result['resolved'].append((file_path, model_id))
+                if fetch_payloads:
+                    if not _pipeline_put(fetch_queue, (file_path, model_id), stop):
+                        return
+                    continue
+            else:
+                print(f"model ID not found for: '{file_name}'")
+            result['finished'] += 1
+        if fetch_payloads:
+            _pipeline_put(fetch_queue, _PIPELINE_END, stop)
+
+    def fetch_stage():
+        workers = max(1, int(getattr(opts, 'scan_fetch_workers', 4)))
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        session.mount('https://', adapter)
+
+        items_by_id = {}
+        failed_ids = set()
+        requested = set()
+        pending = []
+        inflight = deque()  # (future, entries), drained in submission order
+
+        def submit(executor):
+            model_ids = list(dict.fromkeys(int(model_id) for _, model_id in pending if int(model_id) not in requested))
+            requested.update(model_ids)
+            future = executor.submit(fetch_model_payloads, model_ids, session) if model_ids else None
+            inflight.append((future, list(pending)))
+            pending.clear()
+
+        def drain(block):
+            while inflight and (block or inflight[0][0] is None or inflight[0][0].done()):
+                future, entries = inflight.popleft()
+                items = future.result() if future else []
+                if items is None:
+                    # The chunk failed after its retries, its files are reported and the scan goes on
+                    failed_ids.update(int(model_id) for _, model_id in entries)
+                    items = []
+                for item in items:
+                    items_by_id[int(item['id'])] = item
+                    result['items'].append(item)
+                for file_path, model_id in entries:
+                    stats['fetch'] += 1
+                    if int(model_id) in failed_ids and int(model_id) not in items_by_id:
+                        result['failed'].append((file_path, model_id))
+                        result['finished'] += 1
+                        continue
+                    if not _pipeline_put(write_queue, (file_path, model_id, items_by_id.get(int(model_id))), stop):
+                        return False
+            return True
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                entry = _pipeline_get(fetch_queue, stop)
+                if entry is _PIPELINE_END:
+                    if pending:
+                        submit(executor)
+                    if drain(True) and not stop.is_set():
+                        _pipeline_put(write_queue, _PIPELINE_END, stop)
+                    break
+
+                if not pending and not inflight and int(entry[1]) in items_by_id:
+                    stats['fetch'] += 1
+                    if not _pipeline_put(write_queue, (*entry, items_by_id[int(entry[1])]), stop):
+                        break
+                    continue
+
+                pending.append(entry)
+                new_ids = {int(model_id) for _, model_id in pending if int(model_id) not in requested}
+                if len(new_ids) >= chunk_size or not new_ids:
+                    submit(executor)
+                if not drain(len(inflight) > workers * 2):
+                    break
+
+            if stop.is_set():
+                for future, _ in inflight:
+                    if future:
+                        future.cancel()
+        session.close()
+
+    def write_stage():
+        while True:
+            entry = _pipeline_get(write_queue, stop)
+            if entry is _PIPELINE_END:
+                break
+            file_path, model_id, item = entry
+            if item and write_item:
+                try:
+                    write_item(file_path, model_id, {'items': [item]})
+                except Exception as e:
+                    print(f"Failed to process '{os.path.basename(file_path)}': {e}")
+            stats['write'] += 1
+            result['finished'] += 1
+
+    def guarded(stage):
+        # An unexpected error in one stage stops the others instead of leaving them waiting forever
+        def run():
+            try:
+                workers[stage]()
+            except Exception as e:
+                print(f"Scan stage '{stage}' failed: {e}")
+                result['error'] = 'error'
+                stop.set()
+        return run
+
+    workers = {'hash': hash_stage, 'lookup': lookup_stage, 'fetch': fetch_stage, 'write': write_stage}
+    threads = [threading.Thread(target=gl.in_session(guarded(stage)), daemon=True) for stage in stages]
+    started = time.time()
+    for thread in threads:
+        thread.start()
+
+    labels = {'hash': 'Hashing', 'lookup': 'ID lookup', 'fetch': 'Fetching info', 'write': 'Saving'}
+    job = gl.scan_job
+    while any(thread.is_alive() for thread in threads):
+        if job.cancelled and not stop.is_set():
+            result['cancelled'] = True
+            stop.set()
+        if progress != None:
+            elapsed = max(time.time() - started, 0.001)
+            desc = ' | '.join(f"{labels[stage]}: {stats[stage]}/{len(files)} ({stats[stage] / elapsed:.1f}/s)" for stage in stages)
+            api_stats = _limit.limiter.stats()
+            if api_stats['throttled']:
+                desc += f" | API throttled {api_stats['throttled']}x, {api_stats['concurrency']} concurrent"
+            progress(result['finished'] / len(files), desc=desc)
+        job.cancel_event.wait(0.25)
+
+    for thread in threads:
+        thread.join()
+    return result
+
+def file_scan(folders, ver_finish, tag_finish, installed_finish, preview_finish, overwrite_toggle, tile_count, gen_hash, create_html, resume_scan=False, progress=gr.Progress() if queue else None):
+    global no_update
+    gl.scan_job.start()
     no_update = False
 
     if from_ver:
@@ -1056,7 +1507,7 @@ def file_scan(folders, ver_finish, tag_finish, installed_finish, preview_finish,
         if progress != None:
             progress(0, desc='No model type selected.')
         no_update = True
-        gl.scan_files = False
+        gl.scan_job.finish()
         time.sleep(2)
         return (
             gr.HTML.update(value='<div style="min-height: 0px;"></div>'),
@@ -1100,7 +1551,6 @@ def file_scan(folders, ver_finish, tag_finish, installed_finish, preview_finish,
                 folders_to_check.append(folder)
 
     total_files = 0
-    files_done = 0
 
     files = list_files(folders_to_check)
     total_files += len(files)
@@ -1109,120 +1559,104 @@ def file_scan(folders, ver_finish, tag_finish, installed_finish, preview_finish,
         if progress != None:
             progress(1, desc='No files in selected folder.')
         no_update = True
-        gl.scan_files = False
+        gl.scan_job.finish()
         time.sleep(2)
         return (
             gr.HTML.update(value='<div style="min-height: 0px;"></div>'),
             gr.Textbox.update(value=number)
         )
 
-    updated_models = []
-    outdated_models = []
-    all_model_ids = []
-    file_paths = []
-    all_ids = []
-
-    for file_path in files:
-        if gl.cancel_status:
-            if progress != None:
-                progress(files_done / total_files, desc='Processing files cancelled.')
-            no_update = True
-            gl.scan_files = False
-            time.sleep(2)
-            return (
-                gr.HTML.update(value='<div style="min-height: 0px;"></div>'),
-                gr.Textbox.update(value=number)
-            )
-        file_name = os.path.basename(file_path)
-        if progress != None:
-            progress(files_done / total_files, desc=f"Processing file: {file_name}")
+    scan_state = _scan_state.load()
+    _scan_state.prune(scan_state, folders_to_check, files)
+    freshness = getattr(opts, 'scan_freshness_hours', 24) * 3600
 
-        model_id = get_models(file_path, gen_hash)
-        if model_id == 'offline':
-            print('The CivitAI servers did not respond, unable to retrieve Model ID')
-        elif model_id == 'Model not found':
-            debug_print(f"model: '{file_name}' not found on CivitAI servers.")
-        elif model_id != None:
-            all_model_ids.append(f"&ids={model_id}")
-            all_ids.append(model_id)
-            file_paths.append(file_path)
-        elif not model_id:
-            print(f"model ID not found for: '{file_name}'")
-        files_done += 1
+    scan_mode = 'from_ver' if from_ver else 'from_tag' if from_tag else 'from_installed' if from_installed else 'from_preview'
+    checkpoint = _scan_state.start_checkpoint(scan_mode, folders_to_check, resume_scan)
 
-    all_items = []
+    if from_tag:
+        def write_item(file_path, id_value, api_response):
+            if (_scan_state.checkpoint_result(checkpoint, file_path) or {}).get('done'):
+                return
+            install_path, file_name = os.path.split(file_path)
+            save_path, name = get_save_path_and_name(install_path, file_name, api_response)
+            model_versions = _api.update_model_versions(id_value, api_response)
+            html_path = os.path.join(save_path, f'{name}.html')
 
-    all_model_ids = list(set(all_model_ids))
+            if create_html and not os.path.exists(html_path) or create_html and overwrite_toggle:
+                preview_html = _api.update_model_info(None, model_versions.get('value'), True, id_value, api_response, True)
+            else:
+                preview_html = None
+            sub_folder = os.path.normpath(os.path.relpath(install_path, gl.main_folder))
+            save_model_info(install_path, file_name, sub_folder, preview_html=preview_html, api_response=api_response, overwrite_toggle=overwrite_toggle)
+            _scan_state.checkpoint_done(checkpoint, file_path)
+            _scan_state.save_checkpoint(checkpoint)
 
-    if not all_model_ids:
-        progress(1, desc='No model IDs could be retrieved.')
-        print("Could not retrieve any Model IDs, please make sure to turn on the 'One-Time Hash Generation for externally downloaded models.' option if you haven't already.")
+    elif from_preview:
+        def write_item(file_path, id_value, api_response):
+            if (_scan_state.checkpoint_result(checkpoint, file_path) or {}).get('done'):
+                return
+            save_preview(file_path, api_response, overwrite_toggle)
+            _scan_state.checkpoint_done(checkpoint, file_path)
+            _scan_state.save_checkpoint(checkpoint)
+
+    else:
+        write_item = None
+
+    pipeline = scan_pipeline(files, gen_hash, checkpoint, scan_state, freshness, not from_installed, write_item, progress)
+    _scan_state.save_checkpoint(checkpoint, scan_state, force=True)
+
+    if pipeline['cancelled']:
+        if progress != None:
+            progress(pipeline['finished'] / total_files, desc='Processing files cancelled.')
         no_update = True
-        gl.scan_files = False
+        gl.scan_job.finish()
         time.sleep(2)
         return (
             gr.HTML.update(value='<div style="min-height: 0px;"></div>'),
             gr.Textbox.update(value=number)
         )
 
-    def chunks(lst, n):
-        for i in range(0, len(lst), n):
-            yield lst[i:i + n]
+    if pipeline['failed']:
+        # Their files are not marked as done in the checkpoint, resuming the scan retries only them
+        print(f"Couldn't fetch the model info for {len(pipeline['failed'])} file(s), scan again with 'Resume previous scan' to retry them.")
+        for file_path, _ in pipeline['failed']:
+            debug_print(f"Model info not fetched: {file_path}")
 
-    if not from_installed:
-        model_chunks = list(chunks(all_model_ids, 500))
+    if pipeline['error']:
+        gl.scan_job.finish()
+        return (
+            gr.HTML.update(value=_api.api_error_msg(pipeline['error'])),
+            gr.Textbox.update(value=number)
+        )
 
-        base_url = "https://civitai.com/api/v1/models?limit=100&nsfw=true"
-        url_list = [f"{base_url}{''.join(chunk)}" for chunk in model_chunks]
+    file_paths = [file_path for file_path, _ in pipeline['resolved']]
+    all_model_ids = list({f"&ids={model_id}" for _, model_id in pipeline['resolved']})
 
-        url_count = len(all_model_ids) // 100
-        if len(all_model_ids) % 100 != 0:
-            url_count += 1
-        url_done = 0
-        api_response = {}
-        for url in url_list:
-            while url:
-                try:
-                    if progress != None:
-                        progress(url_done / url_count, desc=f"Sending API request... {url_done}/{url_count}")
-                    response = requests.get(url, timeout=(60, 30), proxies=proxies, verify=ssl)
-                    if response.status_code == 200:
-                        api_response_json = response.json()
-                        all_items.extend(api_response_json['items'])
-                        metadata = api_response_json.get('metadata', {})
-                        url = metadata.get('nextPage', None)
-                    elif response.status_code == 503:
-                        print(f"Error: Received status code: {response.status_code} with URL: {url}")
-                        print(response.text)
-                        return (
-                            gr.HTML.update(value=_api.api_error_msg('error')),
-                            gr.Textbox.update(value=number)
-                        )
-                    else:
-                        print(f"Error: Received status code {response.status_code} with URL: {url}")
-                        url = None
-                    url_done += 1
-                except requests.exceptions.Timeout:
-                    print(f"Request timed out for {url}. Skipping...")
-                    url = None
-                except requests.exceptions.ConnectionError:
-                    print("Failed to connect to the API. The servers might be offline.")
-                    url = None
-                except Exception as e:
-                    print(f"An unexpected error occurred: {e}")
-                    url = None
+    if not all_model_ids:
+        if progress != None:
+            progress(1, desc='No model IDs could be retrieved.')
+        print("Could not retrieve any Model IDs, please make sure to turn on the 'One-Time Hash Generation for externally downloaded models.' option if you haven't already.")
+        _scan_state.finish_checkpoint()
+        no_update = True
+        gl.scan_job.finish()
+        time.sleep(2)
+        return (
+            gr.HTML.update(value='<div style="min-height: 0px;"></div>'),
+            gr.Textbox.update(value=number)
+        )
 
-        api_response['items'] = all_items
-        if api_response['items'] == []:
-            return (
-                gr.HTML.update(value=_api.api_error_msg('no_items')),
-                gr.Textbox.update(value=number)
-            )
+    if not from_installed and not pipeline['items']:
+        gl.scan_job.finish()
+        return (
+            gr.HTML.update(value=_api.api_error_msg('no_items')),
+            gr.Textbox.update(value=number)
+        )
 
     if progress != None:
         progress(1, desc='Processing final results...')
 
     if from_ver:
+        api_response = {'items': pipeline['items']}
         updated_models, outdated_models = version_match(file_paths, api_response)
 
         updated_set = set(updated_models)
@@ -1236,57 +1670,42 @@ def file_scan(folders, ver_finish, tag_finish, installed_finish, preview_finish,
             print(f'"{model_name}" is currently outdated.')
 
         if len(all_model_ids) == 0:
+            _scan_state.finish_checkpoint()
             no_update = True
-            gl.scan_files = False
+            gl.scan_job.finish()
             return (
                 gr.HTML.update(value='<div style="font-size: 24px; text-align: center; margin: 50px !important;">No updates found for selected models.</div>'),
                 gr.Textbox.update(value=number)
             )
 
+    def chunks(lst, n):
+        for i in range(0, len(lst), n):
+            yield lst[i:i + n]
+
     model_chunks = list(chunks(all_model_ids, tile_count))
 
     base_url = "https://civitai.com/api/v1/models?limit=100&nsfw=true"
     gl.url_list = {i + 1: f"{base_url}{''.join(chunk)}" for i, chunk in enumerate(model_chunks)}
 
+    if not pipeline['failed']:
+        _scan_state.finish_checkpoint()
+    gl.scan_job.finish()
+
     if from_ver:
-        gl.scan_files = False
         return (
             gr.HTML.update(value='<div style="font-size: 24px; text-align: center; margin: 50px !important;">Outdated models have been found.<br>Please press the button above to load the models into the browser tab</div>'),
             gr.Textbox.update(value=number)
         )
 
     elif from_installed:
-        gl.scan_files = False
         return (
             gr.HTML.update(value='<div style="font-size: 24px; text-align: center; margin: 50px !important;">Installed models have been loaded.<br>Please press the button above to load the models into the browser tab</div>'),
             gr.Textbox.update(value=number)
         )
 
     elif from_tag:
-        completed_tags = 0
-        tag_count = len(file_paths)
-
-        for file_path, id_value in zip(file_paths, all_ids):
-            install_path, file_name = os.path.split(file_path)
-            save_path, name = get_save_path_and_name(install_path, file_name, api_response)
-            model_versions = _api.update_model_versions(id_value, api_response)
-            html_path = os.path.join(save_path, f'{name}.html')
-
-            if create_html and not os.path.exists(html_path) or create_html and overwrite_toggle:
-                preview_html = _api.update_model_info(None, model_versions.get('value'), True, id_value, api_response, True)
-            else:
-                preview_html = None
-            completed_tags += 1
-            if progress != None:
-                progress(
-                    completed_tags / tag_count,
-                    desc=f"Saving tags{' & HTML' if preview_html else ''}... {completed_tags}/{tag_count} | {name}"
-                )
-            sub_folder = os.path.normpath(os.path.relpath(install_path, gl.main_folder))
-            save_model_info(install_path, file_name, sub_folder, preview_html=preview_html, api_response=api_response, overwrite_toggle=overwrite_toggle)
         if progress != None:
             progress(1, desc='All tags succesfully saved!')
-        gl.scan_files = False
         time.sleep(2)
         return (
             gr.HTML.update(value='<div style="min-height: 0px;"></div>'),
@@ -1294,19 +1713,6 @@ def file_scan(folders, ver_finish, tag_finish, installed_finish, preview_finish,
         )
 
     elif from_preview:
-        completed_preview = 0
-        preview_count = len(file_paths)
-        for file in file_paths:
-            _, file_name = os.path.split(file)
-            name = os.path.splitext(file_name)[0]
-            completed_preview += 1
-            if progress != None:
-                progress(
-                    completed_preview / preview_count,
-                    desc=f"Saving preview images... {completed_preview}/{preview_count} | {name}"
-                )
-            save_preview(file, api_response, overwrite_toggle)
-        gl.scan_files = False
         return (
             gr.HTML.update(value='<div style="min-height: 0px;"></div>'),
             gr.Textbox.update(value=number)
@@ -1412,12 +1818,6 @@ def load_to_browser(content_type, sort_type, period_type, use_search_term, searc
     )
 
 def cancel_scan():
-    gl.cancel_status = True
-
-    while True:
-        if not gl.scan_files:
-            gl.cancel_status = False
-            return
-        else:
-            time.sleep(0.5)
-            continue
\ No newline at end of file
+    gl.scan_job.cancel()
+    gl.scan_job.wait()
+    gl.scan_job.reset()
\ No newline at end of file
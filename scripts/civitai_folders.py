@@ -0,0 +1,165 @@
+import bisect
+import os
+from collections import defaultdict
+import threading
+import time
+
+# Model folders are listed once and kept in memory, shared by everything that used to os.walk them.
+# A lookup checks the mtime of every listed directory (adding, removing or renaming an entry
+# changes it) and lists again only the directories that changed, instead of walking the whole tree.
+
+# Listings checked this recently are trusted without looking at the disk again
+REVALIDATE_AFTER = 0.5
+# Directories modified this recently are listed again on the next check, on filesystems with
+# coarse timestamps a change right after the listing may not move the mtime
+RACY_SECONDS = 2.0
+
+
+class Snapshot:
+    """Directory tree below a folder, listed with os.scandir and revalidated by directory mtimes."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.dirs = {}          # path -> (mtime, [sub directory names], [file names])
+        self.checked = 0
+        self.version = 0        # bumped whenever a listing changed
+        self.indexes = {}       # see find_model and find_files
+        self.lock = threading.Lock()
+
+    def refresh(self, force=False):
+        with self.lock:
+            if not force and self.checked and time.monotonic() - self.checked < REVALIDATE_AFTER:
+                return
+            dirs = {}
+            changed = self._scan(self.folder, dirs, set())
+            if changed or dirs.keys() != self.dirs.keys():
+                self.version += 1
+            self.dirs = dirs
+            self.checked = time.monotonic()
+
+    def _scan(self, path, dirs, seen):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return False
+
+        changed = False
+        cached = self.dirs.get(path)
+        if cached and cached[0] == mtime and time.time() - mtime > RACY_SECONDS:
+            subdirs, files = cached[1], cached[2]
+        else:
+            subdirs, files = [], []
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            is_dir = False
+                        if not is_dir:
+                            files.append(entry.name)
+                            continue
+                        if entry.is_symlink():
+                            # followlinks, but don't loop on links pointing to a parent
+                            real = os.path.realpath(entry.path)
+                            if real in seen:
+                                continue
+                            seen.add(real)
+                        subdirs.append(entry.name)
+            except OSError:
+                return False
+            changed = not cached or cached[1] != subdirs or cached[2] != files
+
+        dirs[path] = (mtime, subdirs, files)
+        for name in subdirs:
+            changed = self._scan(os.path.join(path, name), dirs, seen) or changed
+        return changed
+
+    def walk(self, top=None, dirs=None):
+        """Same results as os.walk(top, followlinks=True) from the listings, top defaults to the folder."""
+        top = top or self.folder
+        dirs = dirs or self.dirs
+        listing = dirs.get(top)
+        if not listing:
+            return
+        subdirs = list(listing[1])
+        yield top, subdirs, list(listing[2])
+        # Like os.walk, sub directories removed from the list by the caller are skipped
+        for name in subdirs:
+            yield from self.walk(os.path.join(top, name), dirs)
+
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def snapshot(folder):
+    """Up to date Snapshot of a folder, created on first use."""
+    folder = os.path.abspath(folder)
+    with _snapshots_lock:
+        snap = _snapshots.get(folder)
+        if not snap:
+            snap = _snapshots[folder] = Snapshot(folder)
+    snap.refresh()
+    return snap
+
+def walk(folder):
+    """os.walk(folder, followlinks=True) from the snapshot of the folder, or of a folder containing it."""
+    folder = os.path.abspath(folder)
+    with _snapshots_lock:
+        snap = _snapshots.get(folder) or next(
+            (snap for root, snap in _snapshots.items() if folder.startswith(os.path.join(root, ''))), None
+        )
+    if not snap:
+        snap = snapshot(folder)
+    else:
+        snap.refresh()
+    yield from snap.walk(folder)
+
+def invalidate():
+    """Check every snapshot against the disk on its next use, called after the extension writes or deletes files."""
+    with _snapshots_lock:
+        for snap in _snapshots.values():
+            snap.checked = 0
+
+def find_model(folders, model_name, extensions):
+    """
+    Path of a model file in folders for a name sent from an extra networks card: the file
+    whose name without extension is model_name, or else the first one starting with it.
+    """
+    extensions = tuple(extensions)
+    prefix_match = None
+    for folder in folders:
+        snap = snapshot(folder)
+        index = snap.indexes.get(extensions)
+        if not index or index[0] != snap.version:
+            entries = sorted(
+                (file, os.path.join(root, file))
+                for root, _, files in snap.walk()
+                for file in files if file.endswith(extensions)
+            )
+            names = [name for name, _ in entries]
+            stems = {}
+            for name, path in entries:
+                stems.setdefault(os.path.splitext(name)[0], path)
+            index = snap.indexes[extensions] = (snap.version, names, [path for _, path in entries], stems)
+
+        _, names, paths, stems = index
+        if model_name in stems:
+            return stems[model_name]
+        position = bisect.bisect_left(names, model_name)
+        if not prefix_match and position < len(names) and names[position].startswith(model_name):
+            prefix_match = paths[position]
+    return prefix_match
+
+def find_files(folder, file_name):
+    """Paths of the files named file_name anywhere below folder, from a name index kept with the snapshot."""
+    snap = snapshot(folder)
+    index = snap.indexes.get('names')
+    if not index or index[0] != snap.version:
+        names = defaultdict(list)
+        for root, _, files in snap.walk():
+            for file in files:
+                names[file].append(os.path.join(root, file))
+        index = snap.indexes['names'] = (snap.version, names)
+    return list(index[1].get(file_name, ()))
@@ -1,5 +1,6 @@
 ## === ANXETY EDITs ===
-import warnings, os, json
+import warnings, os, json, sys, time, types, inspect, functools, threading
+import gradio as gr
 from urllib3.exceptions import InsecureRequestWarning
 from datetime import datetime
 
@@ -26,6 +27,73 @@ class Colors:
     RESET = '\033[0m'
 
 
+class Job:
+    """
+    State of a download or scan: idle -> running -> (cancelling) -> idle.
+    Workers check `cancelled` or wait on `cancel_event`, callers block in `wait` until the job stopped.
+    `failure` is None, True or a reason like 'NO_API'.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.state = 'idle'
+        self.failure = None
+        self.cancel_event = threading.Event()
+        self._cond = threading.Condition()
+
+    @property
+    def running(self):
+        return self.state != 'idle'
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def start(self):
+        with self._cond:
+            self.state = 'running'
+            self.failure = None
+            self.cancel_event.clear()
+
+    def cancel(self):
+        """Request cancellation, cancelled jobs count as failed."""
+        with self._cond:
+            self.failure = self.failure or True
+            self.cancel_event.set()
+            if self.state == 'running':
+                self.state = 'cancelling'
+
+    def fail(self, reason=True):
+        self.failure = reason
+
+    def succeed(self):
+        with self._cond:
+            if not self.cancel_event.is_set():
+                self.failure = None
+
+    def finish(self):
+        with self._cond:
+            self.state = 'idle'
+            self._cond.notify_all()
+
+    def reset(self):
+        """Clear the outcome of the last run, unless a new one already started."""
+        with self._cond:
+            if self.state == 'idle':
+                self.failure = None
+                self.cancel_event.clear()
+
+    def wait(self, timeout=None):
+        """Block until the job is no longer running."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.state == 'idle', timeout)
+
+
+# Downloads are processed one at a time for everyone, scans and syncs belong to a session (see SESSION_KEYS)
+download_job = Job('download')
+scan_job = Job('scan')
+sync_job = Job('sync')
+
 do_debug_print = getattr(opts, 'civitai_debug_prints', False)
 def init():
     warnings.simplefilter('ignore', InsecureRequestWarning)
@@ -34,9 +102,8 @@ def init():
     if not os.path.exists(config_folder):
         os.mkdir(config_folder)
 
-    global download_queue, last_version, cancel_status, recent_model, last_url, json_data, json_info, main_folder, previous_inputs, download_fail, sortNewest, isDownloading, scan_files, from_update_tab, url_list, print, subfolder_json
+    global download_queue, last_version, recent_model, last_url, json_data, json_info, main_folder, previous_inputs, sortNewest, from_update_tab, url_list, print, subfolder_json, scan_state_json, scan_checkpoint_json, api_cache_dir, thumb_cache_dir
 
-    cancel_status = None
     recent_model = None
     json_data = None
     json_info = None
@@ -52,11 +119,13 @@ def init():
             #json.dump({}, json_file)
             json.dump({'created_at': datetime.now().timestamp()}, json_file)
 
+    scan_state_json = os.path.join(config_folder, 'civitai_scan_state.json')
+    scan_checkpoint_json = os.path.join(config_folder, 'civitai_scan_checkpoint.json')
+    api_cache_dir = os.path.join(config_folder, 'civitai_api_cache')
+    thumb_cache_dir = os.path.join(config_folder, 'civitai_thumbs')
+
     from_update_tab = False
-    scan_files = False
-    download_fail = False
     sortNewest = False
-    isDownloading = False
 
 _print = print
 def print(print_message):
@@ -64,4 +133,102 @@ def print(print_message):
 
 def debug_print(print_message):
     if do_debug_print:
-        _print(f"{Colors.MAGENTA}[DEBUG] {Colors.BLUE}[CivitAI-Browser+]{Colors.RESET} - {print_message}")
\ No newline at end of file
+        _print(f"{Colors.MAGENTA}[DEBUG] {Colors.BLUE}[CivitAI-Browser+]{Colors.RESET} - {print_message}")
+
+
+# === Per-session state ===
+# Browser state is kept per gradio session (browser tab), so users sharing one WebUI don't overwrite
+# each other's pages. The download queue is shared and only modified while holding queue_lock,
+# downloads run one at a time, download_lock is held while the next download is claimed.
+SESSION_KEYS = ('json_data', 'json_info', 'url_list', 'previous_inputs', 'from_update_tab', 'main_folder', 'sortNewest', 'scan_job', 'sync_job')
+SESSION_TIMEOUT = 24 * 60 * 60
+
+queue_lock = threading.RLock()
+download_lock = threading.Lock()
+
+_local = threading.local()
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def session_state(session_id):
+    """Return the state of a session, sessions idle for longer than SESSION_TIMEOUT are dropped."""
+    with _sessions_lock:
+        now = time.time()
+        state = _sessions.get(session_id)
+        if state is None:
+            for expired in [key for key, value in _sessions.items() if now - value['_used'] > SESSION_TIMEOUT]:
+                del _sessions[expired]
+            state = _sessions[session_id] = {
+                'json_data': None,
+                'json_info': None,
+                'url_list': {},
+                'previous_inputs': None,
+                'from_update_tab': False,
+                'main_folder': None,
+                'sortNewest': False,
+                'scan_job': Job('scan'),
+                'sync_job': Job('sync')
+            }
+        state['_used'] = now
+        return state
+
+def session_scoped(fn):
+    """
+    Wrap a gradio event handler so the SESSION_KEYS attributes of this module resolve to the state
+    of the session that triggered the event. Gradio passes the request because of the annotation.
+    """
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def run(request, *args, **kwargs):
+        previous = getattr(_local, 'state', None)
+        _local.state = session_state(getattr(request, 'session_hash', None) or 'default')
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.state = previous
+
+    request_param = inspect.Parameter('request', inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=gr.Request)
+    run.__signature__ = signature.replace(parameters=[request_param, *signature.parameters.values()])
+    run.__annotations__ = {**getattr(fn, '__annotations__', {}), 'request': gr.Request}
+    return run
+
+def in_session(fn):
+    """Bind fn to the session of the calling thread, for the target of a worker thread started by an event handler."""
+    state = getattr(_local, 'state', None)
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        previous = getattr(_local, 'state', None)
+        _local.state = state
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.state = previous
+    return run
+
+def scope_to_sessions(blocks):
+    """Make every event handler registered on the blocks session aware."""
+    for block_fn in blocks.fns:
+        if block_fn.fn is not None:
+            block_fn.fn = session_scoped(block_fn.fn)
+
+class _GlobalModule(types.ModuleType):
+    """Resolves the SESSION_KEYS attributes to the current session, outside of a session the module value is used."""
+
+    def __getattribute__(self, name):
+        if name in SESSION_KEYS:
+            state = getattr(_local, 'state', None)
+            if state is not None:
+                return state[name]
+        return super().__getattribute__(name)
+
+    def __setattr__(self, name, value):
+        if name in SESSION_KEYS:
+            state = getattr(_local, 'state', None)
+            if state is not None:
+                state[name] = value
+                return
+        super().__setattr__(name, value)
+
+sys.modules[__name__].__class__ = _GlobalModule
@@ -13,8 +13,11 @@ from modules.options import categories
 # === Extension imports ===
 import scripts.civitai_download as _download
 import scripts.civitai_file_manage as _file
+import scripts.civitai_folders as _folders
 import scripts.civitai_global as gl
 import scripts.civitai_api as _api
+import scripts.civitai_sync as _sync
+import scripts.civitai_thumbs as _thumbs
 from scripts.civitai_global import print, debug_print
 
 
@@ -63,12 +66,6 @@ def saveSettings(ust, ct, pt, st, bf, cj, ol, hi, sn, ss, ts):
         print(f"Updated settings to: {config}")
 
 # === ANXETY EDITs ===
-def all_visible(html_check):
-    # Count the number of model-checkbox occurrences in the HTML
-    checkbox_count = html_check.count('model-checkbox')
-    # Show the button only if there are 2 or more checkboxes (more than 1 model to select)
-    return gr.Button.update(visible=checkbox_count >= 2)
-
 def HTMLChange(input):
     return gr.HTML.update(value=input)
 
@@ -92,7 +89,7 @@ def show_multi_buttons(model_list, type_list, version_value):
         model_folder = os.path.join(_api.contenttype_folder(type_list[0]))
         default_subfolder = 'None'
         try:
-            for root, dirs, _ in os.walk(model_folder, followlinks=True):
+            for root, dirs, _ in _folders.walk(model_folder):
                 if dot_subfolders:
                     dirs = [d for d in dirs if not d.startswith('.')]
                     dirs = [d for d in dirs if not any(part.startswith('.') for part in os.path.join(root, d).split(os.sep))]
@@ -254,7 +251,7 @@ def on_ui_tabs():
             with gr.Row(elem_id='select_all_models_container'):
                 select_all = gr.Button(value='Select All', elem_id='select_all_models', visible=False)
             with gr.Row():
-                list_html = gr.HTML(value='<div style="font-size: 24px; text-align: center; margin: 50px;">Click the search icon to load models.<br>Use the filter icon to filter results.</div>')
+                list_html = gr.HTML(value='<div style="font-size: 24px; text-align: center; margin: 50px;">Click the search icon to load models.<br>Use the filter icon to filter results.</div>', elem_id='civitai_list_html')
             with gr.Row():
                 download_progress = gr.HTML(value='<div style="min-height: 0px;"></div>', elem_id='DownloadProgress')
             with gr.Row():
@@ -295,6 +292,7 @@ def on_ui_tabs():
                 overwrite_toggle = gr.Checkbox(elem_id='overwrite_toggle', label='Overwrite any existing files. (previews, HTMLs, tags, descriptions)', value=True, min_width=300)
                 skip_hash_toggle = gr.Checkbox(elem_id='skip_hash_toggle', label='One-Time Hash Generation for externally downloaded models.', value=True, min_width=300)
                 do_html_gen = gr.Checkbox(elem_id='do_html_gen', label='Save HTML file for each model when updating info & tags (increases process time).', value=False, min_width=300)
+                resume_scan = gr.Checkbox(elem_id='resume_scan', label='Resume previous scan (skips files already processed by a cancelled or interrupted scan).', value=False, min_width=300)
             with gr.Row():
                 save_all_tags = gr.Button(value='Update model info & tags', interactive=True, visible=True)
                 cancel_all_tags = gr.Button(value='Cancel updating model info & tags', interactive=False, visible=False)
@@ -322,6 +320,14 @@ def on_ui_tabs():
                 cancel_organize = gr.Button(value='Cancel loading models', interactive=False, visible=False)
             with gr.Row():
                 organize_progress = gr.HTML(value='<div style="min-height: 0px;"></div>')
+            with gr.Row():
+                with gr.Column(scale=4):
+                    manifest_path = gr.Textbox(label='Sync manifest:', placeholder='/path/to/manifest.json', max_lines=1)
+                sync_plan = gr.Button(value='Show sync plan', interactive=True, visible=True)
+                sync_run = gr.Button(value='Sync models to manifest', interactive=True, visible=True)
+                cancel_sync = gr.Button(value='Cancel sync', interactive=True, visible=True)
+            with gr.Row():
+                sync_progress = gr.HTML(value='<div style="min-height: 0px;"></div>')
 
         # Queue Tab
         with gr.Tab(label='Download Queue', elem_id='queueTab'):
@@ -369,7 +375,10 @@ def on_ui_tabs():
         html_cancel_input = gr.Textbox(elem_id='html_cancel_input', visible=False)
         queue_html_input = gr.Textbox(elem_id='queue_html_input', visible=False)
         list_html_input = gr.Textbox(elem_id='list_html_input', visible=False)
+        more_html_input = gr.Textbox(elem_id='more_html_input', visible=False)
+        load_more_trigger = gr.Textbox(elem_id='load_more_trigger', visible=False)
         preview_html_input = gr.Textbox(elem_id='preview_html_input', visible=False)
+        gallery_html_input = gr.Textbox(elem_id='gallery_html_input', visible=False)
         create_subfolder = gr.Textbox(elem_id='create_subfolder', visible=False)
         send_to_browser = gr.Textbox(elem_id='send_to_browser', visible=False)
         arrange_dl_id = gr.Textbox(elem_id='arrange_dl_id', visible=False)
@@ -408,6 +417,10 @@ def on_ui_tabs():
 
         # Javascript Functions #
 
+        list_html_input.change(fn=None, inputs=[list_html_input, list_html], outputs=list_html, _js='(payload, current) => renderCardList(payload, current)')
+        list_html_input.change(fn=None, inputs=list_html_input, outputs=select_all, _js='(payload) => selectAllUpdate(payload)')
+        list_html.change(fn=None, _js='() => { setupCardMedia(); setupInfiniteScroll(); }')
+        more_html_input.change(fn=None, inputs=more_html_input, _js='(payload) => appendCardList(payload)')
         list_html_input.change(fn=None, inputs=hide_installed, _js='(toggleValue) => hideInstalled(toggleValue)')
         hide_installed.input(fn=None, inputs=hide_installed, _js='(toggleValue) => hideInstalled(toggleValue)')
 
@@ -421,6 +434,8 @@ def on_ui_tabs():
 
         preview_html_input.change(fn=None, _js='() => adjustFilterBoxAndButtons()')
         preview_html_input.change(fn=None, _js='() => setDescriptionToggle()')
+        gallery_html_input.change(fn=None, inputs=gallery_html_input, _js='(payload) => insertModelGallery(payload)')
+        preview_html.change(fn=None, _js='() => applyModelGallery()')
 
         back_to_top.click(fn=None, _js='() => BackToTop()')
 
@@ -442,7 +457,6 @@ def on_ui_tabs():
         # Filter button Functions #
 
         queue_html_input.change(fn=HTMLChange, inputs=[queue_html_input], outputs=download_manager_html)
-        list_html_input.change(fn=HTMLChange, inputs=[list_html_input], outputs=list_html)
         preview_html_input.change(fn=HTMLChange, inputs=[preview_html_input], outputs=preview_html)
 
         remove_dl_id.change(
@@ -487,8 +501,6 @@ def on_ui_tabs():
 
         civitai_text2img_input.change(fn=txt2img_output,inputs=civitai_text2img_input,outputs=civitai_text2img_output)
 
-        list_html_input.change(fn=all_visible, inputs=list_html_input, outputs=select_all)
-
         def update_models_dropdown(input):
             # If there is no loaded model data, reset all UI elements and show a message
             if not gl.json_data:
@@ -533,7 +545,7 @@ def on_ui_tabs():
                 current_sha256,
                 install_path,
                 sub_folder
-            ) = _api.update_model_info(model_string, model_versions.get('value'))
+            ) = _api.update_model_info(model_string, model_versions.get('value'), gallery=False)
 
             # Return all UI updates in the expected order
             return (
@@ -578,6 +590,10 @@ def on_ui_tabs():
                 save_info,
                 list_html_input
             ]
+        ).then(
+            fn=_api.update_model_gallery,
+            inputs=[list_models, list_versions],
+            outputs=[gallery_html_input]
         )
 
         model_sent.change(
@@ -604,8 +620,12 @@ def on_ui_tabs():
             outputs=[install_path]
         )
 
+        def update_version_info(model_string, model_version):
+            # The sample images follow with update_model_gallery
+            return _api.update_model_info(model_string, model_version, gallery=False)
+
         list_versions.select(
-            fn=_api.update_model_info,
+            fn=update_version_info,
             inputs=[
                 list_models,
                 list_versions
@@ -625,6 +645,10 @@ def on_ui_tabs():
                 install_path,
                 sub_folder
             ]
+        ).then(
+            fn=_api.update_model_gallery,
+            inputs=[list_models, list_versions],
+            outputs=[gallery_html_input]
         )
 
         file_list.input(
@@ -880,7 +904,8 @@ def on_ui_tabs():
             overwrite_toggle,
             tile_count_slider,
             skip_hash_toggle,
-            do_html_gen
+            do_html_gen,
+            resume_scan
         ]
 
         load_to_browser_inputs = [
@@ -919,6 +944,12 @@ def on_ui_tabs():
             trigger(fn=function, inputs=inputs_to_use, outputs=page_outputs)
             trigger(fn=None, _js='() => multi_model_select()')
 
+        load_more_trigger.change(
+            fn=_api.more_model_page,
+            inputs=page_inputs,
+            outputs=[list_models, more_html_input, get_next_page, page_slider]
+        )
+
         for button in cancel_btn_list:
             button.click(fn=_file.cancel_scan)
 
@@ -1118,6 +1149,20 @@ def on_ui_tabs():
             outputs=browser_list
         )
 
+        sync_plan.click(
+            fn=_sync.sync_plan,
+            inputs=[manifest_path],
+            outputs=[sync_progress]
+        )
+
+        sync_run.click(
+            fn=_sync.sync_run,
+            inputs=[manifest_path],
+            outputs=[sync_progress]
+        )
+
+        cancel_sync.click(fn=_sync.cancel_sync)
+
         # Settings function
         create_subfolder.change(
             fn=_file.updateSubfolder,
@@ -1125,6 +1170,9 @@ def on_ui_tabs():
             outputs=[]
         )
 
+    # Keep browser state separate for every user of the WebUI
+    gl.scope_to_sessions(civitai_interface)
+
     tab_name = 'CivitAI Browser+'
     return (civitai_interface, tab_name, 'civitai_interface'),
 
@@ -1247,6 +1295,54 @@ def on_ui_settings():
         ).info('Number of images to save when using the Save Images button or when auto_save_all_img is enabled')
     )
 
+    shared.opts.add_option(
+        'sync_download_workers',
+        shared.OptionInfo(
+            default=3,
+            label='Parallel downloads when syncing to a manifest',
+            component=gr.Slider,
+            component_args=lambda: {'maximum': '8', 'minimum': '1', 'step': '1'},
+            section=download,
+            category_id=cat_id
+        ).info('Number of models downloaded at the same time by "Sync models to manifest". Sync downloads skip the download queue and aria2, cancel them with "Cancel sync"')
+    )
+
+    shared.opts.add_option(
+        'scan_freshness_hours',
+        shared.OptionInfo(
+            default=24,
+            label='Hours before scanned models are looked up again',
+            component=gr.Slider,
+            component_args=lambda: {'maximum': '336', 'minimum': '0', 'step': '1'},
+            section=download,
+            category_id=cat_id
+        ).info('Unchanged files are not re-processed by the Update Models tab, their model IDs (and models not found on CivitAI) are looked up again after this many hours')
+    )
+
+    shared.opts.add_option(
+        'scan_fetch_workers',
+        shared.OptionInfo(
+            default=4,
+            label='Parallel API requests when scanning installed models',
+            component=gr.Slider,
+            component_args=lambda: {'maximum': '16', 'minimum': '1', 'step': '1'},
+            section=download,
+            category_id=cat_id
+        ).info('Number of model info pages fetched at the same time by the Update Models tab')
+    )
+
+    shared.opts.add_option(
+        'api_rate_limit',
+        shared.OptionInfo(
+            default=5,
+            label='Maximum CivitAI API requests per second',
+            component=gr.Slider,
+            component_args=lambda: {'maximum': '20', 'minimum': '1', 'step': '1'},
+            section=download,
+            category_id=cat_id
+        ).info('Shared by all API calls, concurrency is lowered automatically and requests are retried when CivitAI responds with 429/503')
+    )
+
     shared.opts.add_option(
         'save_html_on_save',
         shared.OptionInfo(
@@ -1318,6 +1414,80 @@ def on_ui_settings():
         ).info('Only works if all images of the corresponding model are downloaded')
     )
 
+    shared.opts.add_option(
+        'offline_mode',
+        shared.OptionInfo(
+            default=False,
+            label='Offline mode',
+            section=browser,
+            category_id=cat_id
+        ).info('Never contact CivitAI, the browser shows cached API responses and installed models are shown from their saved info')
+    )
+
+    shared.opts.add_option(
+        'api_cache_entries',
+        shared.OptionInfo(
+            default=500,
+            label='Number of API responses kept for offline use',
+            component=gr.Slider,
+            component_args=lambda: {'maximum': '5000', 'minimum': '0', 'step': '50'},
+            section=browser,
+            category_id=cat_id
+        ).info('Cached responses are shown when CivitAI is unreachable, 0 disables the cache')
+    )
+
+    shared.opts.add_option(
+        'client_side_cards',
+        shared.OptionInfo(
+            default=False,
+            label='Render model cards in the browser',
+            section=browser,
+            category_id=cat_id
+        ).info('Sends pages as compact JSON and builds the cards in the browser, reduces page size and server load. Requires UI reload')
+    )
+
+    shared.opts.add_option(
+        'infinite_scroll',
+        shared.OptionInfo(
+            default=False,
+            label='Infinite scroll',
+            section=browser,
+            category_id=cat_id
+        ).info('Loads the next page when scrolling to the end of the model list, cards far outside the view are unloaded. Requires UI reload')
+    )
+
+    shared.opts.add_option(
+        'thumbnail_cache',
+        shared.OptionInfo(
+            default=False,
+            label='Cache card images locally',
+            section=browser,
+            category_id=cat_id
+        ).info('Card images are downloaded once, stored resized as WebP and served from disk on later visits')
+    )
+
+    shared.opts.add_option(
+        'thumbnail_cache_mb',
+        shared.OptionInfo(
+            default=500,
+            label='Card image cache size (MB)',
+            component=gr.Slider,
+            component_args=lambda: {'minimum': 50, 'maximum': 5000, 'step': 50},
+            section=browser,
+            category_id=cat_id
+        ).info('The least recently shown images are removed once the cache grows past this size')
+    )
+
+    shared.opts.add_option(
+        'local_previews',
+        shared.OptionInfo(
+            default=True,
+            label='Use saved previews of installed models',
+            section=browser,
+            category_id=cat_id
+        ).info('Cards and model pages of installed models show the .preview.png saved next to the model instead of loading it from CivitAI, model folders outside the WebUI folder need --gradio-allowed-path')
+    )
+
     shared.opts.add_option(
         'page_header',
         shared.OptionInfo(
@@ -1541,4 +1711,5 @@ def on_ui_settings():
         )
 
 script_callbacks.on_ui_tabs(on_ui_tabs)
+script_callbacks.on_app_started(_thumbs.on_app_started)
 script_callbacks.on_ui_settings(on_ui_settings)
\ No newline at end of file
@@ -0,0 +1,45 @@
+import json
+
+# === Extension imports ===
+from scripts.civitai_global import debug_print
+
+# Fastest available JSON library for parsing, the standard library is always there as a fallback
+try:
+    import orjson
+    backend = 'orjson'
+except ImportError:
+    orjson = None
+    try:
+        import ujson
+        backend = 'ujson'
+    except ImportError:
+        ujson = None
+        backend = 'json'
+
+debug_print(f"Using JSON backend: {backend}")
+
+# Raised by every backend on invalid input (orjson and ujson errors subclass ValueError)
+JSONDecodeError = ValueError
+
+
+def loads(data):
+    """Parse JSON from str or bytes, bytes are parsed directly without decoding them first."""
+    if orjson:
+        return orjson.loads(data)
+    if ujson:
+        return ujson.loads(data)
+    return json.loads(data)
+
+def dumps(obj, indent=False):
+    """
+    Serialize to a str, always with the standard library so every backend writes the same bytes:
+    4 space indentation and non-ASCII characters escaped, like the sidecars written so far.
+    orjson can't do either, the other backends are only used for parsing.
+    """
+    return json.dumps(obj, indent=4 if indent else None)
+
+def load(f):
+    return loads(f.read())
+
+def dump(obj, f, indent=False):
+    f.write(dumps(obj, indent))
@@ -0,0 +1,167 @@
+import random
+import threading
+import time
+import requests
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# ===  WebUI imports ===
+from modules.shared import opts
+
+# === Extension imports ===
+from scripts.civitai_global import print, debug_print
+
+
+# Status codes worth retrying for idempotent GET requests
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Status codes telling us to slow down
+THROTTLE_STATUS = {429, 503}
+# Longest wait before a retry (and longest pause of all callers), a longer Retry-After ends the retries
+MAX_RETRY_DELAY = 30.0
+# Retries for requests the UI is waiting on, a throttled page load is reported instead of waited out
+INTERACTIVE_RETRIES = 1
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every CivitAI API caller, with AIMD-style adaptive concurrency:
+    each successful request slowly raises the number of requests allowed in flight,
+    every 429/503 halves it and pauses all callers for the server's Retry-After.
+    """
+
+    def __init__(self, min_concurrency=1, max_concurrency=16, start_concurrency=4):
+        self.cond = threading.Condition()
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(start_concurrency)
+        self.active = 0
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.started = time.monotonic()
+
+    def _rate(self):
+        return max(0.1, float(getattr(opts, 'api_rate_limit', 5)))
+
+    def _refill(self, now):
+        rate = self._rate()
+        self.tokens = min(max(rate, 1.0), self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a token and a concurrency slot are available."""
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.active >= int(self.concurrency):
+                    wait = None
+                elif self.tokens < 1:
+                    wait = (1 - self.tokens) / self._rate()
+                else:
+                    self.tokens -= 1
+                    self.active += 1
+                    self.requests += 1
+                    return
+                self.cond.wait(timeout=wait)
+
+    def release(self, throttled=False, retry_after=None):
+        """Return a slot, adapting concurrency to whether the request was throttled."""
+        with self.cond:
+            self.active -= 1
+            if throttled:
+                self.throttled += 1
+                self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, time.monotonic() + min(retry_after, MAX_RETRY_DELAY))
+                debug_print(f"API throttled, concurrency lowered to {int(self.concurrency)}")
+            else:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self.cond.notify_all()
+
+    def count_retry(self):
+        with self.cond:
+            self.retries += 1
+
+    def stats(self):
+        """Current request rate, concurrency and throttle counters."""
+        with self.cond:
+            elapsed = max(time.monotonic() - self.started, 0.001)
+            return {
+                'rate': self.requests / elapsed,
+                'concurrency': int(self.concurrency),
+                'active': self.active,
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'retries': self.retries
+            }
+
+
+limiter = RateLimiter()
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def backoff(attempt, base=1.0, cap=60.0):
+    """Exponential backoff with jitter, so throttled callers do not retry in lockstep."""
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def get(url, session=None, max_retries=3, **kwargs):
+    """
+    Rate limited GET request. Throttling, server errors, timeouts and connection errors are retried;
+    the last response is returned (or the last exception raised) once all retries are used up,
+    or right away when the server asks to wait longer than MAX_RETRY_DELAY.
+    """
+    session = session or requests
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        error = None
+        throttled = False
+        retry_after = None
+        # The slot is given back whatever happens, a lost slot would block every later request
+        try:
+            response = session.get(url, **kwargs)
+            if response.status_code in RETRY_STATUS:
+                throttled = response.status_code in THROTTLE_STATUS
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            error = e
+        finally:
+            limiter.release(throttled=throttled, retry_after=retry_after)
+
+        if error:
+            if attempt == max_retries:
+                raise error
+            limiter.count_retry()
+            debug_print(f"Retrying {url} after error: {error}")
+            time.sleep(backoff(attempt, cap=MAX_RETRY_DELAY))
+            continue
+
+        status = response.status_code
+        if status not in RETRY_STATUS:
+            return response
+
+        if attempt == max_retries or (retry_after or 0) > MAX_RETRY_DELAY:
+            return response
+        limiter.count_retry()
+        delay = retry_after if retry_after is not None else backoff(attempt, cap=MAX_RETRY_DELAY)
+        print(f"CivitAI responded with {status}, retrying in {delay:.1f}s...")
+        time.sleep(delay)
+    return response
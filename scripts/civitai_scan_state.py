@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+
+# === Extension imports ===
+import scripts.civitai_global as gl
+import scripts.civitai_json as _json
+from scripts.civitai_global import print, debug_print
+
+
+gl.init()
+
+# Returned by cached_model_id when the file has to be looked up again
+MISS = object()
+
+# Scan stages update the state and checkpoint from worker threads
+_lock = threading.RLock()
+
+
+def load():
+    """Load the persisted scan state, keyed by absolute model file path."""
+    if not os.path.exists(gl.scan_state_json):
+        return {}
+    try:
+        with open(gl.scan_state_json, 'r', encoding='utf-8') as f:
+            state = _json.load(f)
+        return state if isinstance(state, dict) else {}
+    except Exception as e:
+        print(f"Failed to read scan state, starting a fresh scan: {e}")
+        return {}
+
+def save(state):
+    """Write the scan state atomically so a crash never leaves a truncated file behind."""
+    tmp_path = gl.scan_state_json + '.tmp'
+    try:
+        with _lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                _json.dump(state, f)
+            os.replace(tmp_path, gl.scan_state_json)
+    except Exception as e:
+        print(f"Failed to save scan state: {e}")
+
+def file_signature(file_path):
+    """
+    Stat signature of a model file, changes whenever the file is modified. The sidecar JSON is left out,
+    saving tags and previews rewrites it and would make every file look changed on the next scan.
+    """
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+def cached_model_id(state, file_path, freshness):
+    """
+    Return the stored model ID for an unchanged file checked within the last `freshness` seconds,
+    or MISS if it has to be resolved again (changed file, or an ID or failed lookup that got old).
+    """
+    entry = state.get(file_path)
+    if not entry or entry.get('signature') != file_signature(file_path):
+        return MISS
+    if time.time() - entry.get('checked_at', 0) > freshness:
+        return MISS
+
+    debug_print(f"Using cached scan result for: {file_path}")
+    return entry.get('model_id')
+
+def record(state, file_path, model_id):
+    """Store the result of resolving a model file."""
+    json_file = os.path.splitext(file_path)[0] + '.json'
+    model_version_id = None
+    sha256 = None
+    if os.path.exists(json_file):
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                data = _json.load(f)
+            model_version_id = data.get('modelVersionId')
+            sha256 = data.get('sha256')
+        except Exception:
+            pass
+
+    with _lock:
+        state[file_path] = {
+            'signature': file_signature(file_path),
+            'model_id': model_id,
+            'model_version_id': model_version_id,
+            'sha256': sha256,
+            'checked_at': time.time()
+        }
+
+def prune(state, folders, files):
+    """Drop entries of files that no longer exist inside the scanned folders."""
+    # With the separator, scanning models/Lora leaves the entries of models/Lora2 alone
+    folders = tuple(os.path.join(str(folder), '') for folder in folders)
+    existing = set(files)
+    for file_path in list(state):
+        if file_path.startswith(folders) and file_path not in existing:
+            del state[file_path]
+
+def start_checkpoint(mode, folders, resume=False):
+    """
+    Start a scan checkpoint, or pick up the previous one when `resume` is set and it was
+    interrupted while scanning the same folders in the same mode.
+    """
+    folders = sorted(str(folder) for folder in folders)
+    if resume and os.path.exists(gl.scan_checkpoint_json):
+        try:
+            with open(gl.scan_checkpoint_json, 'r', encoding='utf-8') as f:
+                checkpoint = _json.load(f)
+            if checkpoint.get('mode') == mode and checkpoint.get('folders') == folders:
+                print(f"Resuming previous scan, {len(checkpoint['results'])} files already processed.")
+                checkpoint['saved_at'] = time.time()
+                return checkpoint
+            print('Previous scan was started with different options, starting a new scan.')
+        except Exception as e:
+            print(f"Failed to read scan checkpoint, starting a new scan: {e}")
+
+    return {'mode': mode, 'folders': folders, 'results': {}, 'saved_at': time.time()}
+
+def checkpoint_result(checkpoint, file_path):
+    """Return the checkpointed result of a file, or None if it has not been processed yet."""
+    return checkpoint['results'].get(file_path)
+
+def checkpoint_record(checkpoint, file_path, model_id, done=False):
+    with _lock:
+        checkpoint['results'][file_path] = {'model_id': model_id, 'done': done}
+
+def checkpoint_done(checkpoint, file_path):
+    """Mark the final stage (tags, previews) of a file as completed."""
+    with _lock:
+        result = checkpoint['results'].setdefault(file_path, {'model_id': None})
+        result['done'] = True
+
+def save_checkpoint(checkpoint, state=None, force=False, interval=5):
+    """Persist the checkpoint (and scan state) at most every `interval` seconds unless forced."""
+    if not force and time.time() - checkpoint['saved_at'] < interval:
+        return
+    checkpoint['saved_at'] = time.time()
+    tmp_path = gl.scan_checkpoint_json + '.tmp'
+    try:
+        with _lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                _json.dump(checkpoint, f)
+            os.replace(tmp_path, gl.scan_checkpoint_json)
+    except Exception as e:
+        print(f"Failed to save scan checkpoint: {e}")
+    if state is not None:
+        save(state)
+
+def finish_checkpoint():
+    """Remove the checkpoint once a scan ran to completion."""
+    try:
+        if os.path.exists(gl.scan_checkpoint_json):
+            os.remove(gl.scan_checkpoint_json)
+    except Exception as e:
+        print(f"Failed to remove scan checkpoint: {e}")
@@ -0,0 +1,325 @@
+import hashlib
+import json
+import os
+import threading
+import requests
+import gradio as gr
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html import escape
+from pathlib import Path
+
+# ===  WebUI imports ===
+from modules.shared import cmd_opts, opts
+
+# === Extension imports ===
+import scripts.civitai_download as _download
+import scripts.civitai_file_manage as _file
+import scripts.civitai_global as gl
+import scripts.civitai_api as _api
+import scripts.civitai_scan_state as _scan_state
+from scripts.civitai_global import print, debug_print
+
+
+gl.init()
+
+try:
+    queue = not cmd_opts.no_gradio_queue
+except AttributeError:
+    queue = not cmd_opts.disable_queue
+except:
+    queue = True
+
+# Hashes of local files by (path, size, mtime), so repeated plans don't read unchanged files again
+_hashes = {}
+_hashes_lock = threading.Lock()
+
+
+def load_manifest(manifest_path):
+    """
+    Load a sync manifest from disk.
+    The manifest is a JSON list (or a dict with a "models" list) of entries like:
+        {"modelVersionId": 12345, "sha256": "ABC...", "folder": "/sub/folder", "filename": "name.safetensors"}
+    Only one of modelVersionId / sha256 is required, a bare version id is accepted as well.
+    "folder" is a sub folder of the model's content type folder, "path" can be used instead for an absolute folder.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        data = data.get('models', [])
+
+    entries = []
+    for entry in data:
+        if isinstance(entry, (int, str)):
+            entry = {'modelVersionId': entry}
+        if not isinstance(entry, dict):
+            print(f"Skipping invalid manifest entry: {entry}")
+            continue
+
+        version_id = entry.get('modelVersionId') or entry.get('versionId')
+        sha256 = _api.normalize_sha256(entry.get('sha256'))
+        if not version_id and not sha256:
+            print(f"Skipping manifest entry without modelVersionId or sha256: {entry}")
+            continue
+
+        entries.append({
+            'modelVersionId': int(version_id) if version_id else None,
+            'sha256': sha256,
+            'folder': entry.get('folder'),
+            'path': entry.get('path'),
+            'filename': entry.get('filename')
+        })
+    return entries
+
+def resolve_entry(entry):
+    """Resolve a manifest entry to the CivitAI version payload and the file it points to."""
+    if entry['modelVersionId']:
+        api_url = f"https://civitai.com/api/v1/model-versions/{entry['modelVersionId']}"
+    else:
+        api_url = f"https://civitai.com/api/v1/model-versions/by-hash/{entry['sha256']}"
+
+    version = _api.request_civit_api(api_url)
+    if not isinstance(version, dict) or 'error' in version:
+        return None
+
+    files = version.get('files', [])
+    selected_file = None
+    for file in files:
+        file_sha256 = _api.normalize_sha256(file.get('hashes', {}).get('SHA256'))
+        if entry['sha256'] and file_sha256 == entry['sha256']:
+            selected_file = file
+            break
+    if not selected_file and not entry['sha256']:
+        selected_file = next((file for file in files if file.get('primary', False)), files[0] if files else None)
+    if not selected_file:
+        return None
+
+    model = version.get('model', {})
+    content_type = model.get('type')
+    model_folder = _api.contenttype_folder(content_type, model.get('name'))
+    if not model_folder:
+        return None
+
+    folder = entry.get('folder')
+    if entry.get('path'):
+        target_folder = Path(entry['path'])
+    elif folder and folder != 'None':
+        target_folder = Path(str(model_folder) + os.sep + folder.replace('/', os.sep).lstrip(os.sep))
+    else:
+        target_folder = Path(model_folder)
+
+    filename = _api.cleaned_name(entry.get('filename') or selected_file['name'])
+
+    return {
+        'model_id': version.get('modelId'),
+        'model_name': model.get('name', 'Unknown'),
+        'version_id': version.get('id'),
+        'version_name': version.get('name', 'Unknown'),
+        'sha256': _api.normalize_sha256(selected_file.get('hashes', {}).get('SHA256')),
+        'dl_url': selected_file.get('downloadUrl'),
+        'size_kb': selected_file.get('sizeKB', 0),
+        'target_folder': target_folder,
+        'target_path': target_folder / filename
+    }
+
+def file_sha256(file_path, scan_state):
+    """
+    SHA256 of a local file, without writing a sidecar so showing a plan has no side effects.
+    A hash recorded by a scan or computed before is only used while the file keeps its size and mtime,
+    the hash in the sidecar JSON alone is not trusted since the file may have changed since it was written.
+    """
+    signature = _scan_state.file_signature(file_path)
+    if not signature:
+        return None
+    entry = scan_state.get(file_path)
+    if entry and entry.get('sha256') and entry.get('signature') == signature:
+        return entry['sha256']
+
+    key = (file_path, signature[0], signature[1])
+    with _hashes_lock:
+        if key in _hashes:
+            return _hashes[key]
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    with _hashes_lock:
+        _hashes[key] = h.hexdigest()
+    return _hashes[key]
+
+def build_plan(manifest_path, progress=None):
+    """Compute the diff between a manifest and the local model tree, no files are downloaded or removed."""
+    entries = load_manifest(manifest_path)
+    plan = {'ok': [], 'missing': [], 'wrong_hash': [], 'extra': [], 'unresolved': []}
+
+    resolved = []
+    for idx, entry in enumerate(entries):
+        if progress != None:
+            progress(idx / max(len(entries), 1), desc=f"Resolving manifest entries... {idx}/{len(entries)}")
+        target = resolve_entry(entry)
+        if not target:
+            plan['unresolved'].append(entry)
+            continue
+        resolved.append(target)
+
+    expected_paths = {os.path.normcase(str(target['target_path'])) for target in resolved}
+    target_folders = {str(target['target_folder']) for target in resolved}
+
+    scan_state = _scan_state.load()
+    for idx, target in enumerate(resolved):
+        if progress != None:
+            progress(idx / max(len(resolved), 1), desc=f"Checking local files... {idx}/{len(resolved)}")
+        target_path = target['target_path']
+        if not target_path.exists():
+            plan['missing'].append(target)
+        elif target['sha256'] and _api.normalize_sha256(file_sha256(str(target_path), scan_state)) != target['sha256']:
+            plan['wrong_hash'].append(target)
+        else:
+            plan['ok'].append(target)
+
+    for file_path in _file.list_files(target_folders):
+        if os.path.dirname(file_path) not in target_folders:
+            continue
+        if os.path.normcase(file_path) not in expected_paths:
+            plan['extra'].append(file_path)
+
+    return plan
+
+def plan_html(plan, title='Sync plan'):
+    """Render a sync plan as a small HTML report."""
+    def rows(targets):
+        return ''.join(
+            f"<li>{escape(str(target['model_name']))} - {escape(str(target['version_name']))} "
+            f"&rarr; <code>{escape(str(target['target_path']))}</code> "
+            f"({_download.convert_size(target['size_kb'] * 1024)})</li>"
+            for target in targets
+        )
+
+    to_download = plan['missing'] + plan['wrong_hash']
+    total_size = _download.convert_size(sum(target['size_kb'] for target in to_download) * 1024)
+
+    html = (
+        '<div style="margin: 10px;">'
+        f'<h3>{escape(title)}</h3>'
+        f"<p>Up to date: {len(plan['ok'])} | Missing: {len(plan['missing'])} | Wrong hash: {len(plan['wrong_hash'])} | "
+        f"Extra: {len(plan['extra'])} | Unresolved: {len(plan['unresolved'])} | To download: {total_size}</p>"
+    )
+    if plan['missing']:
+        html += f"<h4>Missing</h4><ul>{rows(plan['missing'])}</ul>"
+    if plan['wrong_hash']:
+        html += f"<h4>Wrong hash (will be replaced)</h4><ul>{rows(plan['wrong_hash'])}</ul>"
+    if plan['extra']:
+        extra = ''.join(f'<li><code>{escape(path)}</code></li>' for path in plan['extra'])
+        html += f'<h4>Extra (not in manifest, left untouched)</h4><ul>{extra}</ul>'
+    if plan['unresolved']:
+        unresolved = ''.join(f"<li>{escape(str(entry['modelVersionId'] or entry['sha256']))}</li>" for entry in plan['unresolved'])
+        html += f'<h4>Unresolved (not found on CivitAI)</h4><ul>{unresolved}</ul>'
+    html += '</div>'
+    return html
+
+def sync_download(target, job):
+    """
+    Download a single plan target, verifying its SHA256 before moving it into place.
+    Sync downloads don't go through the download queue: they run in parallel (sync_download_workers),
+    don't use aria2, aren't listed in the Queue tab and are cancelled with "Cancel sync".
+    Queue items are built from the model page of the browser tab, which a manifest entry doesn't have.
+    """
+    if job.cancelled:
+        return target, 'Sync cancelled.'
+
+    file_path = str(target['target_path'])
+    part_path = file_path + '.part'
+    _file.make_dir(target['target_folder'])
+
+    download_link = _download.get_download_link(target['dl_url'], target['model_id'])
+    if not download_link:
+        return target, 'File is not available for download.'
+    if download_link == 'NO_API':
+        return target, 'A personal CivitAI API key is required to download this file.'
+
+    headers = _api.get_headers(target['model_id'], True)
+    proxies, ssl = _api.get_proxies()
+    h = hashlib.sha256()
+    try:
+        with requests.get(download_link, headers=headers, stream=True, timeout=(60, 30), proxies=proxies, verify=ssl) as response:
+            response.raise_for_status()
+            with open(part_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    if job.cancelled:
+                        raise InterruptedError('Sync cancelled.')
+                    if chunk:
+                        f.write(chunk)
+                        h.update(chunk)
+    except Exception as e:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        return target, str(e)
+
+    sha256 = h.hexdigest().upper()
+    if target['sha256'] and sha256 != target['sha256']:
+        os.remove(part_path)
+        return target, f"SHA256 mismatch after download ({sha256})."
+
+    os.replace(part_path, file_path)
+    _download.info_to_json(file_path, target['model_id'], sha256, model_version_id=target['version_id'])
+    return target, None
+
+def sync_plan(manifest_path, progress=gr.Progress() if queue else None):
+    if not manifest_path or not os.path.isfile(manifest_path):
+        return gr.HTML.update(value=_api.api_error_msg('manifest_not_found'))
+    try:
+        plan = build_plan(manifest_path, progress)
+    except Exception as e:
+        print(f"Failed to build sync plan: {e}")
+        return gr.HTML.update(value=_api.api_error_msg('error'))
+    return gr.HTML.update(value=plan_html(plan))
+
+def sync_run(manifest_path, progress=gr.Progress() if queue else None):
+    if not manifest_path or not os.path.isfile(manifest_path):
+        return gr.HTML.update(value=_api.api_error_msg('manifest_not_found'))
+
+    # Worker threads don't belong to the session, they get the job passed in
+    job = gl.sync_job
+    job.start()
+    try:
+        plan = build_plan(manifest_path, progress)
+        to_download = plan['missing'] + plan['wrong_hash']
+        workers = int(getattr(opts, 'sync_download_workers', 3))
+
+        failed = []
+        done = 0
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(sync_download, target, job) for target in to_download]
+            for future in as_completed(futures):
+                target, error = future.result()
+                done += 1
+                if error:
+                    print(f"Failed to sync '{target['target_path']}': {error}")
+                    failed.append(target)
+                else:
+                    print(f"Model synced to: {target['target_path']}")
+                if progress != None:
+                    progress(done / len(to_download), desc=f"Downloading missing models... {done}/{len(to_download)}")
+
+        if job.cancelled:
+            title = 'Sync cancelled'
+        elif failed:
+            title = f"Sync finished with {len(failed)} failed download(s)"
+        else:
+            title = 'Sync finished'
+
+        plan['missing'] = [target for target in plan['missing'] if target in failed]
+        plan['wrong_hash'] = [target for target in plan['wrong_hash'] if target in failed]
+        plan['ok'] += [target for target in to_download if target not in failed]
+        debug_print(plan)
+        return gr.HTML.update(value=plan_html(plan, title))
+    except Exception as e:
+        print(f"Failed to sync manifest: {e}")
+        return gr.HTML.update(value=_api.api_error_msg('error'))
+    finally:
+        job.finish()
+
+def cancel_sync():
+    gl.sync_job.cancel()
+    gl.sync_job.wait()
+    gl.sync_job.reset()
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+import time
+import urllib.parse
+from io import BytesIO
+
+import requests
+from PIL import Image
+from fastapi.responses import FileResponse, RedirectResponse, Response
+
+# ===  WebUI imports ===
+from modules.shared import opts
+
+# === Extension imports ===
+import scripts.civitai_api as _api
+import scripts.civitai_global as gl
+from scripts.civitai_global import print, debug_print
+
+
+gl.init()
+
+# Card images are served from here when "Cache card images locally" is enabled
+THUMB_ROUTE = '/civitai-browser/thumb'
+ALLOWED_HOSTS = ('image.civitai.com', 'civitai.com')
+CACHE_HEADERS = {'Cache-Control': 'public, max-age=31536000, immutable'}
+# Same escaping as encodeURIComponent, so civitai-html.js builds identical URLs
+URL_SAFE = "!'()*~"
+
+_lock = threading.Lock()
+_fetch_locks = {}
+_cache_size = None
+
+
+def proxied_url(image_url, width):
+    """URL of a card image served through the local cache."""
+    return f".{THUMB_ROUTE}?w={width}&url={urllib.parse.quote(image_url, safe=URL_SAFE)}"
+
+def cache_path(image_url, width):
+    return os.path.join(gl.thumb_cache_dir, hashlib.sha1(f"{width}:{image_url}".encode('utf-8')).hexdigest())
+
+def thumbnail(url: str, w: int = 512):
+    """Serve a card image from the cache, downloading and resizing it on the first request."""
+    host = urllib.parse.urlparse(url).hostname or ''
+    if not any(host == allowed or host.endswith('.' + allowed) for allowed in ALLOWED_HOSTS):
+        return Response(status_code=404)
+    width = min(max(w, 64), 1024)
+    path = cache_path(url, width)
+
+    with _lock:
+        fetch_lock = _fetch_locks.setdefault(path, threading.Lock())
+    with fetch_lock:
+        if not os.path.exists(path) and not fetch(url, width, path):
+            return RedirectResponse(url)
+    with _lock:
+        _fetch_locks.pop(path, None)
+
+    try:
+        # The modification time is the last use, eviction drops the least recently used images
+        os.utime(path)
+        with open(path, 'rb') as f:
+            header = f.read(12)
+    except OSError:
+        return RedirectResponse(url)
+    return FileResponse(path, media_type=media_type(header), headers=CACHE_HEADERS)
+
+def media_type(header):
+    if header[8:12] == b'WEBP':
+        return 'image/webp'
+    if header.startswith(b'GIF8'):
+        return 'image/gif'
+    if header.startswith(b'\x89PNG'):
+        return 'image/png'
+    return 'image/jpeg'
+
+def fetch(image_url, width, path):
+    """Download an image and store it resized as WebP, animated images are stored as they are."""
+    proxies, ssl = _api.get_proxies()
+    try:
+        # Redirects aren't followed, they could point outside ALLOWED_HOSTS. The browser gets
+        # the original URL instead (thumbnail falls back to a redirect when this fails).
+        response = requests.get(image_url, timeout=(10, 30), proxies=proxies, verify=ssl, allow_redirects=False)
+        response.raise_for_status()
+        if response.is_redirect:
+            raise ValueError(f"redirected to {response.headers.get('Location')}")
+        image = Image.open(BytesIO(response.content))
+        if getattr(image, 'is_animated', False):
+            data = response.content
+        else:
+            image.thumbnail((width, width * 4))
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+            output = BytesIO()
+            image.save(output, format='WEBP', quality=80, method=4)
+            data = output.getvalue()
+    except Exception as e:
+        debug_print(f"Failed to cache card image {image_url}: {e}")
+        return False
+
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(gl.thumb_cache_dir, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Failed to cache card image: {e}")
+        return False
+    added(len(data))
+    return True
+
+def added(size):
+    """Track the cache size and evict once it grows past the configured limit."""
+    global _cache_size
+    with _lock:
+        if _cache_size is None:
+            # First image since startup, the scan already counts the file just written
+            _cache_size = sum(entry.stat().st_size for entry in os.scandir(gl.thumb_cache_dir))
+        else:
+            _cache_size += size
+        over_limit = _cache_size > int(getattr(opts, 'thumbnail_cache_mb', 500)) * 1024 * 1024
+    if over_limit:
+        evict()
+
+def evict():
+    """Remove the least recently used images until the cache is at 90% of its limit."""
+    global _cache_size
+    limit = int(getattr(opts, 'thumbnail_cache_mb', 500)) * 1024 * 1024 * 0.9
+    with _lock:
+        try:
+            entries = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in os.scandir(gl.thumb_cache_dir) if not entry.name.endswith('.tmp')]
+        except OSError:
+            return
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        _cache_size = total
+    debug_print(f"Evicted {removed} cached card images")
+
+def on_app_started(demo, app):
+    app.add_api_route(THUMB_ROUTE, thumbnail, methods=['GET'])